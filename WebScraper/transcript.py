@@ -46,15 +46,22 @@ def get_video_id(url: str) -> str:
     print("The youtube link is not parsable, the link received is {0}".format(url))
     return None
 
-def get_video_upload_date(video_url: str) -> str:
+def get_video_info(video_url: str) -> dict:
     """
-    Returns the upload date (YYYY-MM-DD) of a given YouTube video URL.
+    Returns the yt_dlp metadata of a given YouTube video URL (one network call).
     """
     ydl_opts = {'quiet': True}
 
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
-        upload_date = info.get('upload_date')  # e.g., "20230115"
+        return ydl.extract_info(video_url, download=False)
+
+def get_video_upload_date(video_url: str, info: dict = None) -> str:
+    """
+    Returns the upload date (YYYY-MM-DD) of a given YouTube video URL.
+    Pass info from get_video_info to avoid fetching the metadata again.
+    """
+    info = info or get_video_info(video_url)
+    upload_date = info.get('upload_date')  # e.g., "20230115"
     
     if upload_date:
         # Convert from YYYYMMDD to YYYY-MM-DD
@@ -62,26 +69,19 @@ def get_video_upload_date(video_url: str) -> str:
     else:
         return "Unknown Date"
     
-def get_video_title(video_url: str) -> str:
+def get_video_title(video_url: str, info: dict = None) -> str:
     """
     Returns the title of a given YouTube video URL.
     """
-    ydl_opts = {'quiet': True}
+    info = info or get_video_info(video_url)
+    return info.get('title', 'Unknown Title')
 
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
-        title = info.get('title', 'Unknown Title')
-    return title
-
-def get_video_description(video_url: str) -> str:
+def get_video_description(video_url: str, info: dict = None) -> str:
     """
     Returns the full text description of a given YouTube video URL.
     """
-    ydl_opts = {'quiet': True}
-
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(video_url, download=False)
-        description = info.get('description', 'No description available')
+    info = info or get_video_info(video_url)
+    description = info.get('description') or 'No description available'
     
     return description.strip()
 
@@ -93,9 +93,11 @@ def get_video_content(url: str) -> str:
         The output transcript as a string
     """
     video_id = get_video_id(url)
-    title = get_video_title(url)
-    upload_date = get_video_upload_date(url)
-    description = get_video_description(url)
+    # One metadata fetch shared by title, date and description
+    info = get_video_info(url)
+    title = get_video_title(url, info)
+    upload_date = get_video_upload_date(url, info)
+    description = get_video_description(url, info)
     if video_id:
         return video_content(video_id),url,title,upload_date, description
     return "Invalid YouTube URL", url, None, None, description
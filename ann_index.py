@@ -0,0 +1,154 @@
+"""
+Approximate nearest-neighbour retrieval with an inverted-file (IVF) index.
+Vectors are clustered with spherical k-means; a query only scores the vectors in the
+nprobe clusters whose centroids are closest to it. nlist/nprobe trade recall for
+latency, new vectors are assigned to their nearest centroid as they arrive, and the
+whole index (vectors, clusters and records) can be saved to and loaded from disk.
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from vector_index import VectorIndex, normalize_rows, top_k_indices, score_rows
+
+logger = logging.getLogger(__name__)
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Cluster normalized vectors by cosine similarity; returns normalized centroids"""
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, vectors.shape[0])
+    centroids = vectors[rng.choice(vectors.shape[0], nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=nlist)
+        # Empty clusters are re-seeded with random vectors
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+class IVFIndex(VectorIndex):
+    def __init__(self, dim: int, nlist: int = 0, nprobe: int = 8, train_min: int = 1000,
+                 storage: str = 'float32', rerank_k: int = 0, rerank_path: Optional[str] = None):
+        """nlist = clusters (0 = sqrt of the corpus size at training), nprobe = clusters scored per query;
+        searches are exact until train_min vectors have been added"""
+        super().__init__(dim, storage, rerank_k, rerank_path)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_min = train_min
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int64)
+        # Vectors regrouped by cluster (rebuilt lazily after inserts)
+        self._order: Optional[np.ndarray] = None
+        self._grouped: Optional[np.ndarray] = None
+        self._grouped_scales: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, iterations: int = 20, seed: int = 0) -> None:
+        """(Re)cluster every vector currently in the index"""
+        if not self.ids:
+            return
+        nlist = self.nlist or max(1, int(np.sqrt(len(self.ids))))
+        vectors = self.dequantize()
+        self.centroids = spherical_kmeans(vectors, nlist, iterations, seed)
+        self.assignments = self._assign(vectors)
+        self._order = None
+        logger.info(f"🧮 IVF index trained: {len(self.ids)} vectors in {self.centroids.shape[0]} clusters")
+
+    def _assign(self, matrix: np.ndarray) -> np.ndarray:
+        return np.argmax(matrix @ self.centroids.T, axis=1).astype(np.int64)
+
+    def add(self, ids: List[str], vectors, records: List[Dict[str, Any]]) -> None:
+        """Append vectors; once trained, new vectors join their nearest cluster without retraining"""
+        start = len(self.ids)
+        super().add(ids, vectors, records)
+        if self.trained:
+            new_positions = np.arange(start, len(self.ids))
+            self.assignments = np.concatenate([self.assignments, self._assign(self.dequantize(new_positions))])
+            self._order = None
+        elif len(self.ids) >= self.train_min:
+            self.train()
+
+    def _build_lists(self) -> None:
+        """Group vectors by cluster so each probed list is one contiguous slice"""
+        self._order = np.argsort(self.assignments, kind='stable')
+        self._grouped = np.ascontiguousarray(self.matrix[self._order])
+        self._grouped_scales = self.scales[self._order] if self.scales is not None else None
+        self._offsets = np.searchsorted(self.assignments[self._order], np.arange(self.centroids.shape[0] + 1))
+
+    def _rank_stored(self, query: np.ndarray, k: int, candidates: Optional[Sequence[int]] = None,
+                     nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Approximate top-k over the nprobe nearest clusters (exact when untrained or given candidates)"""
+        if not self.trained or candidates is not None:
+            return super()._rank_stored(query, k, candidates)
+        if self._order is None:
+            self._build_lists()
+
+        nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+        probed = top_k_indices(self.centroids @ query, nprobe)
+        slices = [(self._offsets[c], self._offsets[c + 1]) for c in probed]
+        positions = np.concatenate([self._order[start:end] for start, end in slices])
+        if not positions.size:
+            return []
+        scores = np.concatenate([
+            score_rows(
+                self._grouped[start:end],
+                self._grouped_scales[start:end] if self._grouped_scales is not None else None,
+                query
+            )
+            for start, end in slices
+        ])
+        return [(int(positions[i]), float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def save(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        """Write the index to an .npz file (atomically replacing any previous one)"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        header = {
+            'dim': self.dim, 'nlist': self.nlist, 'nprobe': self.nprobe, 'train_min': self.train_min,
+            'storage': self.storage, 'rerank_k': self.rerank_k, 'rerank_path': self.rerank_path, 'rerank_file': self.rerank_file,
+            'meta': meta or {}
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                header=np.array(json.dumps(header)),
+                matrix=self.matrix,
+                scales=self.scales if self.scales is not None else np.zeros(0, dtype=np.float32),
+                ids=np.array(json.dumps(self.ids)),
+                records=np.array(json.dumps(self.records, default=str)),
+                centroids=self.centroids if self.trained else np.zeros((0, self.dim), dtype=np.float32),
+                assignments=self.assignments
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["IVFIndex", Dict[str, Any]]:
+        """Read an index written by save(); returns (index, meta)"""
+        with np.load(path) as data:
+            header = json.loads(str(data['header']))
+            storage = header.get('storage', 'float32')
+            index = cls(header['dim'], header['nlist'], header['nprobe'], header['train_min'],
+                        storage=storage, rerank_k=header.get('rerank_k', 0))
+            index.matrix = np.ascontiguousarray(data['matrix'], dtype=np.dtype(storage))
+            if storage == 'int8':
+                index.scales = data['scales'].astype(np.float32)
+            index.ids = json.loads(str(data['ids']))
+            index.records = json.loads(str(data['records']))
+            if data['centroids'].shape[0]:
+                index.centroids = data['centroids'].astype(np.float32)
+                index.assignments = data['assignments'].astype(np.int64)
+        # The float32 copy this index was saved with (rerank_source stays None if it was pruned)
+        index.rerank_path = header.get('rerank_path')
+        index.rerank_file = header.get('rerank_file')
+        index.open_rerank_source()
+        return index, header['meta']
@@ -0,0 +1,276 @@
+"""
+Asyncio (ASGI) serving mode for the chat pipeline.
+Supabase and Groq calls are awaited on the event loop and embedding work runs in
+RAGService's executor, so one process can hold many in-flight conversations.
+
+Usage: uvicorn asgi_server:app --host 0.0.0.0 --port 5001
+"""
+
+import os
+import time
+import logging
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, Mount
+from starlette.staticfiles import StaticFiles
+from rag_service import rag_service
+from llm_client import AsyncLLMClient
+from server import (
+    GROQ_API_URL, GROQ_API_KEY, EMBEDDING_WARMUP, CREATORS, CREATOR_ID_MAP,
+    get_creator_id, get_demo_response, session_store, build_api_messages, get_health_status,
+    get_cached_response, cache_response, server_timing, elapsed_ms, sse_event, count_prompt_tokens
+)
+
+logger = logging.getLogger(__name__)
+
+# Async clients multiplex many requests over one pool, so the pool can be larger
+async_llm_client = AsyncLLMClient(
+    GROQ_API_URL,
+    GROQ_API_KEY,
+    model="llama-3.1-8b-instant",  # Free model on Groq
+    connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("GROQ_READ_TIMEOUT", "60")),
+    max_retries=int(os.getenv("GROQ_MAX_RETRIES", "2")),
+    pool_size=int(os.getenv("GROQ_ASYNC_POOL_SIZE", "100"))
+)
+
+async def chat(request: Request):
+    """Handle chat requests with conversation context"""
+    try:
+        data = await request.json()
+        message = data.get('message')
+        creator = data.get('creator')
+        session_id = data.get('sessionId', 'default')
+
+        if not message or not creator:
+            return JSONResponse({"error": "Message and creator are required"}, status_code=400)
+
+        logger.info(f"💬 Chat request from {creator}: {message[:50]}...")
+
+        message_count = session_store.append(session_id, creator, {
+            'role': 'user',
+            'content': message
+        })
+
+        first_turn = message_count == 1
+        timings = {}
+
+        try:
+            # Embedding the message may load the model, so the lookup runs in the executor
+            cached = None
+            if first_turn:
+                started = time.perf_counter()
+                cached = await rag_service.run_blocking(get_cached_response, message, creator)
+                timings['cache'] = elapsed_ms(started)
+            if cached:
+                session_store.append(session_id, creator, {
+                    'role': 'assistant',
+                    'content': cached['response']
+                })
+                return JSONResponse({
+                    "response": cached['response'],
+                    "sessionId": session_id,
+                    "messageCount": session_store.message_count(session_id),
+                    "rag_used": True,
+                    "knowledge_entries": cached['metadata'].get('knowledge_entries', 0),
+                    "cached": True
+                }, headers={'Server-Timing': server_timing(timings)})
+
+            started = time.perf_counter()
+            rag_result = await rag_service.aretrieve_and_augment(message, creator, get_creator_id(creator))
+            timings['retrieval'] = elapsed_ms(started)
+
+            prompt_tokens = 0
+            if not rag_result['has_knowledge']:
+                ai_response = rag_result['fallback_response']
+                logger.info("ℹ️ No knowledge found, using fallback response")
+            else:
+                messages = session_store.get_messages(session_id)
+                prompt_tokens = count_prompt_tokens(messages, rag_result['enhanced_system_prompt'])
+                # max_tokens raised for detailed RAG responses, temperature slightly higher for engagement
+                started = time.perf_counter()
+                ai_response = await async_llm_client.chat(
+                    build_api_messages(messages, rag_result['enhanced_system_prompt']),
+                    max_tokens=2000,
+                    temperature=0.5
+                )
+                timings['llm'] = elapsed_ms(started)
+                logger.info(f"✅ RAG-enhanced response sent with {rag_result['retrieved_entries']} knowledge entries")
+                if first_turn:
+                    # Embeds the question and writes the cache file, so it runs in the executor
+                    await rag_service.run_blocking(cache_response, message, creator, rag_result, ai_response)
+
+            session_store.append(session_id, creator, {
+                'role': 'assistant',
+                'content': ai_response
+            })
+
+            return JSONResponse({
+                "response": ai_response,
+                "sessionId": session_id,
+                "messageCount": session_store.message_count(session_id),
+                "rag_used": rag_result['has_knowledge'],
+                "knowledge_entries": rag_result['retrieved_entries'],
+                "prompt_tokens": prompt_tokens
+            }, headers={'Server-Timing': server_timing(timings)})
+        except Exception as api_error:
+            logger.warning(f"⚠️ API failed, using demo response: {api_error}")
+            demo_response = get_demo_response(message, creator)
+            session_store.append(session_id, creator, {
+                'role': 'assistant',
+                'content': demo_response
+            })
+            return JSONResponse({
+                "response": demo_response,
+                "sessionId": session_id,
+                "messageCount": session_store.message_count(session_id)
+            })
+
+    except Exception as e:
+        logger.error(f"❌ Error in /api/chat: {e}")
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+async def chat_stream(request: Request):
+    """Handle chat requests, streaming the response as Server-Sent Events"""
+    try:
+        data = await request.json()
+        message = data.get('message')
+        creator = data.get('creator')
+        session_id = data.get('sessionId', 'default')
+
+        if not message or not creator:
+            return JSONResponse({"error": "Message and creator are required"}, status_code=400)
+
+        logger.info(f"💬 Streaming chat request from {creator}: {message[:50]}...")
+
+        message_count = session_store.append(session_id, creator, {
+            'role': 'user',
+            'content': message
+        })
+        messages = session_store.get_messages(session_id)
+
+        # Retrieval happens before the stream opens; the LLM call is what gets streamed
+        first_turn = message_count == 1
+        cached = None
+        rag_result = None
+        timings = {}
+        try:
+            if first_turn:
+                started = time.perf_counter()
+                cached = await rag_service.run_blocking(get_cached_response, message, creator)
+                timings['cache'] = elapsed_ms(started)
+            if not cached:
+                started = time.perf_counter()
+                rag_result = await rag_service.aretrieve_and_augment(message, creator, get_creator_id(creator))
+                timings['retrieval'] = elapsed_ms(started)
+        except Exception as rag_error:
+            logger.warning(f"⚠️ RAG failed, using demo response: {rag_error}")
+    except Exception as e:
+        logger.error(f"❌ Error in /api/chat/stream: {e}")
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+    async def generate():
+        parts = []
+        stored = False
+        try:
+            if cached:
+                yield sse_event('meta', {
+                    "sessionId": session_id,
+                    "rag_used": True,
+                    "knowledge_entries": cached['metadata'].get('knowledge_entries', 0),
+                    "cached": True
+                })
+            else:
+                yield sse_event('meta', {
+                    "sessionId": session_id,
+                    "rag_used": bool(rag_result and rag_result['has_knowledge']),
+                    "knowledge_entries": rag_result['retrieved_entries'] if rag_result else 0,
+                    "prompt_tokens": count_prompt_tokens(messages, rag_result['enhanced_system_prompt'])
+                    if rag_result and rag_result['has_knowledge'] else 0
+                })
+
+            if cached:
+                parts.append(cached['response'])
+                yield sse_event('token', {"content": parts[-1]})
+            elif rag_result and not rag_result['has_knowledge']:
+                parts.append(rag_result['fallback_response'])
+                yield sse_event('token', {"content": parts[-1]})
+            elif rag_result:
+                try:
+                    async for token in async_llm_client.stream_chat(
+                        build_api_messages(messages, rag_result['enhanced_system_prompt']),
+                        max_tokens=2000,
+                        temperature=0.5
+                    ):
+                        parts.append(token)
+                        yield sse_event('token', {"content": token})
+                    logger.info(f"✅ Groq API stream finished for {creator} with {len(messages)} context messages")
+                    if first_turn and parts:
+                        # Only complete answers are cached
+                        await rag_service.run_blocking(cache_response, message, creator, rag_result, "".join(parts))
+                except Exception as api_error:
+                    logger.warning(f"⚠️ API stream failed: {api_error}")
+                    if parts:
+                        yield sse_event('error', {"error": "The response was interrupted"})
+
+            if not parts:
+                parts.append(get_demo_response(message, creator))
+                yield sse_event('token', {"content": parts[-1]})
+
+            # Stored before 'done' so messageCount counts the answer (after any trimming)
+            session_store.append(session_id, creator, {
+                'role': 'assistant',
+                'content': "".join(parts)
+            })
+            stored = True
+            yield sse_event('done', {
+                "response": "".join(parts),
+                "sessionId": session_id,
+                "messageCount": session_store.message_count(session_id)
+            })
+        finally:
+            # Runs on client disconnect too, so history stays consistent
+            if parts and not stored:
+                session_store.append(session_id, creator, {
+                    'role': 'assistant',
+                    'content': "".join(parts)
+                })
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'Server-Timing': server_timing(timings)}
+    )
+
+async def health(request: Request):
+    """Health check endpoint"""
+    return JSONResponse(get_health_status(async_llm_client))
+
+async def get_creators(request: Request):
+    """Get creators list"""
+    return JSONResponse({'creators': CREATORS})
+
+async def startup():
+    if EMBEDDING_WARMUP:
+        rag_service.warmup(background=True)
+    rag_service.prime_creator_cache(CREATOR_ID_MAP, background=True)
+
+async def shutdown():
+    await rag_service.run_blocking(rag_service.embedding_cache.save)
+    await async_llm_client.aclose()
+    for client in rag_service.async_supabase_clients.values():
+        await client.aclose()
+
+app = Starlette(
+    routes=[
+        Route('/api/chat', chat, methods=['POST']),
+        Route('/api/chat/stream', chat_stream, methods=['POST']),
+        Route('/api/health', health, methods=['GET']),
+        Route('/api/creators', get_creators, methods=['GET']),
+        # index.html, script.js, styles.css and photos, like the Flask server
+        Mount('/', StaticFiles(directory=os.path.dirname(os.path.abspath(__file__)), html=True))
+    ],
+    on_startup=[startup],
+    on_shutdown=[shutdown]
+)
@@ -0,0 +1,108 @@
+"""
+Recall@k and latency of the IVF index against exact search.
+
+Chunks and embeds the real corpus (data/mkbhd_videos.csv by default). --scale N grows
+it to N vectors by jittering the real chunk vectors, to approximate whole-channel
+corpora. Queries are perturbed corpus vectors, so every query has near neighbours.
+
+Usage: python benchmarks/bench_ann.py --scale 50000 --nprobe 1 2 4 8 16 32
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ann_index import IVFIndex
+from llm_client import percentile
+from vector_index import VectorIndex, load_csv_records, normalize_rows
+
+def corpus_vectors(csv_path):
+    """Chunk and embed a corpus CSV the same way the local index does"""
+    from rag_service import rag_service
+    chunks = rag_service.chunk_entries(load_csv_records(csv_path))
+    vectors = [vector for vector in rag_service.embed_entries(chunks) if vector is not None]
+    return normalize_rows(np.stack(vectors))
+
+def jitter(vectors, n, noise, rng):
+    """n normalized vectors drawn around randomly chosen base vectors"""
+    base = vectors[rng.integers(0, vectors.shape[0], n)]
+    return normalize_rows(base + rng.normal(0, noise, base.shape).astype(np.float32))
+
+def timed_ranks(index, queries, k, **kwargs):
+    ranks, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        ranks.append([position for position, _ in index.rank(query, k, **kwargs)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return ranks, latencies
+
+def latency_summary(latencies):
+    return {
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(float(np.mean(latencies)), 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=os.path.join('data', 'mkbhd_videos.csv'))
+    parser.add_argument('--scale', type=int, default=0, help='grow the corpus to this many vectors (0 = real size)')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--nlist', type=int, default=0, help='IVF clusters (0 = sqrt of corpus size)')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--noise', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = corpus_vectors(args.corpus)
+    print(f"📚 {vectors.shape[0]} real chunk vectors from {args.corpus}")
+    if args.scale > vectors.shape[0]:
+        vectors = np.vstack([vectors, jitter(vectors, args.scale - vectors.shape[0], args.noise, rng)])
+    queries = jitter(vectors, args.queries, args.noise, rng)
+    ids = [str(i) for i in range(vectors.shape[0])]
+    records = [{} for _ in ids]
+
+    exact = VectorIndex(vectors.shape[1])
+    exact.add(ids, vectors, records)
+    truth, exact_latencies = timed_ranks(exact, queries, args.k)
+
+    start = time.perf_counter()
+    ivf = IVFIndex(vectors.shape[1], nlist=args.nlist, train_min=0)
+    ivf.add(ids, vectors, records)
+    ivf.rank(queries[0], args.k)  # builds the cluster lists
+    build_seconds = time.perf_counter() - start
+
+    results = {
+        'corpus_size': vectors.shape[0],
+        'queries': args.queries,
+        'k': args.k,
+        'nlist': int(ivf.centroids.shape[0]),
+        'ivf_build_seconds': round(build_seconds, 3),
+        'exact': latency_summary(exact_latencies),
+        'ivf': []
+    }
+    print(f"🧮 exact: p50 {results['exact']['p50_ms']}ms, p99 {results['exact']['p99_ms']}ms")
+
+    for nprobe in args.nprobe:
+        approx, latencies = timed_ranks(ivf, queries, args.k, nprobe=nprobe)
+        recall = np.mean([len(set(a) & set(t)) / max(len(t), 1) for a, t in zip(approx, truth)])
+        row = {'nprobe': nprobe, f'recall@{args.k}': round(float(recall), 4), **latency_summary(latencies)}
+        results['ivf'].append(row)
+        print(f"🔎 nprobe={nprobe:>3}: recall@{args.k} {row[f'recall@{args.k}']:.3f}, "
+              f"p50 {row['p50_ms']}ms, p99 {row['p99_ms']}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
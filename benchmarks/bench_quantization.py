@@ -0,0 +1,77 @@
+"""
+Memory, recall@k and latency of quantized index storage against the float32 baseline.
+
+Builds exact indexes over the real corpus (optionally grown with --scale, see
+bench_ann.py) stored as float32, float16 and int8, each with and without an exact
+float32 rerank of the top --rerank-k quantized hits.
+
+Usage: python benchmarks/bench_quantization.py --scale 50000 --rerank-k 50
+"""
+
+import os
+import sys
+import json
+import tempfile
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ann import corpus_vectors, jitter, timed_ranks, latency_summary
+from vector_index import VectorIndex, STORAGE_TYPES
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=os.path.join('data', 'mkbhd_videos.csv'))
+    parser.add_argument('--scale', type=int, default=0, help='grow the corpus to this many vectors (0 = real size)')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--rerank-k', type=int, default=50)
+    parser.add_argument('--noise', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = corpus_vectors(args.corpus)
+    print(f"📚 {vectors.shape[0]} real chunk vectors from {args.corpus}")
+    if args.scale > vectors.shape[0]:
+        vectors = np.vstack([vectors, jitter(vectors, args.scale - vectors.shape[0], args.noise, rng)])
+    queries = jitter(vectors, args.queries, args.noise, rng)
+    ids = [str(i) for i in range(vectors.shape[0])]
+    records = [{} for _ in ids]
+
+    results = {'corpus_size': vectors.shape[0], 'queries': args.queries, 'k': args.k, 'runs': []}
+    truth = None
+    baseline_bytes = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for storage in STORAGE_TYPES:
+            for rerank in ([False] if storage == 'float32' else [False, True]):
+                rerank_path = os.path.join(tmp_dir, f"{storage}.f32") if rerank else None
+                index = VectorIndex(vectors.shape[1], storage, args.rerank_k if rerank else 0, rerank_path)
+                index.add(ids, vectors, records)
+                ranks, latencies = timed_ranks(index, queries, args.k)
+                if truth is None:
+                    truth, baseline_bytes = ranks, index.memory_bytes()
+
+                recall = np.mean([len(set(a) & set(t)) / max(len(t), 1) for a, t in zip(ranks, truth)])
+                row = {
+                    'storage': storage,
+                    'rerank_k': args.rerank_k if rerank else 0,
+                    'memory_mb': round(index.memory_bytes() / 1024 / 1024, 2),
+                    'memory_ratio': round(index.memory_bytes() / baseline_bytes, 3),
+                    f'recall@{args.k}': round(float(recall), 4),
+                    **latency_summary(latencies)
+                }
+                results['runs'].append(row)
+                label = f"{storage}{' + rerank' if rerank else ''}"
+                print(f"🧮 {label:<16} {row['memory_mb']:>8} MB ({row['memory_ratio']:.2f}x), "
+                      f"recall@{args.k} {row[f'recall@{args.k}']:.3f}, p50 {row['p50_ms']}ms, p99 {row['p99_ms']}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Throughput of the concurrent scraper against the old serial loop, fully offline.
+
+A stub fetcher stands in for YouTube: every metadata and transcript call sleeps for a
+random latency and fails transiently with probability --failure-rate. Runs a serial
+baseline (one worker, no rate limit) and then the worker pool with each --workers value,
+and checks that every video cost exactly one successful metadata call.
+
+Usage: python benchmarks/bench_scraper.py --videos 200 --workers 4 8 16 --rate 50
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import percentile
+from scraper import Scraper
+
+class StubFetcher:
+    """Simulated YouTube with configurable latency and transient failures"""
+
+    def __init__(self, latency_ms: float, failure_rate: float, seed: int = 0):
+        self.latency = latency_ms / 1000
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.metadata_ok = Counter()
+
+    def _respond(self):
+        with self.lock:
+            delay = self.rng.uniform(0.5, 1.5) * self.latency
+            fail = self.rng.random() < self.failure_rate
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError("simulated HTTP 503")
+
+    def metadata(self, url):
+        self._respond()
+        with self.lock:
+            self.metadata_ok[url] += 1
+        video_id = url.split("v=")[1]
+        return {"title": f"Video {video_id}", "upload_date": "20240101", "description": "stub"}
+
+    def transcript(self, video_id):
+        self._respond()
+        return f"transcript of {video_id}"
+
+def run(urls, args, workers, rate):
+    fetcher = StubFetcher(args.latency_ms, args.failure_rate, args.seed)
+    scraper = Scraper(fetcher, workers=workers, rate=rate, burst=max(1, workers),
+                      per_host=args.per_host, retries=args.retries, backoff=args.backoff)
+    start = time.perf_counter()
+    outcomes = list(scraper.scrape(urls))
+    elapsed = time.perf_counter() - start
+    latencies = [o["seconds"] * 1000 for o in outcomes]
+    return {
+        "workers": workers,
+        "rate": rate,
+        "seconds": round(elapsed, 2),
+        "videos_per_second": round(len(urls) / elapsed, 1),
+        "succeeded": sum(o["row"] is not None for o in outcomes),
+        "failed": sum(o["row"] is None for o in outcomes),
+        "retries": scraper.stats["retries"],
+        "max_metadata_per_video": max(fetcher.metadata_ok.values(), default=0),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--videos', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 8, 16])
+    parser.add_argument('--rate', type=float, default=50, help='requests/second for the pooled runs')
+    parser.add_argument('--per-host', type=int, default=16)
+    parser.add_argument('--latency-ms', type=float, default=100)
+    parser.add_argument('--failure-rate', type=float, default=0.02)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--backoff', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    urls = [f"https://www.youtube.com/watch?v=vid{i:05d}" for i in range(args.videos)]
+    results = {'videos': args.videos, 'latency_ms': args.latency_ms, 'runs': []}
+    for workers, rate in [(1, 0)] + [(w, args.rate) for w in args.workers]:
+        row = run(urls, args, workers, rate)
+        results['runs'].append(row)
+        label = "serial" if workers == 1 else f"{workers} workers"
+        print(f"🚀 {label:<11} {row['seconds']:>7}s ({row['videos_per_second']} videos/s), "
+              f"{row['failed']} failed, {row['retries']} retries, "
+              f"metadata calls/video {row['max_metadata_per_video']}, p99 {row['p99_ms']}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat completions API, for load tests.
+
+Answers POST /v1/chat/completions (any path ending in /chat/completions) with generated
+text, either as one JSON body or as a "data: {json}" SSE stream ending in "data: [DONE]".
+Latency is configurable: --ttft-ms before the first token, --token-ms between tokens,
+each scaled by a random jitter, and --error-rate answers 503 so the client's retry path
+is exercised too. GET /stats returns request counts and the prompt sizes received.
+
+Usage: python benchmarks/fake_llm_server.py --port 8765 --ttft-ms 200 --token-ms 20 --tokens 60
+       GROQ_API_URL=http://127.0.0.1:8765/v1/chat/completions python server.py
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+WORDS = ("honestly this phone camera battery display performance price review chip design build "
+         "quality screen software update worth it for most people the best part is").split()
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the simulated latency settings and request stats"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, ttft_ms: float = 200, token_ms: float = 20,
+                 tokens: int = 60, jitter: float = 0.2, error_rate: float = 0.0, seed: int = 0):
+        super().__init__((host, port), FakeLLMHandler)
+        self.ttft = ttft_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.tokens = tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'streamed': 0, 'errors_injected': 0, 'prompt_chars': 0, 'max_prompt_chars': 0}
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def delay(self, seconds: float) -> float:
+        with self.lock:
+            return seconds * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def record(self, payload: Dict[str, Any]) -> bool:
+        """Count a request; returns True if it should fail with an injected 503"""
+        prompt_chars = sum(len(m.get('content') or '') for m in payload.get('messages', []))
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['streamed'] += bool(payload.get('stream'))
+            self.stats['prompt_chars'] += prompt_chars
+            self.stats['max_prompt_chars'] = max(self.stats['max_prompt_chars'], prompt_chars)
+            fail = self.rng.random() < self.error_rate
+            self.stats['errors_injected'] += fail
+            return fail
+
+    def completion_tokens(self):
+        with self.lock:
+            return [(" " if i else "") + self.rng.choice(WORDS) for i in range(self.tokens)]
+
+    def handle_error(self, request, client_address):
+        # Keep-alive connections are reset when the server under test exits
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self) -> "FakeLLMServer":
+        """Serve from a daemon thread"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with self.server.lock:
+                self.send_json(200, dict(self.server.stats))
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        server: FakeLLMServer = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_json(404, {'error': 'not found'})
+            return
+        if server.record(payload):
+            self.send_json(503, {'error': {'message': 'simulated overload'}})
+            return
+
+        tokens = server.completion_tokens()
+        time.sleep(server.delay(server.ttft))
+        if not payload.get('stream'):
+            time.sleep(server.delay(server.token_delay * max(len(tokens) - 1, 0)))
+            self.send_json(200, {
+                'object': 'chat.completion',
+                'model': payload.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': "".join(tokens)}, 'finish_reason': 'stop'}],
+                'usage': {'completion_tokens': len(tokens)}
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(server.delay(server.token_delay))
+            chunk = {'object': 'chat.completion.chunk', 'choices': [{'index': 0, 'delta': {'content': token}}]}
+            self.send_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ttft-ms', type=float, default=200, help='delay before the first token')
+    parser.add_argument('--token-ms', type=float, default=20, help='delay between tokens')
+    parser.add_argument('--tokens', type=int, default=60, help='tokens per completion')
+    parser.add_argument('--jitter', type=float, default=0.2, help='delays vary by up to this fraction')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.ttft_ms, args.token_ms, args.tokens, args.jitter, args.error_rate)
+    print(f"🚀 Fake LLM API at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,559 @@
+"""
+End-to-end load test of the chat pipeline with local stand-ins for Groq and Supabase.
+
+Seeds a SQLite knowledge store (RAG_KNOWLEDGE_STORE=sqlite) with a slice of the corpus CSV
+for every creator in CREATOR_ID_MAP, starts a fake OpenAI-compatible completion server
+(benchmarks/fake_llm_server.py) and then server.py (or asgi_server under uvicorn) as a
+subprocess pointed at both. Concurrent users then hold multi-turn sessions spread across
+all five creators, on /api/chat and /api/chat/stream.
+
+Reports requests/second, p50/p95/p99 per stage (client total, time to first streamed token,
+and the server's cache/retrieval/llm stages from its Server-Timing header) and the server's
+memory growth (RSS and session store bytes). Results are written as JSON; --compare prints
+the change against an earlier run. The run fails if any creator was served without retrieved
+knowledge or reported no prompt tokens, so a silent loss of retrieval can't pass as a fast run.
+
+Usage: python benchmarks/load_test.py --sessions 100 --concurrency 16 --turns 3 --stream-fraction 0.5
+       python benchmarks/load_test.py --compare benchmarks/results/<earlier run>.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_client import percentile
+from fake_llm_server import FakeLLMServer, WORDS
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+DEFAULT_CORPUS = os.path.join(ROOT, "data", "mkbhd_videos.csv")
+
+FOLLOW_UPS = [
+    "Would you recommend it over last year's model?",
+    "How was the battery life in your testing?",
+    "Is it worth the price?",
+    "What would you change about it?",
+    "How does the camera compare?",
+]
+
+# Lower is better for latency and memory; higher is better for throughput
+COMPARE_HIGHER_IS_BETTER = {'summary.rps'}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB (Linux /proc; None elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    """Count, mean and p50/p95/p99/max of a list of millisecond timings"""
+    def _rounded(value):
+        return None if value is None else round(value, 1)
+    return {
+        'count': len(values),
+        'mean': _rounded(sum(values) / len(values)) if values else None,
+        'p50': _rounded(percentile(values, 50)),
+        'p95': _rounded(percentile(values, 95)),
+        'p99': _rounded(percentile(values, 99)),
+        'max': _rounded(max(values)) if values else None
+    }
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """{"retrieval": 12.3, ...} from a "retrieval;dur=12.3, llm;dur=480.0" header"""
+    timings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                timings[name] = float(value)
+    return timings
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def corpus_rows(corpus: str, count: int, transcript_chars: int) -> List[Dict[str, Any]]:
+    """Rows for seeding: the corpus CSV (transcripts truncated) or generated text if it is missing"""
+    rows = []
+    if os.path.exists(corpus):
+        from upload_data_csvs import iter_csv_rows
+        for row in iter_csv_rows(corpus):
+            if not row.get('title') or not row.get('transcript'):
+                continue
+            row['transcript'] = row['transcript'][:transcript_chars]
+            rows.append(row)
+            if len(rows) == count:
+                break
+    rng = random.Random(0)
+    while len(rows) < count:
+        n = len(rows)
+        rows.append({
+            'date': '2024-01-01',
+            'title': f"Reviewing gadget number {n}",
+            'url': f"https://www.youtube.com/watch?v=loadtest{n:05d}",
+            'description': f"Gadget {n} review",
+            'transcript': " ".join(rng.choice(WORDS) for _ in range(transcript_chars // 6))
+        })
+    return rows
+
+def seed_store(path: str, creator_ids: Dict[str, int], creators: List[Dict[str, Any]], corpus: str,
+               rows_per_creator: int, transcript_chars: int) -> Dict[str, List[str]]:
+    """Fill a SQLite knowledge store for every creator and embed it; returns the seeded titles per creator"""
+    os.environ.setdefault("BACKFILL_CHECKPOINT_DIR", os.path.join(os.path.dirname(os.path.abspath(path)), "checkpoints"))
+    from creator_config import get_creator_config
+    from knowledge_store import SQLiteStore
+    from setup_embeddings import backfill_table
+
+    store = SQLiteStore(path)
+    store.upsert('creators', [
+        {'id': c['id'], 'name': c['name'], 'specialty': c['specialty'].strip('"'), 'description': c['description']}
+        for c in creators
+    ], on_conflict='id')
+
+    rows = corpus_rows(corpus, rows_per_creator * len(creator_ids), transcript_chars)
+    titles = {}
+    for i, (creator_name, creator_id) in enumerate(creator_ids.items()):
+        config = get_creator_config(creator_name)
+        key = config.get('id_column', 'id')
+        videos = rows[i * rows_per_creator:(i + 1) * rows_per_creator]
+        if 'text_columns' in config:
+            seeded = [{**row, 'id': f"{creator_id}-{n}", 'creator_id': creator_id} for n, row in enumerate(videos)]
+        else:
+            # The shared creator_knowledge table keeps text as content/source/metadata
+            seeded = [
+                {'id': f"{creator_id}-{n}", 'creator_id': creator_id, 'content': row['transcript'], 'source': row['title'],
+                 'metadata': {'title': row['title'], 'url': row['url'], 'date': row['date']}}
+                for n, row in enumerate(videos)
+            ]
+        store.upsert(config.get('knowledge_table', 'creator_knowledge'), seeded, on_conflict=key)
+        titles[creator_name] = [row['title'] for row in videos]
+
+    for creator_name in creator_ids:
+        backfill_table(creator_name, store=store, restart=True)
+    with open(path + ".titles.json", "w", encoding="utf-8") as f:
+        json.dump(titles, f)
+    return titles
+
+class ServerProcess:
+    """server.py (Flask) or asgi_server (uvicorn) running as a subprocess on a free port"""
+
+    def __init__(self, kind: str, env: Dict[str, str], log_path: str):
+        self.kind = kind
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        env = {**os.environ, **env, 'PORT': str(self.port), 'FLASK_DEBUG': 'false'}
+        if kind == 'asgi':
+            command = [sys.executable, '-m', 'uvicorn', 'asgi_server:app', '--host', '127.0.0.1',
+                       '--port', str(self.port), '--log-level', 'warning']
+        else:
+            command = [sys.executable, 'server.py']
+        self.log = open(log_path, 'w')
+        self.process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def wait_ready(self, timeout: float) -> Dict[str, Any]:
+        """Poll /api/health until the embedding model has loaded"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"server exited with code {self.process.returncode} (see {self.log.name})")
+            try:
+                health = requests.get(f"{self.base_url}/api/health", timeout=2).json()
+                if health.get('ready'):
+                    return health
+                if health.get('status') == 'degraded':
+                    raise RuntimeError(f"server is degraded: {health.get('error')} (see {self.log.name})")
+            except (requests.RequestException, ValueError):
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f"server not ready after {timeout:.0f}s (see {self.log.name})")
+
+    def health(self) -> Dict[str, Any]:
+        return requests.get(f"{self.base_url}/api/health", timeout=10).json()
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+class MemorySampler:
+    """Samples a process's RSS in the background; keeps the first, last and peak values"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[float] = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            value = rss_mb(self.pid)
+            if value is not None:
+                self.samples.append(value)
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        value = rss_mb(self.pid)
+        if value is not None:
+            self.samples.append(value)
+
+class LoadDriver:
+    """Runs multi-turn chat sessions against the server and records one result per request"""
+
+    def __init__(self, base_url: str, titles: Dict[str, List[str]], turns: int, stream_fraction: float,
+                 think_ms: float, timeout: float, seed: int = 0):
+        self.base_url = base_url
+        self.titles = titles
+        self.creators = list(titles)
+        self.turns = turns
+        self.stream_fraction = stream_fraction
+        self.think = think_ms / 1000
+        self.timeout = timeout
+        self.seed = seed
+        self.local = threading.local()
+        self.results: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+    def http(self) -> requests.Session:
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def question(self, rng: random.Random, creator: str, turn: int) -> str:
+        titles = self.titles.get(creator) or ["your latest video"]
+        if turn == 0:
+            return f"What did you think about {rng.choice(titles)}?"
+        return rng.choice(FOLLOW_UPS)
+
+    def chat(self, payload: Dict[str, Any], result: Dict[str, Any]):
+        started = time.perf_counter()
+        response = self.http().post(f"{self.base_url}/api/chat", json=payload, timeout=self.timeout)
+        result['total_ms'] = (time.perf_counter() - started) * 1000
+        result['status'] = response.status_code
+        result['server'] = parse_server_timing(response.headers.get('Server-Timing'))
+        body = response.json()
+        result['ok'] = response.status_code == 200 and 'error' not in body
+        result['rag_used'] = body.get('rag_used')
+        result['knowledge_entries'] = body.get('knowledge_entries', 0)
+        result['prompt_tokens'] = body.get('prompt_tokens', 0)
+
+    def stream(self, payload: Dict[str, Any], result: Dict[str, Any]):
+        started = time.perf_counter()
+        event = None
+        with self.http().post(f"{self.base_url}/api/chat/stream", json=payload, timeout=self.timeout, stream=True) as response:
+            result['status'] = response.status_code
+            result['server'] = parse_server_timing(response.headers.get('Server-Timing'))
+            result['ok'] = response.status_code == 200
+            for line in response.iter_lines():
+                if line.startswith(b"event:"):
+                    event = line[6:].strip().decode()
+                elif line.startswith(b"data:"):
+                    data = json.loads(line[5:])
+                    if event == 'meta':
+                        result['rag_used'] = data.get('rag_used')
+                        result['knowledge_entries'] = data.get('knowledge_entries', 0)
+                        result['prompt_tokens'] = data.get('prompt_tokens', 0)
+                    elif event == 'token' and 'first_token_ms' not in result:
+                        result['first_token_ms'] = (time.perf_counter() - started) * 1000
+                    elif event == 'error':
+                        result['ok'] = False
+                    elif event == 'done':
+                        break
+        result['total_ms'] = (time.perf_counter() - started) * 1000
+
+    def run_session(self, index: int, record: bool = True):
+        rng = random.Random(self.seed * 1000003 + index)
+        creator = self.creators[index % len(self.creators)]
+        session_id = f"loadtest-{self.seed}-{index}-{'run' if record else 'warmup'}"
+        for turn in range(self.turns):
+            mode = 'stream' if rng.random() < self.stream_fraction else 'chat'
+            result = {'creator': creator, 'turn': turn + 1, 'mode': mode, 'ok': False}
+            payload = {'message': self.question(rng, creator, turn), 'creator': creator, 'sessionId': session_id}
+            try:
+                (self.stream if mode == 'stream' else self.chat)(payload, result)
+            except Exception as e:
+                result['error'] = f"{e.__class__.__name__}: {e}"
+            if record:
+                with self.lock:
+                    self.results.append(result)
+            if self.think and turn + 1 < self.turns:
+                time.sleep(self.think * rng.uniform(0.5, 1.5))
+
+    def run(self, sessions: int, concurrency: int, record: bool = True) -> float:
+        """Run sessions with at most `concurrency` in flight; returns the wall time"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda i: self.run_session(i, record), range(sessions)))
+        return time.perf_counter() - started
+
+def build_report(results: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    ok = [r for r in results if r['ok']]
+    stages: Dict[str, List[float]] = {}
+    for r in ok:
+        stages.setdefault(f"{r['mode']}.total", []).append(r['total_ms'])
+        if 'first_token_ms' in r:
+            stages.setdefault('stream.first_token', []).append(r['first_token_ms'])
+        for stage, ms in r.get('server', {}).items():
+            stages.setdefault(f"server.{stage}", []).append(ms)
+
+    creators = {}
+    for name in dict.fromkeys(r['creator'] for r in results):
+        rows = [r for r in results if r['creator'] == name]
+        totals = summarize([r['total_ms'] for r in rows if r['ok']])
+        prompt_tokens = [r['prompt_tokens'] for r in rows if r['ok'] and r.get('prompt_tokens')]
+        creators[name] = {
+            'requests': len(rows),
+            'errors': sum(not r['ok'] for r in rows),
+            'rag_used': sum(bool(r.get('rag_used')) for r in rows),
+            'knowledge_results': sum(r.get('knowledge_entries') or 0 for r in rows if r['ok']),
+            'prompt_tokens_p50': summarize(prompt_tokens)['p50'] if prompt_tokens else 0,
+            'p50': totals['p50'],
+            'p95': totals['p95']
+        }
+
+    turns = {}
+    for turn in sorted({r['turn'] for r in ok}):
+        turns[str(turn)] = summarize([r['total_ms'] for r in ok if r['turn'] == turn])
+
+    errors = [r.get('error') or f"HTTP {r.get('status')}" for r in results if not r['ok']]
+    return {
+        'summary': {
+            'requests': len(results),
+            'errors': len(errors),
+            'error_rate': round(len(errors) / max(len(results), 1), 4),
+            'seconds': round(seconds, 2),
+            'rps': round(len(results) / max(seconds, 1e-9), 2),
+            'rag_used_rate': round(sum(bool(r.get('rag_used')) for r in ok) / max(len(ok), 1), 3),
+            'sample_errors': sorted(set(errors))[:5]
+        },
+        'stages': {stage: summarize(values) for stage, values in sorted(stages.items())},
+        'creators': creators,
+        'turns': turns
+    }
+
+def retrieval_failures(report: Dict[str, Any]) -> List[str]:
+    """Creators that were served without retrieved knowledge, which would make the run measure the wrong path"""
+    return [name for name, stats in report['creators'].items()
+            if not stats['knowledge_results'] or not stats['prompt_tokens_p50']]
+
+def comparable_metrics(report: Dict[str, Any]) -> Dict[str, float]:
+    """Flatten the numbers worth comparing between runs"""
+    metrics = {'summary.rps': report.get('summary', {}).get('rps')}
+    for stage, values in report.get('stages', {}).items():
+        for pct in ('p50', 'p95', 'p99'):
+            metrics[f"{stage}.{pct}"] = values.get(pct)
+    metrics['memory.rss_growth_mb'] = report.get('memory', {}).get('rss_growth_mb')
+    return {name: value for name, value in metrics.items() if value is not None}
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print the change of every shared metric; returns the ones that got worse by more than tolerance %"""
+    before, after = comparable_metrics(baseline), comparable_metrics(current)
+    regressions = []
+    print(f"📋 Compared with {baseline.get('run', {}).get('started_at')} (commit {baseline.get('run', {}).get('git_commit')}):")
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = (new - old) / abs(old) * 100 if old else 0.0
+        worse = -change if name in COMPARE_HIGHER_IS_BETTER else change
+        # Small absolute changes (under 1ms, or 5MB of memory) are noise however large in percent
+        if name not in COMPARE_HIGHER_IS_BETTER and abs(new - old) < (5 if name.startswith('memory.') else 1):
+            worse = 0.0
+        status = "⚠️" if worse > tolerance else "✅"
+        if worse > tolerance:
+            regressions.append(name)
+        print(f"   {status} {name:<28} {old:>10} -> {new:<10} ({change:+.1f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=['flask', 'asgi'], default='flask', help='server.py or asgi_server under uvicorn')
+    parser.add_argument('--sessions', type=int, default=100, help='sessions measured (spread round-robin over the creators)')
+    parser.add_argument('--concurrency', type=int, default=16, help='sessions in flight at once')
+    parser.add_argument('--turns', type=int, default=3, help='messages per session')
+    parser.add_argument('--stream-fraction', type=float, default=0.5, help='share of messages sent to /api/chat/stream')
+    parser.add_argument('--think-ms', type=float, default=0, help='pause between turns of a session')
+    parser.add_argument('--warmup-sessions', type=int, default=5, help='unmeasured sessions run first (model, indexes, pools)')
+    parser.add_argument('--timeout', type=float, default=120, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    llm = parser.add_argument_group('fake LLM')
+    llm.add_argument('--llm-url', help='use this completion API instead of starting the fake one')
+    llm.add_argument('--ttft-ms', type=float, default=200, help='delay before the first token')
+    llm.add_argument('--token-ms', type=float, default=20, help='delay between tokens')
+    llm.add_argument('--tokens', type=int, default=60, help='tokens per completion')
+    llm.add_argument('--llm-error-rate', type=float, default=0.0, help='fraction of completion calls answered with 503')
+    store = parser.add_argument_group('knowledge store')
+    store.add_argument('--store', help='SQLite knowledge store to use; seeded if it does not exist (default: a temp file)')
+    store.add_argument('--corpus', default=DEFAULT_CORPUS, help='CSV the seeded rows are taken from')
+    store.add_argument('--rows-per-creator', type=int, default=40)
+    store.add_argument('--transcript-chars', type=int, default=4000, help='seeded transcripts are cut to this length')
+    parser.add_argument('--response-cache', action='store_true', help='leave the semantic response cache on')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE', help='extra server environment (repeatable)')
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--output', help='results JSON (default: benchmarks/results/load_test_<time>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=10.0, help='%% change counted as a regression by --compare')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 if --compare finds a regression')
+    args = parser.parse_args()
+
+    from server import CREATOR_ID_MAP, CREATORS
+
+    workdir = tempfile.mkdtemp(prefix="chat_load_test_")
+    store_path = os.path.abspath(args.store or os.path.join(workdir, "knowledge.db"))
+    if os.path.exists(store_path) and os.path.exists(store_path + ".titles.json"):
+        print(f"ℹ️ Reusing knowledge store {store_path}")
+        with open(store_path + ".titles.json", encoding="utf-8") as f:
+            titles = json.load(f)
+    else:
+        print(f"🧮 Seeding {store_path} with {args.rows_per_creator} rows per creator")
+        titles = seed_store(store_path, CREATOR_ID_MAP, CREATORS, args.corpus, args.rows_per_creator, args.transcript_chars)
+
+    fake_llm = None
+    if args.llm_url:
+        llm_url = args.llm_url
+    else:
+        fake_llm = FakeLLMServer(ttft_ms=args.ttft_ms, token_ms=args.token_ms, tokens=args.tokens,
+                                 error_rate=args.llm_error_rate, seed=args.seed).start()
+        llm_url = fake_llm.url
+        print(f"🚀 Fake LLM API at {llm_url} (first token {args.ttft_ms}ms, {args.tokens} tokens x {args.token_ms}ms)")
+
+    env = {
+        'GROQ_API_URL': llm_url,
+        'GROQ_API_KEY': os.getenv('GROQ_API_KEY', 'load-test') if args.llm_url else 'load-test',
+        'RAG_KNOWLEDGE_STORE': 'sqlite',
+        'RAG_SQLITE_PATH': store_path,
+        'RAG_RETRIEVAL_BACKEND': 'supabase',
+        'RESPONSE_CACHE_ENABLED': 'true' if args.response_cache else 'false',
+        'EMBEDDING_WARMUP': 'true',
+        'GROQ_POOL_SIZE': str(max(20, args.concurrency)),
+    }
+    env.update(item.split('=', 1) for item in args.env)
+
+    server = ServerProcess(args.server, env, os.path.join(workdir, "server.log"))
+    print(f"🚀 Starting {args.server} server on port {server.port} (log: {server.log.name})")
+    try:
+        started = time.time()
+        server.wait_ready(args.startup_timeout)
+        print(f"✅ Server ready in {time.time() - started:.1f}s")
+
+        driver = LoadDriver(server.base_url, titles, args.turns, args.stream_fraction, args.think_ms, args.timeout, args.seed)
+        if args.warmup_sessions:
+            driver.run(max(args.warmup_sessions, len(titles)), min(args.concurrency, len(titles)), record=False)
+        health_before = server.health()
+        sampler = MemorySampler(server.pid).start()
+
+        print(f"🔥 {args.sessions} sessions x {args.turns} turns, {args.concurrency} concurrent, "
+              f"{args.stream_fraction:.0%} streamed, across {len(titles)} creators")
+        seconds = driver.run(args.sessions, args.concurrency)
+        sampler.stop()
+        health_after = server.health()
+    finally:
+        server.stop()
+        if fake_llm:
+            fake_llm.stop()
+
+    report = {
+        'run': {
+            'started_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'git_commit': git_commit(),
+            'server': args.server,
+            'sessions': args.sessions,
+            'concurrency': args.concurrency,
+            'turns': args.turns,
+            'stream_fraction': args.stream_fraction,
+            'think_ms': args.think_ms,
+            'llm': {'url': args.llm_url} if args.llm_url else {
+                'ttft_ms': args.ttft_ms, 'token_ms': args.token_ms, 'tokens': args.tokens, 'error_rate': args.llm_error_rate
+            },
+            'rows_per_creator': args.rows_per_creator,
+            'response_cache': args.response_cache,
+            'env': dict(item.split('=', 1) for item in args.env)
+        },
+        **build_report(driver.results, seconds)
+    }
+    samples = sampler.samples
+    report['memory'] = {
+        'rss_start_mb': round(samples[0], 1) if samples else None,
+        'rss_end_mb': round(samples[-1], 1) if samples else None,
+        'rss_peak_mb': round(max(samples), 1) if samples else None,
+        'rss_growth_mb': round(samples[-1] - samples[0], 1) if samples else None,
+        'session_bytes_start': health_before.get('sessions', {}).get('bytes'),
+        'session_bytes_end': health_after.get('sessions', {}).get('bytes'),
+        'sessions_end': health_after.get('sessions', {}).get('sessions')
+    }
+    report['server_stats'] = {key: health_after.get(key) for key in ('llm_client', 'retrieval', 'creator_cache', 'response_cache', 'sessions')}
+    if fake_llm:
+        report['llm_api'] = dict(fake_llm.stats)
+
+    summary = report['summary']
+    print(f"🎉 {summary['requests']} requests in {summary['seconds']}s: {summary['rps']} req/s, "
+          f"{summary['errors']} errors, knowledge used for {summary['rag_used_rate']:.0%}")
+    for stage, values in report['stages'].items():
+        print(f"   {stage:<20} p50 {values['p50']:>8}ms  p95 {values['p95']:>8}ms  p99 {values['p99']:>8}ms  (n={values['count']})")
+    memory = report['memory']
+    if memory['rss_start_mb'] is not None:
+        print(f"💾 Server RSS {memory['rss_start_mb']} -> {memory['rss_end_mb']} MB "
+              f"(peak {memory['rss_peak_mb']}, growth {memory['rss_growth_mb']:+} MB), session store {memory['session_bytes_end']} bytes")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    missing = retrieval_failures(report)
+    if missing:
+        print(f"❌ No knowledge retrieved (or no prompt tokens reported) for: {', '.join(missing)}; "
+              f"see {server.log.name}")
+        sys.exit(1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"⚠️ {len(regressions)} metric(s) worse by more than {args.tolerance}%: {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+In-memory BM25 inverted index for exact-term retrieval.
+Product names ("Vision Pro", "S24 Ultra") are where sentence embeddings are weakest,
+so lexical scores are fused with vector scores by rank, and the lexical stage can
+narrow the candidate set before vector scoring.
+"""
+
+import re
+import math
+import bisect
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, List, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric terms ("S24 Ultra" -> ["s24", "ultra"])"""
+    return _TERM_PATTERN.findall((text or "").lower())
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """Create an empty index; documents are addressed by their insertion position"""
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        # term -> ([doc positions], [term frequencies]); frozen to arrays on first search
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, texts: Sequence[str]) -> None:
+        """Index documents, appending them after the existing ones"""
+        for text in texts:
+            position = len(self.doc_lengths)
+            terms = tokenize(text)
+            self.doc_lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                docs, freqs = self._postings[term]
+                docs.append(position)
+                freqs.append(count)
+        self._arrays.clear()
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            docs, freqs = self._postings.get(term, ([], []))
+            arrays = (np.asarray(docs, dtype=np.int64), np.asarray(freqs, dtype=np.float32))
+            self._arrays[term] = arrays
+        return arrays
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for the query (0 for documents with no query term)"""
+        n = len(self.doc_lengths)
+        scores = np.zeros(n, dtype=np.float32)
+        if not n:
+            return scores
+        lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        for term in set(tokenize(query)):
+            docs, freqs = self._posting_arrays(term)
+            if not docs.size:
+                continue
+            idf = math.log(1 + (n - docs.size + 0.5) / (docs.size + 0.5))
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + length_norm[docs])
+        return scores
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """(position, score) of the top-k documents containing at least one query term"""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores > 0)
+        if not matched.size:
+            return []
+        k = min(k, matched.size)
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def postings(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """Sorted terms, posting offsets (len(terms) + 1), and concatenated doc positions and frequencies"""
+        terms = sorted(self._postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum([len(self._postings[term][0]) for term in terms], dtype=np.uint64)
+        docs = np.fromiter((d for term in terms for d in self._postings[term][0]), dtype=np.uint32, count=int(offsets[-1]))
+        freqs = np.fromiter((f for term in terms for f in self._postings[term][1]), dtype=np.uint32, count=int(offsets[-1]))
+        return terms, offsets, docs, freqs
+
+class FrozenBM25Index(BM25Index):
+    """Read-only BM25 index over postings written by BM25Index.postings() (e.g. memory-mapped)"""
+
+    def __init__(self, doc_lengths: np.ndarray, terms: Sequence[str], offsets: np.ndarray,
+                 docs: np.ndarray, freqs: np.ndarray, k1: float = 1.5, b: float = 0.75):
+        super().__init__(k1, b)
+        self.doc_lengths = doc_lengths
+        self._terms = terms
+        self._offsets = offsets
+        self._docs = docs
+        self._freqs = freqs
+
+    def add(self, texts: Sequence[str]) -> None:
+        raise TypeError("Frozen BM25 indexes are read-only")
+
+    def _posting_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Terms are sorted, so a lookup is a binary search that decodes only a few terms
+        i = bisect.bisect_left(self._terms, term)
+        if i == len(self._terms) or self._terms[i] != term:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._docs[start:end].astype(np.int64), self._freqs[start:end].astype(np.float32)
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuse best-first rankings: each item scores sum(1 / (k + rank)) over the lists it appears in"""
+    fused: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Build the memory-mapped index file for creators with a local corpus
+Writes to the creator's `index_file` path and atomically replaces any previous file,
+so running servers pick up the new index without a restart
+"""
+
+import os
+import sys
+import argparse
+import numpy as np
+
+# Add current directory to path to import rag_service
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from creator_config import CREATOR_SUPABASE_CONFIG
+from rag_service import rag_service, EMBEDDING_MODEL_NAME, INDEX_STORAGE
+from vector_index import load_csv_records
+from index_file import write_index_file
+from response_cache import mark_corpus_updated
+
+def build_index_file(creator_name: str, storage: str = INDEX_STORAGE) -> bool:
+    """Chunk, embed and write one creator's corpus as an index file"""
+    config = CREATOR_SUPABASE_CONFIG.get(creator_name, {})
+    if not config.get('local_corpus') or not config.get('index_file'):
+        print(f"ℹ️ {creator_name}: no local_corpus/index_file configured, skipping")
+        return False
+
+    corpus_path = rag_service._resolve_path(config['local_corpus'])
+    index_path = rag_service._resolve_path(config['index_file'])
+    if not os.path.exists(corpus_path):
+        print(f"❌ {creator_name}: corpus not found at {corpus_path}")
+        return False
+
+    print(f"🚀 Building index file for {creator_name} from {corpus_path}")
+    chunks = rag_service.chunk_entries(load_csv_records(corpus_path))
+    vectors = rag_service.embed_entries(chunks)
+    kept = [(chunk, vector) for chunk, vector in zip(chunks, vectors) if vector is not None]
+    if not kept:
+        print(f"❌ {creator_name}: no chunks could be embedded")
+        return False
+
+    write_index_file(
+        index_path,
+        [chunk['chunk_id'] for chunk, _ in kept],
+        np.stack([vector for _, vector in kept]),
+        [chunk for chunk, _ in kept],
+        storage=storage,
+        meta={'model': EMBEDDING_MODEL_NAME, 'corpus': config['local_corpus']},
+        lexical=rag_service.build_lexical_index([chunk for chunk, _ in kept])
+    )
+    # Cached answers were produced from the old corpus
+    mark_corpus_updated(creator_name)
+    print(f"✅ {creator_name}: {len(kept)} chunks written to {index_path} ({storage})")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Build memory-mapped index files for local corpora")
+    parser.add_argument('--creator', help='only build this creator (default: every configured creator)')
+    parser.add_argument('--storage', default=INDEX_STORAGE, choices=['float32', 'float16', 'int8'])
+    args = parser.parse_args()
+
+    creators = [args.creator] if args.creator else list(CREATOR_SUPABASE_CONFIG)
+    built = sum(build_index_file(creator, args.storage) for creator in creators)
+    print(f"🎉 Built {built} index file(s)")
+
+if __name__ == "__main__":
+    main()
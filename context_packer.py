@@ -0,0 +1,113 @@
+"""
+Token-budgeted packing of retrieved knowledge into the system prompt.
+Entries are added in relevance order until the budget is spent; an entry that does
+not fit whole is trimmed to the sentences around its best match for the query.
+"""
+
+import re
+import math
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Too common to say anything about which part of a transcript matches
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have how i if in is it its
+me my of on or should so than that the their them then there these they this to
+was we were what when which who why will with would you your
+""".split())
+
+# Entries with less room than this left are skipped rather than trimmed to a fragment
+MIN_TRIM_TOKENS = 48
+# Chat formats add a few tokens per message for the role and separators
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: ~4 characters per token per word, 1 per punctuation mark"""
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN_PATTERN.findall(text or ""))
+
+def estimate_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Approximate prompt tokens of a chat message list"""
+    return sum(estimate_tokens(message.get('content')) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def query_terms(query: str) -> List[str]:
+    return [term for term in _TERM_PATTERN.findall(query.lower()) if term not in STOPWORDS]
+
+def trim_to_best_span(content: str, terms: List[str], budget: int,
+                      count_tokens: Callable[[str], int] = estimate_tokens) -> str:
+    """Keep the sentence with the most query-term hits plus as many neighbours as fit in budget"""
+    sentences = [s for s in _SENTENCE_PATTERN.split(content) if s.strip()]
+    if not sentences:
+        return ""
+    scores = [sum(sentence.lower().count(term) for term in terms) for sentence in sentences]
+    best = max(range(len(sentences)), key=lambda i: scores[i])
+    costs = [count_tokens(sentence) for sentence in sentences]
+
+    # A single sentence over budget is cut by words
+    if costs[best] > budget:
+        words = sentences[best].split()
+        return " ".join(words[:max(1, int(len(words) * budget / costs[best]))]) + " ..."
+
+    start, end, used = best, best + 1, costs[best]
+    # Grow alternately after and before the best sentence while it still fits
+    while True:
+        grew = False
+        if end < len(sentences) and used + costs[end] <= budget:
+            used += costs[end]
+            end += 1
+            grew = True
+        if start > 0 and used + costs[start - 1] <= budget:
+            start -= 1
+            used += costs[start]
+            grew = True
+        if not grew:
+            break
+
+    text = " ".join(sentences[start:end])
+    if start > 0:
+        text = "... " + text
+    if end < len(sentences):
+        text += " ..."
+    return text
+
+def pack_context(items: List[Tuple[str, str, Optional[int]]], query: str, budget: int,
+                 count_tokens: Callable[[str], int] = estimate_tokens,
+                 separator: str = "\n\n") -> Dict[str, Any]:
+    """Pack (header, content, content_tokens) items, most relevant first, into at most budget tokens"""
+    terms = query_terms(query)
+    separator_tokens = count_tokens(separator)
+    parts = []
+    used = 0
+    trimmed = 0
+    for header, content, content_tokens in items:
+        if not content:
+            continue
+        if content_tokens is None:
+            content_tokens = count_tokens(content)
+        header_tokens = count_tokens(header)
+        overhead = header_tokens + (separator_tokens if parts else 0)
+        remaining = budget - used - overhead
+
+        if content_tokens <= remaining:
+            parts.append(header + content)
+            used += overhead + content_tokens
+            continue
+        if remaining < MIN_TRIM_TOKENS:
+            continue
+
+        # Leave room for the "..." markers around the excerpt (3 tokens each)
+        excerpt = trim_to_best_span(content, terms, remaining - 6, count_tokens)
+        if excerpt:
+            parts.append(header + excerpt)
+            used += overhead + count_tokens(excerpt)
+            trimmed += 1
+
+    return {
+        'text': separator.join(parts),
+        'tokens': used,
+        'entries_used': len(parts),
+        'entries_trimmed': trimmed,
+        'entries_dropped': len(items) - len(parts)
+    }
@@ -0,0 +1,69 @@
+"""
+Per-creator metadata cache.
+Holds rows from each creator's `creators` table and the retrieval method that is
+known to work for that creator, so neither has to be looked up on every chat.
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Optional
+from creator_config import CREATOR_SUPABASE_CONFIG
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Creator metadata changes maybe once a month; an hour keeps it reasonably fresh
+CREATOR_CACHE_TTL = float(os.getenv('CREATOR_CACHE_TTL', '3600'))
+
+# 'rpc' = match_creator_knowledge works, 'table' = scan the knowledge table, 'none' = no knowledge store
+RETRIEVAL_METHODS = ('rpc', 'table', 'none')
+
+class CreatorMetadataCache:
+    def __init__(self, ttl: float = CREATOR_CACHE_TTL):
+        """Create empty info and capability caches sharing one TTL"""
+        self.info = TTLCache(maxsize=256, ttl=ttl)
+        self.methods = TTLCache(maxsize=256, ttl=ttl)
+
+    def get_info(self, creator_name: str, creator_id: int) -> Optional[Dict[str, Any]]:
+        """Cached creators-table row ({} if known to be missing), or None on a miss"""
+        return self.info.get((creator_name, creator_id))
+
+    def set_info(self, creator_name: str, creator_id: int, info: Dict[str, Any]) -> None:
+        self.info.set((creator_name, creator_id), info)
+
+    def get_method(self, creator_name: str) -> Optional[str]:
+        """Retrieval method known to work for the creator, or None if not probed yet"""
+        return self.methods.get(creator_name)
+
+    def set_method(self, creator_name: str, method: str) -> None:
+        if method not in RETRIEVAL_METHODS:
+            raise ValueError(f"Unknown retrieval method: {method}")
+        if self.methods.get(creator_name) != method:
+            logger.info(f"🔎 Retrieval method for {creator_name}: {method}")
+        self.methods.set(creator_name, method)
+
+    def invalidate(self, creator_name: Optional[str] = None) -> None:
+        """Forget cached metadata for one creator, or for everyone"""
+        if creator_name is None:
+            self.info.invalidate()
+            self.methods.invalidate()
+            return
+        self.info.invalidate_where(lambda key: key[0] == creator_name)
+        self.methods.invalidate(creator_name)
+
+    def prime_from_config(self, config: Dict[str, Dict[str, Any]] = CREATOR_SUPABASE_CONFIG,
+                          default_store: str = 'supabase') -> List[str]:
+        """Record creators without a knowledge store; returns the ones that still need probing"""
+        to_probe = []
+        for creator_name, creator_config in config.items():
+            # SQLite-backed creators need no Supabase project
+            if creator_config.get('knowledge_store', default_store) == 'sqlite':
+                to_probe.append(creator_name)
+            elif creator_config.get('supabase_url') and creator_config.get('supabase_key'):
+                to_probe.append(creator_name)
+            else:
+                self.set_method(creator_name, 'none')
+        return to_probe
+
+    def stats(self) -> Dict[str, Any]:
+        return {'info': self.info.stats(), 'methods': self.methods.stats()}
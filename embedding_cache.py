@@ -0,0 +1,166 @@
+"""
+Content-addressed embedding cache shared by the serving path and ingestion scripts.
+Vectors are keyed by model name and a SHA-256 hash of the embedded text, and are
+persisted to disk so a given piece of text is only ever encoded once per model.
+New vectors are kept in memory and written in batches by a background thread (every
+save_every new vectors, or save_interval seconds after the first unsaved one), and
+once more at interpreter exit, so lookups on the request path never wait on the file.
+"""
+
+import os
+import atexit
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "EMBEDDING_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "embedding_cache")
+)
+# New vectors that trigger a background save, and the longest an unsaved vector waits (0 = no timer)
+SAVE_EVERY = int(os.getenv("EMBEDDING_CACHE_SAVE_EVERY", "256"))
+SAVE_INTERVAL = float(os.getenv("EMBEDDING_CACHE_SAVE_INTERVAL", "30"))
+
+def text_hash(text: str) -> str:
+    """Return the content hash used as the cache key for a piece of text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, cache_dir: str = DEFAULT_CACHE_DIR,
+                 save_every: int = SAVE_EVERY, save_interval: float = SAVE_INTERVAL):
+        """Create a cache for one embedding model (one file per model on disk)"""
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.save_every = max(1, save_every)
+        self.save_interval = save_interval
+        safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        self.path = os.path.join(cache_dir, f"{safe_name}.npz")
+
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._pending: Dict[str, np.ndarray] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        # Serializes writers, so lookups only wait on _lock while the file is written
+        self._save_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due_now = False
+        self.hits = 0
+        self.misses = 0
+        atexit.register(self.save)
+
+    def _read_file(self) -> Dict[str, np.ndarray]:
+        """Read all vectors currently persisted for this model"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model"]) != self.model_name:
+                    logger.warning(f"⚠️ Embedding cache {self.path} belongs to another model, ignoring it")
+                    return {}
+                return dict(zip(data["keys"].tolist(), data["vectors"]))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read embedding cache {self.path}: {e}")
+            return {}
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._vectors = self._read_file()
+            self._loaded = True
+            if self._vectors:
+                logger.info(f"✅ Loaded {len(self._vectors)} cached embeddings for {self.model_name}")
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached vector for text, or None on a miss"""
+        key = text_hash(text)
+        with self._lock:
+            self._ensure_loaded()
+            vector = self._vectors.get(key)
+            if vector is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vector
+
+    def get_many(self, texts: List[str]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        """Look up several texts at once; returns (found by position, missing positions)"""
+        found, missing = {}, []
+        with self._lock:
+            self._ensure_loaded()
+            for i, text in enumerate(texts):
+                vector = self._vectors.get(text_hash(text))
+                if vector is None:
+                    missing.append(i)
+                else:
+                    found[i] = vector
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, text: str, vector) -> None:
+        """Store the vector for text (written to disk later by a background save)"""
+        key = text_hash(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._ensure_loaded()
+            self._vectors[key] = vector
+            self._pending[key] = vector
+            self._schedule_save()
+
+    def _schedule_save(self):
+        """Start (or bring forward) the background save; called with _lock held"""
+        due_now = len(self._pending) >= self.save_every
+        if not due_now and self.save_interval <= 0:
+            return
+        if self._timer is not None:
+            if not due_now or self._timer_due_now:
+                return
+            # A full batch goes out now rather than at the timer's deadline
+            self._timer.cancel()
+        self._timer = threading.Timer(0 if due_now else self.save_interval, self._background_save)
+        self._timer.daemon = True
+        self._timer_due_now = due_now
+        self._timer.start()
+
+    def _background_save(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.save()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save embedding cache {self.path}: {e}")
+
+    def save(self) -> None:
+        """Persist new vectors now, merging with anything other processes wrote meanwhile"""
+        with self._save_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                saved = list(self._pending)
+                merged = dict(self._vectors)
+            merged = {**self._read_file(), **merged}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    model=np.array(self.model_name),
+                    keys=np.array(list(merged.keys())),
+                    vectors=np.stack(list(merged.values())).astype(np.float32)
+                )
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                # Vectors other processes saved become visible here too
+                for key, vector in merged.items():
+                    self._vectors.setdefault(key, vector)
+                for key in saved:
+                    self._pending.pop(key, None)
+        logger.info(f"💾 Saved {len(merged)} embeddings to {self.path}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of stored vectors"""
+        with self._lock:
+            return {"entries": len(self._vectors), "unsaved": len(self._pending), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,90 @@
+"""
+Lazily-initialized, process-wide embedding model holder.
+The SentenceTransformer is only loaded on first use (or by an explicit warmup),
+and every component in the process shares the same instance.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingModelHolder:
+    def __init__(self, model_name: str, num_threads: int = 0):
+        """Describe the model to load; nothing is loaded until get() or warmup()"""
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self._model = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self._attempted = False
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self) -> Optional[Any]:
+        """Return the model, loading it on first call (None if loading failed)"""
+        if self._model is not None or self._attempted:
+            return self._model
+
+        with self._lock:
+            if self._attempted:
+                return self._model
+            self._loading = True
+            started = time.perf_counter()
+            try:
+                # Imported here so importing this module does not pull in torch
+                from sentence_transformers import SentenceTransformer
+                if self.num_threads > 0:
+                    import torch
+                    torch.set_num_threads(self.num_threads)
+                self._model = SentenceTransformer(self.model_name, device='cpu')
+                self.load_seconds = time.perf_counter() - started
+                logger.info(f"✅ Embedding model {self.model_name} loaded in {self.load_seconds:.1f}s")
+            except Exception as e:
+                self.error = str(e)
+                logger.error(f"❌ Embedding model failed to load: {e}")
+            finally:
+                self._attempted = True
+                self._loading = False
+        return self._model
+
+    def warmup(self, background: bool = True) -> Optional[threading.Thread]:
+        """Load the model and run one encode so the first request pays nothing"""
+        def _warm():
+            model = self.get()
+            if model is not None:
+                model.encode("warmup")
+                logger.info("🔥 Embedding model warmed up")
+
+        if not background:
+            _warm()
+            return None
+        thread = threading.Thread(target=_warm, name="embedding-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness information for health checks"""
+        return {
+            'model': self.model_name,
+            'loaded': self.is_loaded,
+            'loading': self._loading,
+            'error': self.error,
+            'load_seconds': round(self.load_seconds, 2) if self.load_seconds is not None else None
+        }
+
+_holders: Dict[str, EmbeddingModelHolder] = {}
+_holders_lock = threading.Lock()
+
+def get_shared_model(model_name: str, num_threads: int = 0) -> EmbeddingModelHolder:
+    """Return the single holder for model_name in this process"""
+    with _holders_lock:
+        if model_name not in _holders:
+            _holders[model_name] = EmbeddingModelHolder(model_name, num_threads)
+        return _holders[model_name]
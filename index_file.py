@@ -0,0 +1,175 @@
+"""
+Versioned on-disk index format, opened with mmap for zero-copy access.
+Worker processes that map the same file share its pages through the OS page cache, so
+opening an index costs a header parse rather than loading every embedding. An ingest
+job writes a new file next to the old one and renames it over the top; readers notice
+the swap and reopen, while in-flight queries keep using the old mapping.
+
+Layout (little-endian):
+    magic "CWMINDEX" | u32 format version | u32 header length | JSON header
+    sections, each 64-byte aligned, located by (offset, length) in the header:
+    vectors (count x dim, float32/float16/int8), scales (float32, int8 only),
+    id_offsets (u64, count + 1) + ids (utf-8 blob),
+    record_offsets (u64, count + 1) + records (utf-8 JSON blob),
+    optional BM25 postings: bm25_doc_lengths (u32, count), bm25_term_offsets (u64) +
+    bm25_terms (sorted utf-8 blob), bm25_posting_offsets (u64) + bm25_docs/bm25_freqs (u32)
+"""
+
+import os
+import mmap
+import json
+import time
+import struct
+import logging
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional
+import numpy as np
+from vector_index import VectorIndex, normalize_rows, quantize
+from bm25_index import BM25Index, FrozenBM25Index
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CWMINDEX"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sII")
+
+def _blob(items: List[bytes]) -> tuple:
+    """Concatenate byte strings; returns (offsets array of len(items) + 1, blob)"""
+    offsets = np.zeros(len(items) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(item) for item in items], dtype=np.uint64)
+    return offsets, b"".join(items)
+
+def write_index_file(path: str, ids: List[str], vectors, records: List[Dict[str, Any]],
+                     storage: str = 'float32', meta: Optional[Dict[str, Any]] = None,
+                     lexical: Optional[BM25Index] = None) -> None:
+    """Write an index file atomically (temp file, fsync, rename over path), with the BM25 postings if given"""
+    matrix, scales = quantize(normalize_rows(vectors), storage) if len(ids) else (np.zeros((0, 0), dtype=np.float32), None)
+    if len(records) != len(ids) or matrix.shape[0] != len(ids):
+        raise ValueError(f"Expected {len(ids)} vectors and records, got {matrix.shape[0]} and {len(records)}")
+    id_offsets, id_blob = _blob([str(i).encode('utf-8') for i in ids])
+    record_offsets, record_blob = _blob([json.dumps(r, default=str).encode('utf-8') for r in records])
+
+    sections = [('vectors', matrix.tobytes()), ('id_offsets', id_offsets.tobytes()), ('ids', id_blob),
+                ('record_offsets', record_offsets.tobytes()), ('records', record_blob)]
+    if scales is not None:
+        sections.insert(1, ('scales', scales.tobytes()))
+    if lexical is not None:
+        if len(lexical) != len(ids):
+            raise ValueError(f"Expected BM25 postings for {len(ids)} documents, got {len(lexical)}")
+        terms, posting_offsets, docs, freqs = lexical.postings()
+        term_offsets, term_blob = _blob([term.encode('utf-8') for term in terms])
+        sections += [('bm25_doc_lengths', np.asarray(lexical.doc_lengths, dtype=np.uint32).tobytes()),
+                     ('bm25_term_offsets', term_offsets.tobytes()), ('bm25_terms', term_blob),
+                     ('bm25_posting_offsets', posting_offsets.tobytes()),
+                     ('bm25_docs', docs.tobytes()), ('bm25_freqs', freqs.tobytes())]
+
+    header = {
+        'count': len(ids),
+        'dim': int(matrix.shape[1]) if len(ids) else 0,
+        'storage': storage,
+        'created_at': time.time(),
+        'meta': meta or {},
+        'bm25': {'k1': lexical.k1, 'b': lexical.b} if lexical is not None else None,
+        'sections': {}
+    }
+    # Section offsets depend on the header length, so reserve room for the offsets first
+    for name, data in sections:
+        header['sections'][name] = [0, len(data)]
+    reserved = len(json.dumps(header).encode('utf-8')) + 32 * len(sections)
+    offset = _PREFIX.size + reserved
+    for name, data in sections:
+        offset += -offset % ALIGNMENT
+        header['sections'][name] = [offset, len(data)]
+        offset += len(data)
+    header_bytes = json.dumps(header).encode('utf-8').ljust(reserved)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, data in sections:
+            f.write(b"\0" * (header['sections'][name][0] - f.tell()))
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    logger.info(f"💾 Wrote index file {path}: {len(ids)} vectors ({storage})")
+
+class _BlobSequence(Sequence):
+    """Read-only sequence decoding items from an offsets table into a mapped blob"""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview, decode):
+        self._offsets = offsets
+        self._blob = blob
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return max(0, self._offsets.shape[0] - 1)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        start, end = int(self._offsets[position]), int(self._offsets[position + 1])
+        return self._decode(self._blob[start:end])
+
+class MappedIndex(VectorIndex):
+    def __init__(self, path: str, check_interval: float = 2.0):
+        """Map an index file; vectors, ids and records are read straight from the mapping"""
+        self.path = path
+        self.check_interval = check_interval
+        with open(path, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._last_check = time.monotonic()
+        self._replaced = False
+
+        magic, version, header_length = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an index file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has index format version {version}, expected {FORMAT_VERSION}")
+        header = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_length])
+        self.meta = header.get('meta', {})
+        buffer = memoryview(self._mmap)
+
+        def section(name: str, dtype=None):
+            offset, length = header['sections'][name]
+            view = buffer[offset:offset + length]
+            return np.frombuffer(view, dtype=dtype) if dtype is not None else view
+
+        count, dim, storage = header['count'], header['dim'], header['storage']
+        super().__init__(dim, storage)
+        self.matrix = section('vectors', np.dtype(storage)).reshape(count, dim)
+        self.scales = section('scales', np.float32) if 'scales' in header['sections'] else None
+        self.ids = _BlobSequence(section('id_offsets', np.uint64), section('ids'), lambda b: str(b, 'utf-8'))
+        self.records = _BlobSequence(section('record_offsets', np.uint64), section('records'), lambda b: json.loads(str(b, 'utf-8')))
+        # BM25 postings are read from the mapping too, so workers share them instead of each building one
+        self.lexical: Optional[FrozenBM25Index] = None
+        if header.get('bm25') and 'bm25_docs' in header['sections']:
+            self.lexical = FrozenBM25Index(
+                section('bm25_doc_lengths', np.uint32),
+                _BlobSequence(section('bm25_term_offsets', np.uint64), section('bm25_terms'), lambda b: str(b, 'utf-8')),
+                section('bm25_posting_offsets', np.uint64), section('bm25_docs', np.uint32), section('bm25_freqs', np.uint32),
+                **header['bm25']
+            )
+
+    def add(self, ids, vectors, records) -> None:
+        raise TypeError("Index files are read-only; write a new file and swap it in")
+
+    def is_stale(self) -> bool:
+        """True once the file at path was replaced (checked at most every check_interval seconds)"""
+        now = time.monotonic()
+        if self._replaced or now - self._last_check < self.check_interval:
+            return self._replaced
+        self._last_check = now
+        try:
+            current = os.stat(self.path)
+        except OSError:
+            return False
+        self._replaced = (current.st_ino, current.st_mtime_ns, current.st_size) != \
+            (self._stat.st_ino, self._stat.st_mtime_ns, self._stat.st_size)
+        return self._replaced
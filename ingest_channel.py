@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Incremental, resumable ingestion of a creator's YouTube channel into their corpus CSV
+A manifest per creator and output CSV records every video's status and content hash;
+reruns only fetch new or failed videos (or done ones missing from the CSV), and the
+manifest is checkpointed after each video so an interrupted job picks up where it stopped
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add current directory to path to import the scraper modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from get_video_url import get_all_videos
+from scraper import Scraper, get_video_id, SCRAPER_WORKERS, SCRAPER_RATE
+from creator_config import get_creator_config
+from response_cache import mark_corpus_updated
+from vector_index import load_csv_records
+
+MANIFEST_DIR = os.getenv(
+    "INGEST_MANIFEST_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "manifests")
+)
+CSV_FIELDS = ["date", "title", "url", "transcript", "description"]
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_").lower()
+
+def content_hash(row: Dict[str, Any]) -> str:
+    """Hash of a video's scraped text, to tell a changed video from an unchanged one"""
+    text = "\x1f".join(str(row.get(field) or "") for field in ("title", "description", "transcript"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def manifest_path(creator_name: str, output_file: str) -> str:
+    """One manifest per creator and output CSV, since a done video is one written to that CSV"""
+    output_file = os.path.abspath(output_file)
+    name = slugify(os.path.splitext(os.path.basename(output_file))[0])
+    digest = hashlib.sha1(output_file.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(MANIFEST_DIR, f"{slugify(creator_name)}__{name}_{digest}.json")
+
+class IngestManifest:
+    def __init__(self, path: str, creator_name: str, channel_url: str, output_file: str):
+        """Load the manifest at path, or start an empty one (also when it tracks another output file)"""
+        self.path = path
+        output_file = os.path.abspath(output_file)
+        self.data = {"creator": creator_name, "channel_url": channel_url, "output_file": output_file, "videos": {}, "runs": []}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("output_file") == output_file:
+                self.data.update(saved)
+            else:
+                print(f"⚠️ {path} tracks {saved.get('output_file')}, starting over for {output_file}")
+
+    @property
+    def videos(self) -> Dict[str, Dict[str, Any]]:
+        return self.data["videos"]
+
+    def save(self) -> None:
+        """Checkpoint atomically (write a temp file, then rename it over the manifest)"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def mark(self, video_id: str, url: str, status: str, **fields) -> None:
+        entry = self.videos.setdefault(video_id, {"url": url, "attempts": 0})
+        entry.update(fields, url=url, status=status, updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        if status != "failed":
+            entry.pop("error", None)
+
+    def to_fetch(self, video_urls: List[str], retry_failed: bool = True, max_attempts: int = 3) -> List[Tuple[str, str]]:
+        """(video_id, url) for videos that are new, or failed with attempts left"""
+        pending = []
+        for url in video_urls:
+            video_id = get_video_id(url) or url
+            entry = self.videos.get(video_id)
+            if entry is None or entry["status"] == "pending":
+                pending.append((video_id, url))
+            elif entry["status"] == "failed" and retry_failed and entry.get("attempts", 0) < max_attempts:
+                pending.append((video_id, url))
+        return pending
+
+    def reconcile(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Bring the manifest in line with the CSV before a run
+        Videos in the CSV become done (covers a crash between writing a row and checkpointing),
+        done videos whose row changed get the new hash, and done videos missing from it are re-queued"""
+        counts = {"recovered": 0, "changed": 0, "requeued": 0}
+        in_csv = set()
+        for row in rows:
+            video_id = get_video_id(row.get("url") or "") or row.get("url")
+            if not video_id:
+                continue
+            in_csv.add(video_id)
+            entry = self.videos.get(video_id, {})
+            row_hash = content_hash(row)
+            if entry.get("status") != "done":
+                self.mark(video_id, row["url"], "done", title=row.get("title"), content_hash=row_hash)
+                counts["recovered"] += 1
+            elif entry.get("content_hash") != row_hash:
+                self.mark(video_id, row["url"], "done", title=row.get("title"), content_hash=row_hash)
+                counts["changed"] += 1
+        for video_id, entry in self.videos.items():
+            if entry["status"] == "done" and video_id not in in_csv:
+                self.mark(video_id, entry["url"], "pending", attempts=0)
+                counts["requeued"] += 1
+        return counts
+
+    def summary(self) -> Dict[str, int]:
+        counts = {"done": 0, "failed": 0, "pending": 0}
+        for entry in self.videos.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+def default_output_path(creator_name: str) -> str:
+    corpus = get_creator_config(creator_name).get("local_corpus")
+    root = os.path.dirname(os.path.abspath(__file__))
+    if corpus:
+        return corpus if os.path.isabs(corpus) else os.path.join(root, corpus)
+    return os.path.join(root, "data", f"{slugify(creator_name)}_videos.csv")
+
+def ingest_channel(creator_name: str, channel_url: str, output_file: Optional[str] = None,
+                   limit: Optional[int] = None, retry_failed: bool = True, max_attempts: int = 3,
+                   list_videos: Callable[[str], List[str]] = get_all_videos,
+                   scraper: Optional[Scraper] = None) -> Dict[str, Any]:
+    """Fetch new and failed videos of a channel, appending them to the creator's corpus CSV"""
+    output_file = output_file or default_output_path(creator_name)
+    scraper = scraper or Scraper()
+    manifest = IngestManifest(manifest_path(creator_name, output_file), creator_name, channel_url, output_file)
+    started = time.time()
+
+    existing_rows = load_csv_records(output_file) if os.path.exists(output_file) else []
+    reconciled = manifest.reconcile(existing_rows)
+    if reconciled["recovered"]:
+        print(f"ℹ️ Recovered {reconciled['recovered']} videos already in {output_file}")
+    if reconciled["changed"]:
+        print(f"ℹ️ {reconciled['changed']} videos were edited in {output_file} since the last run")
+    if reconciled["requeued"]:
+        print(f"⚠️ {reconciled['requeued']} videos marked done are missing from {output_file}, fetching them again")
+
+    print(f"🔎 Listing videos for {channel_url}...")
+    video_urls = list_videos(channel_url)
+    to_fetch = manifest.to_fetch(video_urls, retry_failed, max_attempts)
+    if limit is not None:
+        to_fetch = to_fetch[:limit]
+    print(f"📋 {len(video_urls)} videos on the channel, {len(to_fetch)} to fetch ({manifest.summary()['done']} already done)")
+    for video_id, url in to_fetch:
+        manifest.mark(video_id, url, manifest.videos.get(video_id, {}).get("status", "pending"))
+    manifest.save()
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    fetched = failed = 0
+    with open(output_file, mode="a", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        if file.tell() == 0:
+            writer.writeheader()
+
+        # Videos are scraped concurrently; the CSV and manifest are only written from this thread
+        video_ids = {url: video_id for video_id, url in to_fetch}
+        # Closed explicitly so an interrupted run stops scraping right away
+        with closing(scraper.scrape([url for _, url in to_fetch])) as outcomes:
+            for outcome in outcomes:
+                url, row = outcome["url"], outcome["row"]
+                video_id = video_ids[url]
+                attempts = manifest.videos[video_id].get("attempts", 0) + 1
+                if row is not None:
+                    writer.writerow({field: row.get(field) for field in CSV_FIELDS})
+                    # The row must be on disk before the checkpoint says it is done
+                    file.flush()
+                    os.fsync(file.fileno())
+                    manifest.mark(video_id, url, "done", attempts=attempts, title=row.get("title"), content_hash=content_hash(row))
+                    fetched += 1
+                    print(f"✅ Saved: {row.get('title')}")
+                else:
+                    manifest.mark(video_id, url, "failed", attempts=attempts, error=outcome["error"][:500])
+                    failed += 1
+                    print(f"❌ Error with {url}: {outcome['error']}")
+                manifest.save()
+
+    result = {
+        "creator": creator_name,
+        "output_file": output_file,
+        "listed": len(video_urls),
+        "fetched": fetched,
+        "failed": failed,
+        "seconds": round(time.time() - started, 1),
+        **{f"total_{status}": count for status, count in manifest.summary().items()}
+    }
+    manifest.data["runs"] = (manifest.data.get("runs", []) + [{**result, "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}])[-20:]
+    manifest.save()
+
+    if fetched:
+        # Cached answers and built indexes were produced from the old corpus
+        mark_corpus_updated(creator_name)
+    print(f"🎉 {creator_name}: {fetched} new videos, {failed} failed in {result['seconds']}s -> {output_file}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest a creator's YouTube channel")
+    parser.add_argument("creator", help="creator name, e.g. 'Marques Brownlee'")
+    parser.add_argument("channel_url", help="channel URL, e.g. https://www.youtube.com/@mkbhd")
+    parser.add_argument("--output", help="corpus CSV (default: the creator's local_corpus)")
+    parser.add_argument("--limit", type=int, help="fetch at most this many videos this run")
+    parser.add_argument("--max-attempts", type=int, default=3, help="give up on a video after this many failures")
+    parser.add_argument("--no-retry", action="store_true", help="don't retry previously failed videos")
+    parser.add_argument("--workers", type=int, default=SCRAPER_WORKERS, help="concurrent scraping workers")
+    parser.add_argument("--rate", type=float, default=SCRAPER_RATE, help="max requests per second")
+    args = parser.parse_args()
+    scraper = Scraper(workers=args.workers, rate=args.rate)
+    ingest_channel(args.creator, args.channel_url, args.output, args.limit, not args.no_retry,
+                   args.max_attempts, scraper=scraper)
+
+if __name__ == "__main__":
+    main()
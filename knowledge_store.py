@@ -0,0 +1,332 @@
+"""
+Storage interface for creator knowledge, with Supabase and local SQLite implementations.
+Retrieval (RAGService), the CSV uploader and the embedding backfill all read and write
+through a KnowledgeStore, so a creator can be served from a Supabase project or from a
+SQLite file on the same node. The SQLite store runs in WAL mode (readers never block the
+writer), keeps each row as JSON with its embedding as a float32 blob, stores transcript
+chunks with their own embeddings, and answers vector matches from an in-process index
+that is rebuilt only when the table changes. It doubles as the offline stand-in for
+benchmarks.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+def match_rpc_calls(table: str, query_embedding: List[float], creator_id: Optional[int],
+                    threshold: float, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """(function, params) to try in order for a Postgres vector match: the per-table chunk
+    function from migrations/001, then the original match_creator_knowledge for its table"""
+    calls = [('match_knowledge_chunks', {
+        'table_name': table,
+        'query_embedding': query_embedding,
+        'match_threshold': threshold,
+        'match_count': limit,
+        'creator_id': creator_id
+    })]
+    if table == 'creator_knowledge':
+        calls.append(('match_creator_knowledge', {
+            'query_embedding': query_embedding,
+            'creator_id': creator_id,
+            'match_threshold': threshold,
+            'match_count': limit
+        }))
+    return calls
+
+def parse_columns(columns: str) -> Optional[List[str]]:
+    """PostgREST-style column list ('a,b' or '*'); None means every column"""
+    names = [c.strip() for c in (columns or '*').split(',') if c.strip()]
+    return None if not names or '*' in names else names
+
+class KnowledgeStore:
+    """Operations retrieval and ingestion need from a knowledge backend"""
+
+    # True when the store keeps per-chunk embeddings next to the rows
+    stores_chunks = False
+
+    def get_creator(self, creator_id: int) -> Dict[str, Any]:
+        """Row of the creators table ({} if missing)"""
+        rows = self.fetch('creators', '*', 'id', [creator_id])
+        return rows[0] if rows else {}
+
+    def match(self, table: str, query_embedding: List[float], creator_id: Optional[int],
+              threshold: float, limit: int) -> List[Dict[str, Any]]:
+        """Rows (or chunks) most similar to the query, each with a 'similarity'"""
+        raise NotImplementedError
+
+    def scan(self, table: str, columns: str = '*', limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to limit rows of a table, projected to columns"""
+        raise NotImplementedError
+
+    def fetch(self, table: str, columns: str, key: str, ids: Sequence[Any]) -> List[Dict[str, Any]]:
+        """Rows whose key column is one of ids"""
+        raise NotImplementedError
+
+    def missing_embeddings(self, table: str, key: str, after: Any, limit: int) -> List[Dict[str, Any]]:
+        """Next page of rows without an embedding, in key order after the given key"""
+        raise NotImplementedError
+
+    def write_embeddings(self, table: str, key: str, rows: List[Dict[str, Any]]) -> None:
+        """Store the 'embedding' of each row (rows as returned by missing_embeddings)"""
+        raise NotImplementedError
+
+    def upsert(self, table: str, rows: List[Dict[str, Any]], on_conflict: Optional[str] = None) -> None:
+        """Insert rows, replacing existing rows with the same on_conflict key (plain insert if None)"""
+        raise NotImplementedError
+
+    def replace_chunks(self, table: str, row_key: Any, chunks: List[Tuple[Dict[str, Any], Any]]) -> None:
+        """Replace the (chunk, embedding) pairs stored for one row"""
+        raise NotImplementedError
+
+class SupabaseStore(KnowledgeStore):
+    def __init__(self, client):
+        """Wrap a supabase-py client"""
+        self.client = client
+
+    def match(self, table, query_embedding, creator_id, threshold, limit):
+        calls = match_rpc_calls(table, query_embedding, creator_id, threshold, limit)
+        for i, (function, params) in enumerate(calls):
+            try:
+                return self.client.rpc(function, params).execute().data or []
+            except Exception:
+                if i == len(calls) - 1:
+                    raise
+
+    def scan(self, table, columns='*', limit=None):
+        query = self.client.table(table).select(columns)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.execute().data or []
+
+    def fetch(self, table, columns, key, ids):
+        if not ids:
+            return []
+        return self.client.table(table).select(columns).in_(key, list(ids)).execute().data or []
+
+    def missing_embeddings(self, table, key, after, limit):
+        query = self.client.table(table).select('*').is_('embedding', 'null')
+        if after is not None:
+            query = query.gt(key, after)
+        return query.order(key).limit(limit).execute().data or []
+
+    def write_embeddings(self, table, key, rows):
+        # PostgREST has no bulk UPDATE; whole rows are upserted so the insert half
+        # of the upsert satisfies NOT NULL columns
+        self.upsert(table, rows, on_conflict=key)
+
+    def upsert(self, table, rows, on_conflict=None):
+        if on_conflict:
+            self.client.table(table).upsert(rows, on_conflict=on_conflict).execute()
+        else:
+            self.client.table(table).insert(rows).execute()
+
+class SQLiteStore(KnowledgeStore):
+    stores_chunks = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS knowledge_rows (
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            embedding BLOB,
+            PRIMARY KEY (table_name, row_key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS knowledge_chunks (
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            PRIMARY KEY (table_name, row_key, chunk_index)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        """Open (or create) a knowledge database; each thread gets its own connection"""
+        self.path = path
+        self.local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.connection() as conn:
+            conn.executescript(self.SCHEMA)
+        # table -> (version it was built at, index over its chunk or row embeddings)
+        self.indexes: Dict[str, Tuple[int, VectorIndex]] = {}
+        # (table, creator_id) -> (index it was computed for, positions that creator may match)
+        self.creator_positions: Dict[Tuple[str, Any], Tuple[VectorIndex, Optional[np.ndarray]]] = {}
+        self.index_lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_key(row: Dict[str, Any], key: Optional[str]) -> str:
+        if key and row.get(key) is not None:
+            return str(row[key])
+        return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _blob(vector: Any) -> Optional[bytes]:
+        if vector is None:
+            return None
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _project(data: str, embedding: Optional[bytes], columns: Optional[List[str]]) -> Dict[str, Any]:
+        row = json.loads(data)
+        if embedding is not None or (columns is not None and 'embedding' in columns):
+            row['embedding'] = np.frombuffer(embedding, dtype=np.float32).tolist() if embedding else None
+        if columns is not None:
+            row = {column: row.get(column) for column in columns}
+        return row
+
+    def _bump(self, conn: sqlite3.Connection, table: str) -> None:
+        conn.execute(
+            "INSERT INTO table_versions (table_name, version) VALUES (?, 1) "
+            "ON CONFLICT(table_name) DO UPDATE SET version = version + 1", (table,)
+        )
+
+    def version(self, table: str) -> int:
+        row = self.connection().execute("SELECT version FROM table_versions WHERE table_name = ?", (table,)).fetchone()
+        return row[0] if row else 0
+
+    def scan(self, table, columns='*', limit=None):
+        names = parse_columns(columns)
+        select_embedding = names is None or 'embedding' in names
+        cursor = self.connection().execute(
+            f"SELECT data, {'embedding' if select_embedding else 'NULL'} FROM knowledge_rows "
+            "WHERE table_name = ? ORDER BY row_key LIMIT ?",
+            (table, -1 if limit is None else limit)
+        )
+        return [self._project(data, embedding, names) for data, embedding in cursor]
+
+    def fetch(self, table, columns, key, ids):
+        # Rows are keyed by the upsert's on_conflict column; other key columns fall back to a scan
+        names = parse_columns(columns)
+        wanted = [str(i) for i in ids]
+        if not wanted:
+            return []
+        placeholders = ",".join("?" * len(wanted))
+        rows = self.connection().execute(
+            f"SELECT data, embedding FROM knowledge_rows WHERE table_name = ? AND row_key IN ({placeholders})",
+            (table, *wanted)
+        ).fetchall()
+        results = [self._project(data, embedding, names) for data, embedding in rows]
+        if len(results) < len(wanted):
+            found = {str(row.get(key)) for row in results}
+            missing = set(wanted) - found
+            results += [row for row in self.scan(table, columns) if str(row.get(key)) in missing]
+        return results
+
+    def missing_embeddings(self, table, key, after, limit):
+        rows = self.connection().execute(
+            "SELECT data FROM knowledge_rows WHERE table_name = ? AND embedding IS NULL AND row_key > ? "
+            "ORDER BY row_key LIMIT ?",
+            (table, '' if after is None else str(after), limit)
+        ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def write_embeddings(self, table, key, rows):
+        conn = self.connection()
+        with conn:
+            conn.executemany(
+                "UPDATE knowledge_rows SET embedding = ? WHERE table_name = ? AND row_key = ?",
+                [(self._blob(row['embedding']), table, self._row_key(row, key)) for row in rows]
+            )
+            self._bump(conn, table)
+
+    def upsert(self, table, rows, on_conflict=None):
+        values = []
+        for row in rows:
+            data = {k: v for k, v in row.items() if k != 'embedding'}
+            values.append((table, self._row_key(row, on_conflict), json.dumps(data, default=str), self._blob(row.get('embedding'))))
+        conn = self.connection()
+        with conn:
+            # A new embedding replaces the stored one; rows uploaded without one keep theirs
+            conn.executemany(
+                "INSERT INTO knowledge_rows (table_name, row_key, data, embedding) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(table_name, row_key) DO UPDATE SET data = excluded.data, "
+                "embedding = COALESCE(excluded.embedding, knowledge_rows.embedding)",
+                values
+            )
+            self._bump(conn, table)
+
+    def replace_chunks(self, table, row_key, chunks):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM knowledge_chunks WHERE table_name = ? AND row_key = ?", (table, str(row_key)))
+            conn.executemany(
+                "INSERT INTO knowledge_chunks (table_name, row_key, chunk_index, data, embedding) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (table, str(row_key), i, json.dumps({k: v for k, v in chunk.items() if k != 'embedding'}, default=str), self._blob(vector))
+                    for i, (chunk, vector) in enumerate(chunks)
+                ]
+            )
+            self._bump(conn, table)
+
+    def _load_index(self, table: str) -> VectorIndex:
+        """Vector index over the table's chunk embeddings (row embeddings if it has no chunks)"""
+        version = self.version(table)
+        cached = self.indexes.get(table)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with self.index_lock:
+            cached = self.indexes.get(table)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            conn = self.connection()
+            pairs = conn.execute(
+                "SELECT data, embedding FROM knowledge_chunks WHERE table_name = ? ORDER BY row_key, chunk_index", (table,)
+            ).fetchall()
+            if not pairs:
+                pairs = conn.execute(
+                    "SELECT data, embedding FROM knowledge_rows WHERE table_name = ? AND embedding IS NOT NULL ORDER BY row_key", (table,)
+                ).fetchall()
+            vectors = [np.frombuffer(embedding, dtype=np.float32) for _, embedding in pairs]
+            index = VectorIndex(vectors[0].shape[0] if vectors else 1)
+            if vectors:
+                started = time.perf_counter()
+                index.add([str(i) for i in range(len(pairs))], np.stack(vectors), [json.loads(data) for data, _ in pairs])
+                logger.info(f"🧮 Loaded {len(pairs)} vectors for {table} from {self.path} in {time.perf_counter() - started:.2f}s")
+            self.indexes[table] = (version, index)
+            return index
+
+    def _positions_for(self, table: str, index: VectorIndex, creator_id: Any) -> Optional[np.ndarray]:
+        """Positions of the creator's rows and rows without a creator (None when that is every row)"""
+        cached = self.creator_positions.get((table, creator_id))
+        if cached is not None and cached[0] is index:
+            return cached[1]
+        positions = np.array(
+            [i for i, record in enumerate(index.records) if record.get('creator_id') in (None, creator_id)], dtype=np.int64
+        )
+        if len(positions) == len(index):
+            positions = None
+        self.creator_positions[(table, creator_id)] = (index, positions)
+        return positions
+
+    def match(self, table, query_embedding, creator_id, threshold, limit):
+        index = self._load_index(table)
+        if not index.ids:
+            return []
+        # Shared tables are scored only over the creator's own rows, so other creators can't crowd them out
+        candidates = self._positions_for(table, index, creator_id) if creator_id is not None else None
+        if candidates is not None and not len(candidates):
+            return []
+        return index.search(query_embedding, k=limit, min_score=threshold, candidates=candidates)
@@ -0,0 +1,261 @@
+"""
+Shared HTTP clients for the OpenAI-compatible Groq chat completions API.
+One pooled keep-alive session per process (sync for Flask, asyncio for ASGI), with
+connect/read timeouts, bounded retries with jittered exponential backoff on 429/5xx,
+and per-call latency stats.
+"""
+
+import json
+import math
+import asyncio
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+def parse_stream_line(line: bytes) -> Optional[str]:
+    """Extract the content delta from one SSE line; returns '' for non-content lines and None at [DONE]"""
+    if not line or not line.startswith(b"data:"):
+        return ""
+    data = line[5:].strip()
+    if data == b"[DONE]":
+        return None
+    chunk = json.loads(data)
+    choices = chunk.get('choices') or [{}]
+    return (choices[0].get('delta') or {}).get('content') or ""
+
+class BaseLLMClient:
+    def __init__(self, api_url: str, api_key: Optional[str], model: str = "llama-3.1-8b-instant",
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0, max_retries: int = 2,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0, pool_size: int = 20):
+        """Configuration, retry policy and latency stats shared by the sync and async clients"""
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=1000)
+        self._first_token_ms = deque(maxlen=1000)
+        self._counters = {"calls": 0, "errors": 0, "retries": 0}
+
+    def _count_retry(self):
+        with self._lock:
+            self._counters["retries"] += 1
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After header"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        return delay
+
+    def _record(self, started: float, ok: bool, first_token_at: Optional[float] = None):
+        with self._lock:
+            self._counters["calls"] += 1
+            if not ok:
+                self._counters["errors"] += 1
+            self._latencies_ms.append((time.perf_counter() - started) * 1000)
+            if first_token_at is not None:
+                self._first_token_ms.append((first_token_at - started) * 1000)
+
+    def _payload(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float, stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counters plus latency percentiles (ms) over the most recent calls"""
+        with self._lock:
+            latencies = list(self._latencies_ms)
+            first_tokens = list(self._first_token_ms)
+            counters = dict(self._counters)
+
+        def _rounded(value):
+            return round(value, 1) if value is not None else None
+
+        return {
+            **counters,
+            "latency_ms": {f"p{p}": _rounded(percentile(latencies, p)) for p in (50, 95, 99)},
+            "time_to_first_token_ms": {f"p{p}": _rounded(percentile(first_tokens, p)) for p in (50, 95, 99)}
+        }
+
+class LLMClient(BaseLLMClient):
+    def __init__(self, *args, **kwargs):
+        """Create the pooled keep-alive session used for every chat completion call"""
+        super().__init__(*args, **kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+
+    def _post(self, payload: Dict[str, Any], stream: bool = False) -> requests.Response:
+        """POST with timeouts; retries connection errors, timeouts and 429/5xx responses"""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=(self.connect_timeout, self.read_timeout), stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"⚠️ LLM request failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                logger.warning(f"⚠️ LLM API returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+
+            self._count_retry()
+            time.sleep(delay)
+
+    def chat(self, messages: List[Dict[str, str]], max_tokens: int = 2000, temperature: float = 0.5) -> str:
+        """Return the full completion text for a list of chat messages"""
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = self._post(self._payload(messages, max_tokens, temperature, stream=False))
+            if response.status_code != 200:
+                raise Exception(f"API Error {response.status_code}: {response.text}")
+            content = response.json()['choices'][0]['message']['content']
+            ok = True
+            return content
+        finally:
+            self._record(started, ok)
+
+    def stream_chat(self, messages: List[Dict[str, str]], max_tokens: int = 2000, temperature: float = 0.5) -> Iterator[str]:
+        """Yield completion tokens as they arrive (OpenAI-compatible SSE stream)"""
+        started = time.perf_counter()
+        first_token_at = None
+        ok = False
+        try:
+            response = self._post(self._payload(messages, max_tokens, temperature, stream=True), stream=True)
+            with response:
+                if response.status_code != 200:
+                    raise Exception(f"API Error {response.status_code}: {response.text}")
+
+                # "data: {json}" lines terminated by "data: [DONE]"
+                for line in response.iter_lines():
+                    token = parse_stream_line(line)
+                    if token is None:
+                        break
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        yield token
+            ok = True
+        finally:
+            self._record(started, ok, first_token_at)
+
+class AsyncLLMClient(BaseLLMClient):
+    def __init__(self, *args, **kwargs):
+        """Create the pooled asyncio client used by the ASGI serving mode"""
+        super().__init__(*args, **kwargs)
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        )
+
+    async def _post(self, payload: Dict[str, Any], stream: bool = False) -> httpx.Response:
+        """POST with the same retry policy as LLMClient._post"""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                request = self.client.build_request("POST", self.api_url, json=payload)
+                response = await self.client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.TimeoutException) as e:
+                if last_attempt:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"⚠️ LLM request failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                logger.warning(f"⚠️ LLM API returned {response.status_code}, retrying in {delay:.2f}s")
+                await response.aclose()
+
+            self._count_retry()
+            await asyncio.sleep(delay)
+
+    async def chat(self, messages: List[Dict[str, str]], max_tokens: int = 2000, temperature: float = 0.5) -> str:
+        """Return the full completion text for a list of chat messages"""
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = await self._post(self._payload(messages, max_tokens, temperature, stream=False))
+            if response.status_code != 200:
+                raise Exception(f"API Error {response.status_code}: {response.text}")
+            content = response.json()['choices'][0]['message']['content']
+            ok = True
+            return content
+        finally:
+            self._record(started, ok)
+
+    async def stream_chat(self, messages: List[Dict[str, str]], max_tokens: int = 2000, temperature: float = 0.5) -> AsyncIterator[str]:
+        """Yield completion tokens as they arrive (OpenAI-compatible SSE stream)"""
+        started = time.perf_counter()
+        first_token_at = None
+        ok = False
+        try:
+            response = await self._post(self._payload(messages, max_tokens, temperature, stream=True), stream=True)
+            try:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise Exception(f"API Error {response.status_code}: {response.text}")
+
+                # "data: {json}" lines terminated by "data: [DONE]"
+                async for line in response.aiter_lines():
+                    token = parse_stream_line(line.encode("utf-8"))
+                    if token is None:
+                        break
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        yield token
+            finally:
+                await response.aclose()
+            ok = True
+        finally:
+            self._record(started, ok, first_token_at)
+
+    async def aclose(self):
+        await self.client.aclose()
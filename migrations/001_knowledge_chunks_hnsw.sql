@@ -0,0 +1,179 @@
+-- Migration 001: chunk tables with HNSW indexes and a generic match function
+--
+-- Every knowledge table (creator_knowledge, mkbhd_videos, justine_videos, ...) gets a
+-- companion <table>_chunks table holding transcript chunks and their embeddings, with
+-- an HNSW cosine index so matches no longer scan the whole table. match_knowledge_chunks
+-- serves any registered table and computes each distance once. Safe to re-run.
+-- Populate the chunk tables with: python build_pg_index.py
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version TEXT PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Tables match_knowledge_chunks may search (also guards its dynamic SQL)
+CREATE TABLE IF NOT EXISTS knowledge_tables (
+    source_table TEXT PRIMARY KEY,
+    chunk_table TEXT NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Create (if missing) and register the chunk table for a knowledge table
+CREATE OR REPLACE FUNCTION create_knowledge_chunk_table(p_source_table TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_chunk_table TEXT := p_source_table || '_chunks';
+BEGIN
+    EXECUTE format($ddl$
+        CREATE TABLE IF NOT EXISTS %I (
+            id BIGSERIAL PRIMARY KEY,
+            source_key TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            creator_id INTEGER,
+            title TEXT,
+            url TEXT,
+            content TEXT NOT NULL,
+            metadata JSONB,
+            token_count INTEGER,
+            embedding VECTOR(384) NOT NULL, -- For all-MiniLM-L6-v2 model
+            created_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE (source_key, chunk_index)
+        )$ddl$, v_chunk_table);
+    -- m/ef_construction are pgvector's defaults; build_pg_index.py --rebuild-index recreates it after bulk loads
+    EXECUTE format(
+        'CREATE INDEX IF NOT EXISTS %I ON %I USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)',
+        v_chunk_table || '_embedding_hnsw', v_chunk_table
+    );
+    INSERT INTO knowledge_tables (source_table, chunk_table)
+    VALUES (p_source_table, v_chunk_table)
+    ON CONFLICT ON CONSTRAINT knowledge_tables_pkey DO NOTHING;
+    RETURN v_chunk_table;
+END;
+$$;
+
+SELECT create_knowledge_chunk_table('creator_knowledge');
+SELECT create_knowledge_chunk_table('mkbhd_videos');
+SELECT create_knowledge_chunk_table('justine_videos');
+
+-- HNSW returns ef_search candidates and filters them afterwards, so a creator_id filter on a
+-- shared table can come back short. pgvector >= 0.8 keeps scanning the graph until enough rows
+-- pass the filter (iterative scans); older versions only get a wider candidate list.
+CREATE OR REPLACE FUNCTION enable_hnsw_filtered_scan(p_ef_search INTEGER)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_version TEXT;
+BEGIN
+    SELECT e.extversion INTO v_version FROM pg_extension e WHERE e.extname = 'vector';
+    IF string_to_array(split_part(v_version, '-', 1), '.')::INTEGER[] >= ARRAY[0, 8] THEN
+        PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+        PERFORM set_config('hnsw.ef_search', p_ef_search::TEXT, true);
+        RETURN true;
+    END IF;
+    -- 1000 is the largest ef_search pgvector accepts
+    PERFORM set_config('hnsw.ef_search', LEAST(GREATEST(p_ef_search * 10, 400), 1000)::TEXT, true);
+    RETURN false;
+END;
+$$;
+
+-- Nearest chunks of any registered table. The inner query orders by the distance
+-- alias so the HNSW index serves it, and the threshold is applied to that same value.
+-- Iterative scans may return candidates slightly out of order, so the outer query re-sorts.
+CREATE OR REPLACE FUNCTION match_knowledge_chunks(
+    table_name TEXT,
+    query_embedding VECTOR(384),
+    match_threshold FLOAT DEFAULT 0.3,
+    match_count INTEGER DEFAULT 5,
+    creator_id INTEGER DEFAULT NULL,
+    ef_search INTEGER DEFAULT 40
+)
+RETURNS TABLE (
+    source_key TEXT,
+    chunk_index INTEGER,
+    title TEXT,
+    url TEXT,
+    content TEXT,
+    metadata JSONB,
+    token_count INTEGER,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_chunk_table TEXT;
+BEGIN
+    SELECT k.chunk_table INTO v_chunk_table
+    FROM knowledge_tables k
+    WHERE k.source_table = match_knowledge_chunks.table_name;
+    IF v_chunk_table IS NULL THEN
+        RAISE EXCEPTION 'No chunk table registered for %', match_knowledge_chunks.table_name;
+    END IF;
+
+    -- The index scan returns at most ef_search candidates
+    IF match_knowledge_chunks.creator_id IS NULL THEN
+        PERFORM set_config('hnsw.ef_search', GREATEST(match_knowledge_chunks.ef_search, match_knowledge_chunks.match_count)::TEXT, true);
+    ELSE
+        PERFORM enable_hnsw_filtered_scan(GREATEST(match_knowledge_chunks.ef_search, match_knowledge_chunks.match_count));
+    END IF;
+
+    RETURN QUERY EXECUTE format($q$
+        SELECT nearest.source_key, nearest.chunk_index, nearest.title, nearest.url, nearest.content,
+               nearest.metadata, nearest.token_count, (1 - nearest.distance)::FLOAT AS similarity
+        FROM (
+            SELECT c.source_key, c.chunk_index, c.title, c.url, c.content, c.metadata, c.token_count,
+                   c.embedding <=> $1 AS distance
+            FROM %I c
+            WHERE $3::INTEGER IS NULL OR c.creator_id = $3
+            ORDER BY distance
+            LIMIT $2
+        ) nearest
+        WHERE 1 - nearest.distance > $4
+        ORDER BY nearest.distance
+    $q$, v_chunk_table)
+    USING match_knowledge_chunks.query_embedding, match_knowledge_chunks.match_count,
+          match_knowledge_chunks.creator_id, match_knowledge_chunks.match_threshold;
+END;
+$$;
+
+-- The original function keeps its signature, gains an index and computes the distance once
+CREATE INDEX IF NOT EXISTS creator_knowledge_embedding_hnsw
+    ON creator_knowledge USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+CREATE OR REPLACE FUNCTION match_creator_knowledge(
+    query_embedding VECTOR(384),
+    creator_id INTEGER,
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INTEGER DEFAULT 5
+)
+RETURNS TABLE (
+    id INTEGER,
+    content TEXT,
+    metadata JSONB,
+    similarity FLOAT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- creator_knowledge is shared by every creator, so the index scan must keep going past other creators' rows
+    PERFORM enable_hnsw_filtered_scan(GREATEST(40, match_creator_knowledge.match_count));
+
+    RETURN QUERY
+    SELECT nearest.id, nearest.content, nearest.metadata, (1 - nearest.distance)::FLOAT AS similarity
+    FROM (
+        SELECT ck.id, ck.content, ck.metadata, ck.embedding <=> match_creator_knowledge.query_embedding AS distance
+        FROM creator_knowledge ck
+        WHERE ck.creator_id = match_creator_knowledge.creator_id
+        ORDER BY distance
+        LIMIT match_creator_knowledge.match_count
+    ) nearest
+    WHERE 1 - nearest.distance > match_creator_knowledge.match_threshold
+    ORDER BY nearest.distance;
+END;
+$$;
+
+INSERT INTO schema_migrations (version) VALUES ('001_knowledge_chunks_hnsw') ON CONFLICT DO NOTHING;
@@ -1,42 +1,199 @@
 import os
+import re
 import json
+import asyncio
+import functools
 import logging
-from typing import List, Dict, Any, Optional
-from sentence_transformers import SentenceTransformer
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 from supabase import create_client, Client
 from creator_config import get_creator_config
+from embedding_cache import EmbeddingCache
+from embedding_model import get_shared_model
+from vector_index import VectorIndex, build_corpus_index, load_csv_records
+from ann_index import IVFIndex
+from index_file import MappedIndex
+from bm25_index import BM25Index, reciprocal_rank_fusion
+from supabase_async import AsyncSupabaseREST
+from knowledge_store import KnowledgeStore, SupabaseStore, SQLiteStore, match_rpc_calls
+from creator_cache import CreatorMetadataCache
+from ttl_cache import TTLCache
+from response_cache import corpus_marker_version
+from context_packer import estimate_tokens, pack_context
 # LangChain imports
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# MiniLM truncates at 256 word pieces, so chunks stay around ~200 words with overlap
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+CHUNK_TEXT_FIELDS = ('transcript', 'content', 'description')
+
+# Embedding throughput knobs (ingestion is dominated by encode calls)
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+EMBEDDING_NUM_THREADS = int(os.getenv('EMBEDDING_NUM_THREADS', '0'))  # 0 = library default
+EMBEDDING_FLOAT16 = os.getenv('EMBEDDING_FLOAT16', 'false').lower() in ('1', 'true', 'yes')
+
+# Local retrieval mode: 'off' (vectors only), 'fusion' (BM25 and vector ranks fused) or
+# 'prefilter' (BM25 picks the candidate chunks and only those are vector-scored)
+HYBRID_MODE = os.getenv('RAG_HYBRID_MODE', 'fusion').lower()
+LEXICAL_CANDIDATES = int(os.getenv('RAG_LEXICAL_CANDIDATES', '200'))
+
+# Local vector index: 'exact' (brute force) or 'ivf' (approximate, for whole-channel corpora)
+VECTOR_INDEX_TYPE = os.getenv('RAG_VECTOR_INDEX', 'exact').lower()
+IVF_NLIST = int(os.getenv('RAG_IVF_NLIST', '0'))  # 0 = sqrt(number of chunks)
+IVF_NPROBE = int(os.getenv('RAG_IVF_NPROBE', '8'))
+# How often (seconds) a loaded local index checks its corpus CSV for newly ingested rows
+LOCAL_CORPUS_CHECK_INTERVAL = float(os.getenv('RAG_LOCAL_CORPUS_CHECK_INTERVAL', '2'))
+
+# Local index vector storage: 'float32', 'float16' or 'int8' (per-vector scales); with
+# RAG_RERANK_K > 0 the top quantized hits are rescored from a float32 copy mapped from disk
+INDEX_STORAGE = os.getenv('RAG_INDEX_STORAGE', 'float32').lower()
+RERANK_K = int(os.getenv('RAG_RERANK_K', '0'))
+ANN_INDEX_DIR = os.getenv('RAG_ANN_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ann_index'))
+
+# Supabase table scans: rows scored per request (on id + embedding only) and the text columns
+# fetched for the final top-k; tables can override these with 'id_column'/'text_columns'
+TABLE_SCAN_LIMIT = int(os.getenv('RAG_TABLE_SCAN_LIMIT', '100'))
+DEFAULT_TEXT_COLUMNS = 'id,content,metadata,source'
+
+# Where creator knowledge lives: 'supabase' (each creator's project) or 'sqlite' (a local
+# WAL-mode database); creators can override with 'knowledge_store'/'sqlite_path'
+KNOWLEDGE_STORE = os.getenv('RAG_KNOWLEDGE_STORE', 'supabase').lower()
+SQLITE_STORE_PATH = os.getenv('RAG_SQLITE_PATH', os.path.join('data', 'knowledge.db'))
+
+# Maximum (estimated) tokens of retrieved knowledge packed into the system prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv('RAG_CONTEXT_TOKEN_BUDGET', '1500'))
+
+def build_entry_text(entry: Dict[str, Any]) -> str:
+    """Combine the text fields of a knowledge row into the string that gets embedded"""
+    parts = [entry.get(field) or '' for field in ('title', 'description', 'content', 'transcript')]
+    return " ".join(str(part).strip() for part in parts if part).strip()
+
+def get_source_id(entry: Dict[str, Any]) -> str:
+    """Stable identifier for the video/row a chunk came from"""
+    url = entry.get('url') or ''
+    if 'v=' in url:
+        return url.split('v=')[1].split('&')[0]
+    if url:
+        return url
+    if entry.get('id') is not None:
+        return str(entry['id'])
+    return hashlib.sha1(build_entry_text(entry).encode('utf-8')).hexdigest()[:16]
+
+def parse_embedding(value: Any) -> Optional[np.ndarray]:
+    """Parse a stored embedding (list or pgvector string like '[0.1,0.2]')"""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, str):
+            value = json.loads(value)
+        vector = np.asarray(value, dtype=np.float32)
+        return vector if vector.ndim == 1 and vector.size else None
+    except (ValueError, TypeError):
+        return None
+
+def json_size(value: Any) -> int:
+    """Estimated JSON length of a value from its field lengths (escapes and non-ASCII ignored)"""
+    if value is None:
+        return 4
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return 1 + sum(len(key) + 4 + json_size(item) for key, item in value.items()) if value else 2
+    if isinstance(value, (list, tuple)):
+        # Vectors dominate scan payloads; their elements all have about the same width
+        return 1 + len(value) * (json_size(value[0]) + 1) if value else 2
+    return len(str(value))
+
+def payload_bytes(rows: Any) -> int:
+    """Approximate JSON size of a PostgREST response body, without re-serializing it"""
+    return json_size(rows) if rows else 0
+
+def postgrest_in(values: List[Any]) -> str:
+    """PostgREST 'in' filter value, quoting non-numeric ids"""
+    return "in.(" + ",".join(str(v) if isinstance(v, (int, float)) else json.dumps(str(v)) for v in values) + ")"
+
 class RAGService:
     def __init__(self):
         """Initialize RAG service with embedding model"""
         # Don't initialize Supabase client here - will be created per creator
         self.supabase_clients = {}  # Cache for creator-specific clients
+        self.async_supabase_clients = {}  # Same, for the ASGI serving mode
+        self.knowledge_stores: Dict[str, KnowledgeStore] = {}  # Per creator
+        self.sqlite_stores: Dict[str, SQLiteStore] = {}  # Per database file, shared by creators
         
+        # Worker threads for blocking work issued from async code
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('RAG_EXECUTOR_WORKERS', '4')),
+            thread_name_prefix='rag'
+        )
+        # Separate pool for overlapping independent network calls in the sync path
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('RAG_IO_WORKERS', '8')),
+            thread_name_prefix='rag-io'
+        )
         
-        # Initialize embedding models (both for flexibility)
-        try:
-            # Sentence Transformers for manual control
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.embedding_dim = 384  # Dimension for all-MiniLM-L6-v2
-            
-            # LangChain embeddings for future integration
-            self.langchain_embeddings = HuggingFaceEmbeddings(
-                model_name='sentence-transformers/all-MiniLM-L6-v2',
-                model_kwargs={'device': 'cpu'}
-            )
-            
-            logger.info("✅ Embedding models loaded (both Sentence Transformers and LangChain)")
-        except Exception as e:
-            logger.error(f"❌ Embedding model failed to load: {e}")
-            self.embedding_model = None
-            self.langchain_embeddings = None
+        # Creator rows and the search method that works per creator ('rpc', 'table', 'none'),
+        # so neither the creators table nor a missing RPC is hit on every request
+        self.creator_cache = CreatorMetadataCache()
+        
+        # Recent query embeddings, so the response cache and retrieval encode a message once
+        self.query_embeddings = TTLCache(maxsize=1024, ttl=300)
+        
+        # Row embeddings are cached on disk so each row is only encoded once
+        self.embedding_cache = EmbeddingCache(EMBEDDING_MODEL_NAME)
+        
+        # In-process indexes over local corpora ('supabase' or 'local' retrieval)
+        self.retrieval_backend = os.getenv('RAG_RETRIEVAL_BACKEND', 'supabase')
+        self.local_indexes: Dict[str, VectorIndex] = {}
+        # BM25 index per creator, paired with the vector index its positions refer to
+        self.lexical_indexes: Dict[str, Tuple[VectorIndex, BM25Index]] = {}
+        self.hybrid_mode = HYBRID_MODE
+        self._local_index_lock = threading.Lock()
+        # creator -> (corpus mtime the local index covers, when it was last checked)
+        self.local_corpus_checks: Dict[str, Tuple[float, float]] = {}
+        self.embedding_dim = 384  # Dimension for all-MiniLM-L6-v2
+        
+        # Transcripts are indexed as overlapping chunks rather than one vector per video
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            add_start_index=True
+        )
+        
+        self.embedding_batch_size = EMBEDDING_BATCH_SIZE
+        self.embedding_float16 = EMBEDDING_FLOAT16
+        self.embedding_stats = {'texts': 0, 'seconds': 0.0}
+        self._embedding_stats_lock = threading.Lock()
+        
+        # Bytes and time per table-scan phase ('scan' = ids + vectors, 'hydrate' = top-k text)
+        self.retrieval_stats = {phase: {'requests': 0, 'rows': 0, 'bytes': 0, 'seconds': 0.0} for phase in ('scan', 'hydrate')}
+        self._retrieval_stats_lock = threading.Lock()
+        
+        # One lazily-loaded model shared by the whole process (see warmup())
+        self.model_holder = get_shared_model(EMBEDDING_MODEL_NAME, EMBEDDING_NUM_THREADS)
+    
+    @property
+    def embedding_model(self):
+        """The shared SentenceTransformer, loaded on first use (None if unavailable)"""
+        return self.model_holder.get()
+    
+    def warmup(self, background: bool = True):
+        """Load and exercise the embedding model ahead of the first request"""
+        return self.model_holder.warmup(background=background)
+    
+    def model_status(self) -> Dict[str, Any]:
+        """Embedding model readiness for /api/health"""
+        return self.model_holder.status()
     
     def get_supabase_client(self, creator_name: str) -> Optional[Client]:
         """Get or create Supabase client for a specific creator"""
@@ -64,106 +221,576 @@ class RAGService:
             logger.error(f"❌ Failed to create Supabase client for {creator_name}: {e}")
             return None
     
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for given text"""
-        if not self.embedding_model:
+    def get_knowledge_store(self, creator_name: str) -> Optional[KnowledgeStore]:
+        """Get or create the knowledge store (Supabase or SQLite) a creator is served from"""
+        if creator_name in self.knowledge_stores:
+            return self.knowledge_stores[creator_name]
+        
+        config = get_creator_config(creator_name)
+        if config.get('knowledge_store', KNOWLEDGE_STORE) == 'sqlite':
+            path = self._resolve_path(config.get('sqlite_path', SQLITE_STORE_PATH))
+            if path not in self.sqlite_stores:
+                self.sqlite_stores[path] = SQLiteStore(path)
+                logger.info(f"✅ SQLite knowledge store opened at {path}")
+            store = self.sqlite_stores[path]
+        else:
+            client = self.get_supabase_client(creator_name)
+            if not client:
+                return None
+            store = SupabaseStore(client)
+        
+        self.knowledge_stores[creator_name] = store
+        return store
+    
+    def generate_embedding(self, text: str, use_cache: bool = False) -> List[float]:
+        """Generate embedding for given text (optionally through the on-disk cache)"""
+        embeddings = self.generate_embeddings([text], use_cache=use_cache)
+        if len(embeddings) == 0:
             return []
+        return embeddings[0].tolist()
+    
+    def generate_embeddings(self, texts: List[str], batch_size: Optional[int] = None,
+                            use_cache: bool = False, float16: Optional[bool] = None) -> np.ndarray:
+        """Generate embeddings for many texts with batched model calls; returns an (n, dim) array"""
+        float16 = self.embedding_float16 if float16 is None else float16
+        dtype = np.float16 if float16 else np.float32
+        if not self.embedding_model or not texts:
+            return np.zeros((0, self.embedding_dim), dtype=dtype)
+        
+        embeddings = np.zeros((len(texts), self.embedding_dim), dtype=np.float32)
+        missing = list(range(len(texts)))
+        if use_cache:
+            found, missing = self.embedding_cache.get_many(texts)
+            for i, vector in found.items():
+                embeddings[i] = vector
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            try:
+                started = time.perf_counter()
+                encoded = self.embedding_model.encode(
+                    missing_texts,
+                    batch_size=batch_size or self.embedding_batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+                elapsed = time.perf_counter() - started
+            except Exception as e:
+                logger.error(f"❌ Error generating embeddings: {e}")
+                return np.zeros((0, self.embedding_dim), dtype=dtype)
+            
+            embeddings[missing] = encoded
+            with self._embedding_stats_lock:
+                self.embedding_stats['texts'] += len(missing_texts)
+                self.embedding_stats['seconds'] += elapsed
+            if len(missing_texts) > 1:
+                logger.info(f"🧮 Encoded {len(missing_texts)} texts in {elapsed:.2f}s "
+                            f"({len(missing_texts) / max(elapsed, 1e-9):.1f} texts/sec)")
+            
+            if use_cache:
+                # Written to disk in batches off the request path (see EmbeddingCache)
+                for i, vector in zip(missing, encoded):
+                    self.embedding_cache.put(texts[i], vector)
+        
+        return embeddings.astype(dtype, copy=False)
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embedding for a user message, memoized briefly across the request pipeline"""
+        embedding = self.query_embeddings.get(query)
+        if embedding is None:
+            embedding = self.generate_embedding(query)
+            if embedding:
+                self.query_embeddings.set(query, embedding)
+        return embedding
+    
+    def get_embedding_throughput(self) -> Dict[str, float]:
+        """Total texts encoded so far and the average throughput in texts/sec"""
+        with self._embedding_stats_lock:
+            texts, seconds = self.embedding_stats['texts'], self.embedding_stats['seconds']
+        return {
+            'texts': texts,
+            'seconds': round(seconds, 3),
+            'texts_per_sec': round(texts / seconds, 1) if seconds else 0.0
+        }
+    
+    def embed_entries(self, entries: List[Dict[str, Any]]) -> List[Optional[np.ndarray]]:
+        """Get one vector per knowledge row, reusing stored and cached embeddings"""
+        vectors: List[Optional[np.ndarray]] = [None] * len(entries)
+        texts: Dict[int, str] = {}
+        
+        for i, entry in enumerate(entries):
+            stored = parse_embedding(entry.get('embedding'))
+            if stored is not None:
+                vectors[i] = stored
+                continue
+            text = build_entry_text(entry)
+            if text:
+                texts[i] = text
+        
+        if not texts:
+            return vectors
+        
+        # Only entries never seen before are sent through the model, in batches
+        positions = list(texts.keys())
+        embeddings = self.generate_embeddings([texts[i] for i in positions], use_cache=True)
+        for i, vector in zip(positions, embeddings):
+            vectors[i] = vector
+        
+        return vectors
+    
+    def chunk_entries(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Split knowledge rows into overlapping chunks with stable IDs and character offsets"""
+        chunks = []
+        for entry in entries:
+            field = next((f for f in CHUNK_TEXT_FIELDS if entry.get(f)), None)
+            if not field:
+                continue
+            
+            source_id = get_source_id(entry)
+            text = str(entry[field])
+            # Keep the row's small fields (title, url, date, metadata...) on every chunk
+            base = {k: v for k, v in entry.items() if k not in CHUNK_TEXT_FIELDS and k not in ('embedding', 'similarity')}
+            
+            documents: List[Document] = self.text_splitter.create_documents([text])
+            offset = 0
+            for chunk_index, document in enumerate(documents):
+                start = document.metadata.get('start_index', -1)
+                if start < 0:
+                    start = offset
+                offset = start + 1
+                chunks.append({
+                    **base,
+                    'chunk_id': f"{source_id}:{start}",
+                    'source_id': source_id,
+                    'chunk_index': chunk_index,
+                    'source_field': field,
+                    'start_index': start,
+                    'end_index': start + len(document.page_content),
+                    'content': document.page_content,
+                    # Counted once at ingest so packing a prompt doesn't re-tokenize
+                    'token_count': estimate_tokens(document.page_content)
+                })
+        return chunks
+    
+    def corpus_version(self, creator_name: str) -> Tuple[float, ...]:
+        """Changes whenever the creator's corpus is re-ingested (marker file, local corpus or index file mtime)"""
+        config = get_creator_config(creator_name)
+        mtimes = []
+        for key in ('local_corpus', 'index_file'):
+            mtime = 0.0
+            if config.get(key):
+                try:
+                    mtime = os.stat(self._resolve_path(config[key])).st_mtime
+                except OSError:
+                    pass
+            mtimes.append(mtime)
+        return (corpus_marker_version(creator_name), *mtimes)
+    
+    @staticmethod
+    def _resolve_path(path: str) -> str:
+        """Paths in creator_config are relative to the repository root"""
+        return path if os.path.isabs(path) else os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+    
+    def get_local_index(self, creator_name: str) -> Optional[VectorIndex]:
+        """Get or build the in-process index for a creator's local corpus"""
+        index = self.local_indexes.get(creator_name)
+        if index is not None and not isinstance(index, MappedIndex):
+            return self.refresh_local_index(creator_name, index)
+        if index is not None and not index.is_stale():
+            return index
+        
+        # A prebuilt index file is mapped rather than rebuilt (and reopened when it is swapped)
+        index_file = get_creator_config(creator_name).get('index_file', '')
+        if index_file and os.path.exists(self._resolve_path(index_file)):
+            return self.open_index_file(creator_name, self._resolve_path(index_file))
+        if index is not None:
+            return index
+        
+        corpus = get_creator_config(creator_name).get('local_corpus', '')
+        if not corpus or not self.embedding_model:
+            return None
+        
+        corpus_path = self._resolve_path(corpus)
+        if not os.path.exists(corpus_path):
+            logger.warning(f"⚠️ Local corpus for {creator_name} not found: {corpus_path}")
+            return None
         
+        with self._local_index_lock:
+            if creator_name not in self.local_indexes:
+                try:
+                    # Taken before reading the corpus, so rows appended during the build are picked up later
+                    self.local_corpus_checks[creator_name] = (os.stat(corpus_path).st_mtime, time.monotonic())
+                    if VECTOR_INDEX_TYPE == 'ivf':
+                        index = self.load_or_build_ivf_index(creator_name, corpus_path)
+                    else:
+                        index = build_corpus_index(
+                            corpus_path, self.embed_entries, self.embedding_dim, chunker=self.chunk_entries,
+                            index_factory=lambda dim: VectorIndex(dim, INDEX_STORAGE, RERANK_K, self.rerank_path(creator_name))
+                        )
+                    self.local_indexes[creator_name] = index
+                except Exception as e:
+                    logger.error(f"❌ Failed to build local index for {creator_name}: {e}")
+                    return None
+        return self.local_indexes[creator_name]
+    
+    def refresh_local_index(self, creator_name: str, index: VectorIndex) -> VectorIndex:
+        """Add chunks of rows appended to the creator's corpus since the index was built (no retraining)"""
+        covered, checked = self.local_corpus_checks.get(creator_name, (None, 0.0))
+        now = time.monotonic()
+        if now - checked < LOCAL_CORPUS_CHECK_INTERVAL:
+            return index
+        corpus_path = self._resolve_path(get_creator_config(creator_name).get('local_corpus', ''))
         try:
-            embedding = self.embedding_model.encode(text)
-            return embedding.tolist()
-        except Exception as e:
-            logger.error(f"❌ Error generating embedding: {e}")
+            mtime = os.stat(corpus_path).st_mtime
+        except OSError:
+            return index
+        self.local_corpus_checks[creator_name] = (covered, now)
+        if mtime == covered:
+            return index
+        
+        with self._local_index_lock:
+            current = self.local_indexes.get(creator_name, index)
+            if self.local_corpus_checks[creator_name][0] == mtime:
+                return current
+            try:
+                updated = self.add_new_chunks(creator_name, current, corpus_path)
+                if isinstance(updated, IVFIndex):
+                    updated.save(self.ann_index_path(creator_name), {'source': self.ivf_source(creator_name, mtime)})
+            except Exception as e:
+                logger.error(f"❌ Failed to add new corpus rows to the local index for {creator_name}: {e}")
+                return current
+            # Queries already holding the previous index keep using it until they finish
+            self.local_indexes[creator_name] = updated
+            self.local_corpus_checks[creator_name] = (mtime, now)
+        return updated
+    
+    def add_new_chunks(self, creator_name: str, index: VectorIndex, corpus_path: str) -> VectorIndex:
+        """Copy of index with the corpus chunks it doesn't have yet (index itself if there are none)"""
+        known = set(index.ids)
+        new_chunks: Dict[str, Dict[str, Any]] = {}
+        for chunk in self.chunk_entries(load_csv_records(corpus_path)):
+            if chunk['chunk_id'] not in known:
+                new_chunks.setdefault(chunk['chunk_id'], chunk)
+        if not new_chunks:
+            return index
+        
+        chunks = list(new_chunks.values())
+        kept = [(chunk, vector) for chunk, vector in zip(chunks, self.embed_entries(chunks)) if vector is not None]
+        if not kept:
+            return index
+        updated = index.copy()
+        # IVF indexes assign the new vectors to their nearest existing cluster
+        updated.add([chunk['chunk_id'] for chunk, _ in kept], np.stack([vector for _, vector in kept]), [chunk for chunk, _ in kept])
+        logger.info(f"✅ Added {len(kept)} new chunks to the local index for {creator_name} ({len(updated)} entries)")
+        return updated
+    
+    def open_index_file(self, creator_name: str, path: str) -> Optional[VectorIndex]:
+        """Map a creator's index file, replacing any previously opened version"""
+        with self._local_index_lock:
+            current = self.local_indexes.get(creator_name)
+            if isinstance(current, MappedIndex) and current.path == path and not current.is_stale():
+                return current
+            try:
+                index = MappedIndex(path)
+            except Exception as e:
+                logger.error(f"❌ Failed to open index file {path}: {e}")
+                return current
+            # Files written with BM25 postings share them through the mapping; older ones build on first use
+            if index.lexical is not None:
+                self.lexical_indexes[creator_name] = (index, index.lexical)
+            # Queries already holding the previous mapping keep using it until they finish
+            self.local_indexes[creator_name] = index
+        logger.info(f"✅ Mapped index file for {creator_name}: {len(index)} entries")
+        return index
+    
+    @staticmethod
+    def ann_index_path(creator_name: str, suffix: str = '.npz') -> str:
+        return os.path.join(ANN_INDEX_DIR, re.sub(r"[^A-Za-z0-9_-]+", "_", creator_name) + suffix)
+    
+    def rerank_path(self, creator_name: str) -> Optional[str]:
+        """Float32 sidecar for exact reranking (only needed when vectors are quantized)"""
+        if RERANK_K <= 0 or INDEX_STORAGE == 'float32':
+            return None
+        return self.ann_index_path(creator_name, '.f32')
+    
+    def load_or_build_ivf_index(self, creator_name: str, corpus_path: str) -> IVFIndex:
+        """Load the saved IVF index for a corpus, or build and save it if missing or stale"""
+        path = self.ann_index_path(creator_name)
+        source = self.ivf_source(creator_name, os.stat(corpus_path).st_mtime)
+        if os.path.exists(path):
+            try:
+                index, meta = IVFIndex.load(path)
+                saved = meta.get('source') or {}
+                same_build = {**saved, 'corpus_mtime': source['corpus_mtime']} == source
+                if same_build and (not source['rerank'] or index.rerank_source is not None):
+                    # Recall/latency knobs come from the current environment
+                    index.nprobe = IVF_NPROBE
+                    index.rerank_k = RERANK_K
+                    if saved.get('corpus_mtime') != source['corpus_mtime']:
+                        # Rows ingested since the save join the existing clusters
+                        index = self.add_new_chunks(creator_name, index, corpus_path)
+                        index.save(path, {'source': source})
+                    logger.info(f"✅ Loaded IVF index for {creator_name}: {len(index)} entries")
+                    return index
+            except Exception as e:
+                logger.warning(f"⚠️ Could not load IVF index {path}: {e}")
+        
+        index = build_corpus_index(
+            corpus_path, self.embed_entries, self.embedding_dim, chunker=self.chunk_entries,
+            index_factory=lambda dim: IVFIndex(
+                dim, nlist=IVF_NLIST, nprobe=IVF_NPROBE,
+                storage=INDEX_STORAGE, rerank_k=RERANK_K, rerank_path=self.rerank_path(creator_name)
+            )
+        )
+        index.save(path, {'source': source})
+        return index
+    
+    def ivf_source(self, creator_name: str, corpus_mtime: float) -> Dict[str, Any]:
+        """What a saved IVF index was built from; any difference but the corpus mtime means a rebuild"""
+        return {
+            'corpus_mtime': corpus_mtime,
+            'model': EMBEDDING_MODEL_NAME,
+            'storage': INDEX_STORAGE,
+            'rerank': self.rerank_path(creator_name) is not None
+        }
+    
+    def search_local_index(self, query: str, creator_name: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Search a creator's local corpus without touching the network"""
+        index = self.get_local_index(creator_name)
+        if index is None:
+            logger.warning(f"⚠️ No local index available for {creator_name}")
             return []
+        
+        query_embedding = self.embed_query(query)
+        if not query_embedding:
+            return []
+        
+        if self.hybrid_mode == 'off':
+            results = index.search(query_embedding, k=limit, min_score=0.1)
+        else:
+            results = self.hybrid_search(index, self.get_lexical_index(creator_name, index), query, query_embedding, limit)
+        logger.info(f"✅ Found {len(results)} relevant entries via local index")
+        return results
+    
+    def get_lexical_index(self, creator_name: str, index: VectorIndex) -> BM25Index:
+        """BM25 index whose positions line up with index, built on first use if the index file had none"""
+        indexed, lexical = self.lexical_indexes.get(creator_name, (None, None))
+        if indexed is index:
+            return lexical
+        lexical = self.build_lexical_index(index.records)
+        # Built outside _local_index_lock; concurrent first queries may both build, and either result is valid
+        self.lexical_indexes[creator_name] = (index, lexical)
+        return lexical
+    
+    @staticmethod
+    def build_lexical_index(records: List[Dict[str, Any]]) -> BM25Index:
+        """BM25 index over each record's title and text"""
+        lexical = BM25Index()
+        lexical.add([RAGService.lexical_text(record) for record in records])
+        return lexical
+    
+    @staticmethod
+    def lexical_text(record: Dict[str, Any]) -> str:
+        return " ".join(str(record.get(field) or '') for field in ('title',) + CHUNK_TEXT_FIELDS)
+    
+    def hybrid_search(self, index: VectorIndex, lexical: BM25Index, query: str,
+                      query_embedding: List[float], limit: int = 5) -> List[Dict[str, Any]]:
+        """Fuse BM25 and vector rankings of a local index by reciprocal rank"""
+        depth = max(limit * 4, 20)
+        prefilter = self.hybrid_mode == 'prefilter'
+        lexical_hits = lexical.search(query, k=LEXICAL_CANDIDATES if prefilter else depth)
+        
+        # Too few term matches to prefilter on (e.g. a paraphrased question): score everything
+        candidates = [position for position, _ in lexical_hits] if prefilter and len(lexical_hits) >= limit else None
+        vector_hits = [(position, score) for position, score in index.rank(query_embedding, depth, candidates) if score > 0.1]
+        
+        fused = reciprocal_rank_fusion([
+            [position for position, _ in vector_hits],
+            [position for position, _ in lexical_hits[:depth]]
+        ])[:limit]
+        
+        similarities = dict(vector_hits)
+        missing = [position for position, _ in fused if position not in similarities]
+        if missing:
+            similarities.update(index.rank(query_embedding, len(missing), missing))
+        lexical_scores = dict(lexical_hits)
+        
+        results = []
+        for position, fused_score in fused:
+            entry = dict(index.records[position])
+            entry['similarity'] = similarities[position]
+            entry['lexical_score'] = lexical_scores.get(position, 0.0)
+            entry['fused_score'] = fused_score
+            results.append(entry)
+        return results
+    
+    def score_rows(self, query_embedding: List[float], rows: List[Dict[str, Any]], limit: int = 5) -> List[Dict[str, Any]]:
+        """Rank the chunks of fetched table rows against the query embedding"""
+        # Score transcript chunks rather than whole videos; chunk vectors are cached,
+        # so only the query is encoded per request once a row has been seen
+        chunks = self.chunk_entries(rows)
+        entry_embeddings = self.embed_entries(chunks)
+        scored = [(entry, vector) for entry, vector in zip(chunks, entry_embeddings) if vector is not None]
+        if not scored:
+            return []
+        
+        # Score all rows with one matrix-vector product over normalized vectors
+        # Very permissive threshold: accept anything with >0.1 similarity (very low bar)
+        scan_index = VectorIndex(self.embedding_dim)
+        scan_index.add(
+            [str(i) for i in range(len(scored))],
+            np.stack([vector for _, vector in scored]),
+            [entry for entry, _ in scored]
+        )
+        return scan_index.search(query_embedding, k=limit, min_score=0.1)
+    
+    def record_phase(self, phase: str, rows: Any, seconds: float) -> Dict[str, Any]:
+        """Add one retrieval phase to the running totals; returns that phase's numbers"""
+        sample = {'rows': len(rows or []), 'bytes': payload_bytes(rows), 'ms': round(seconds * 1000, 1)}
+        with self._retrieval_stats_lock:
+            totals = self.retrieval_stats[phase]
+            totals['requests'] += 1
+            totals['rows'] += sample['rows']
+            totals['bytes'] += sample['bytes']
+            totals['seconds'] += seconds
+        return sample
+    
+    def get_retrieval_stats(self) -> Dict[str, Dict[str, float]]:
+        """Average rows, bytes and milliseconds per table-scan phase"""
+        with self._retrieval_stats_lock:
+            return {
+                phase: {
+                    'requests': totals['requests'],
+                    'avg_rows': round(totals['rows'] / totals['requests'], 1) if totals['requests'] else 0,
+                    'avg_bytes': round(totals['bytes'] / totals['requests']) if totals['requests'] else 0,
+                    'avg_ms': round(totals['seconds'] * 1000 / totals['requests'], 1) if totals['requests'] else 0
+                }
+                for phase, totals in self.retrieval_stats.items()
+            }
+    
+    def rank_stored_embeddings(self, query_embedding: List[float], rows: List[Dict[str, Any]], id_column: str,
+                               limit: int) -> Optional[List[Tuple[Any, float]]]:
+        """(id, similarity) of the best rows by their stored embedding; None if no row has one"""
+        vectors = [(row.get(id_column), parse_embedding(row.get('embedding'))) for row in rows]
+        vectors = [(row_id, vector) for row_id, vector in vectors if vector is not None and vector.shape[0] == self.embedding_dim]
+        if not vectors:
+            return None
+        index = VectorIndex(self.embedding_dim)
+        index.add([str(row_id) for row_id, _ in vectors], np.stack([vector for _, vector in vectors]), [{} for _ in vectors])
+        # Very permissive threshold: accept anything with >0.1 similarity (very low bar)
+        return [(vectors[position][0], score) for position, score in index.rank(query_embedding, limit) if score > 0.1]
+    
+    @staticmethod
+    def scan_columns(config: Dict[str, Any], id_column: str) -> str:
+        """Columns of the scan phase: ids and vectors, plus the owner on the shared table"""
+        if 'knowledge_table' in config:
+            return f"{id_column},embedding"
+        return f"{id_column},creator_id,embedding"
+    
+    @staticmethod
+    def own_rows(config: Dict[str, Any], rows: List[Dict[str, Any]], creator_id: Optional[int]) -> List[Dict[str, Any]]:
+        """Drop other creators' rows when the creator shares the default knowledge table"""
+        if 'knowledge_table' in config or creator_id is None:
+            return rows
+        return [row for row in rows if row.get('creator_id') in (None, creator_id)]
+    
+    @staticmethod
+    def merge_hydrated(ranked: List[Tuple[Any, float]], rows: List[Dict[str, Any]], id_column: str) -> List[Dict[str, Any]]:
+        """Hydrated rows in score order, each with its 'similarity'"""
+        by_id = {str(row.get(id_column)): row for row in rows}
+        results = []
+        for row_id, score in ranked:
+            row = by_id.get(str(row_id))
+            if row is not None:
+                results.append({**row, 'similarity': score})
+        return results
+    
+    def two_phase_search(self, store: KnowledgeStore, creator_name: str, creator_id: Optional[int],
+                         query_embedding: List[float], limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """Score a table on ids + stored vectors, then fetch text for the top-k only.
+        Returns None when the table has no stored embeddings to score."""
+        config = get_creator_config(creator_name)
+        table_name = config.get('knowledge_table', 'creator_knowledge')
+        id_column = config.get('id_column', 'id')
+        
+        start = time.perf_counter()
+        scan_rows = store.scan(table_name, self.scan_columns(config, id_column), TABLE_SCAN_LIMIT)
+        scan = self.record_phase('scan', scan_rows, time.perf_counter() - start)
+        ranked = self.rank_stored_embeddings(query_embedding, self.own_rows(config, scan_rows, creator_id), id_column, limit)
+        if ranked is None:
+            return None
+        if not ranked:
+            logger.info(f"ℹ️ No rows above threshold (scan: {scan['rows']} rows, {scan['bytes']} bytes, {scan['ms']}ms)")
+            return []
+        
+        start = time.perf_counter()
+        text_rows = store.fetch(table_name, config.get('text_columns', DEFAULT_TEXT_COLUMNS), id_column,
+                                [row_id for row_id, _ in ranked])
+        hydrate = self.record_phase('hydrate', text_rows, time.perf_counter() - start)
+        logger.info(f"✅ Two-phase retrieval from {table_name}: scan {scan['rows']} rows/{scan['bytes']} bytes/{scan['ms']}ms, "
+                    f"hydrate {hydrate['rows']} rows/{hydrate['bytes']} bytes/{hydrate['ms']}ms")
+        return self.merge_hydrated(ranked, text_rows, id_column)
     
     def search_knowledge_base(self, query: str, creator_name: str, creator_id: int, limit: int = 5) -> List[Dict[str, Any]]:
         """Search knowledge base for relevant information"""
-        # Get creator-specific Supabase client
-        supabase = self.get_supabase_client(creator_name)
+        config = get_creator_config(creator_name)
+        backend = config.get('retrieval_backend', self.retrieval_backend)
+        if backend == 'local':
+            return self.search_local_index(query, creator_name, limit)
+        
+        # Get creator-specific knowledge store (unless it is known not to work)
+        method = self.creator_cache.get_method(creator_name)
+        store = self.get_knowledge_store(creator_name) if method != 'none' else None
         
-        if not supabase or not self.embedding_model:
+        if not store or not self.embedding_model:
+            # Offline: serve from the local corpus if this creator has one
+            if self.get_local_index(creator_name) is not None:
+                logger.info(f"ℹ️ Supabase not available for {creator_name}, using local index")
+                return self.search_local_index(query, creator_name, limit)
             logger.warning("⚠️ Supabase or embedding model not available, using fallback")
             return []
         
         try:
             # Get creator config to check for custom table name
-            from creator_config import get_creator_config
-            config = get_creator_config(creator_name)
             table_name = config.get('knowledge_table', 'creator_knowledge')
             
             # Generate query embedding
-            query_embedding = self.generate_embedding(query)
+            query_embedding = self.embed_query(query)
             if not query_embedding:
                 return []
             
             # Try different search methods
-            # Method 1: Use RPC function if available
+            # Method 1: Use the store's vector match (RPC) if available (skipped once it is known to fail)
+            if method != 'table':
+                try:
+                    matches = store.match(table_name, query_embedding, creator_id, 0.7, limit)
+                    self.creator_cache.set_method(creator_name, 'rpc')
+                    
+                    if matches:
+                        logger.info(f"✅ Found {len(matches)} relevant knowledge entries via RPC")
+                        return matches
+                except Exception as rpc_error:
+                    self.creator_cache.set_method(creator_name, 'table')
+                    logger.info(f"ℹ️ RPC function not available for {creator_name}, using direct table queries: {rpc_error}")
+            
+            # Method 2: score stored embeddings, then fetch text for the top-k only
             try:
-                response = supabase.rpc(
-                    'match_creator_knowledge',
-                    {
-                        'query_embedding': query_embedding,
-                        'creator_id': creator_id,
-                        'match_threshold': 0.7,
-                        'match_count': limit
-                    }
-                ).execute()
-                
-                if response.data and len(response.data) > 0:
-                    logger.info(f"✅ Found {len(response.data)} relevant knowledge entries via RPC")
-                    return response.data
-            except Exception as rpc_error:
-                logger.info(f"ℹ️ RPC function not available, trying direct table query: {rpc_error}")
+                results = self.two_phase_search(store, creator_name, creator_id, query_embedding, limit)
+                if results is not None:
+                    return results
+                logger.info(f"ℹ️ {table_name} has no stored embeddings, scoring row text instead")
+            except Exception as two_phase_error:
+                logger.warning(f"⚠️ Two-phase retrieval failed for {table_name}: {two_phase_error}")
             
-            # Method 2: Use LangChain for semantic similarity search
+            # Method 3: Use LangChain for semantic similarity search over the row text
             try:
-                # Get all entries from the table
-                response = supabase.table(table_name).select('*').limit(100).execute()
+                # Get all entries from the table (text columns only)
+                rows = self.own_rows(config, store.scan(table_name, config.get('text_columns', '*'), TABLE_SCAN_LIMIT), creator_id)
                 
-                if response.data and len(response.data) > 0:
-                    logger.info(f"✅ Found {len(response.data)} entries from {table_name}")
-                    
-                    # Use LangChain for semantic similarity matching
-                    # Generate query embedding
-                    query_embedding = self.generate_embedding(query)
-                    if not query_embedding:
-                        return []
-                    
-                    # Calculate similarity scores for all entries
-                    relevant_entries = []
-                    query_embedding_np = np.array(query_embedding)
-                    
-                    for entry in response.data:
-                        # Get text content from various fields
-                        title = entry.get('title', '')
-                        description = entry.get('description', '')
-                        content = entry.get('content', '')
-                        transcript = entry.get('transcript', '')
-                        
-                        # Combine all text fields
-                        combined_text = f"{title} {description} {content} {transcript}".strip()
-                        
-                        if not combined_text:
-                            continue
-                        
-                        # Generate embedding for this entry
-                        entry_embedding = self.generate_embedding(combined_text)
-                        if not entry_embedding:
-                            continue
-                        
-                        # Calculate cosine similarity
-                        entry_embedding_np = np.array(entry_embedding)
-                        similarity = np.dot(query_embedding_np, entry_embedding_np) / (
-                            np.linalg.norm(query_embedding_np) * np.linalg.norm(entry_embedding_np)
-                        )
-                        
-                        # Very permissive threshold: accept anything with >0.1 similarity (very low bar)
-                        if similarity > 0.1:
-                            entry['similarity'] = float(similarity)
-                            relevant_entries.append(entry)
+                if rows:
+                    logger.info(f"✅ Found {len(rows)} entries from {table_name}")
                     
-                    # Sort by similarity and return top results
-                    relevant_entries.sort(key=lambda x: x.get('similarity', 0), reverse=True)
+                    relevant_entries = self.score_rows(query_embedding, rows, limit)
                     
                     if relevant_entries:
                         logger.info(f"✅ Found {len(relevant_entries)} relevant entries via semantic search")
@@ -176,10 +803,10 @@ class RAGService:
                 logger.warning(f"⚠️ Semantic search failed: {semantic_error}")
                 # Fallback: return first few entries if semantic search fails
                 try:
-                    response = supabase.table(table_name).select('*').limit(limit).execute()
-                    if response.data:
-                        logger.info(f"⚠️ Using fallback: returning first {len(response.data)} entries")
-                        return response.data
+                    rows = store.scan(table_name, '*', limit)
+                    if rows:
+                        logger.info(f"⚠️ Using fallback: returning first {len(rows)} entries")
+                        return rows
                 except:
                     pass
                 return []
@@ -192,27 +819,195 @@ class RAGService:
             return []
     
     def get_creator_info(self, creator_name: str, creator_id: int) -> Dict[str, Any]:
-        """Get creator information"""
-        supabase = self.get_supabase_client(creator_name)
+        """Get creator information (served from the metadata cache when fresh)"""
+        cached = self.creator_cache.get_info(creator_name, creator_id)
+        if cached is not None:
+            return cached
         
-        if not supabase:
+        store = self.get_knowledge_store(creator_name)
+        
+        if not store:
             return {}
         
         try:
-            response = supabase.table('creators').select('*').eq('id', creator_id).execute()
-            if response.data:
-                return response.data[0]
+            info = store.get_creator(creator_id)
+            self.creator_cache.set_info(creator_name, creator_id, info)
+            return info
+        except Exception as e:
+            logger.error(f"❌ Error getting creator info: {e}")
             return {}
+    
+    def probe_retrieval_method(self, creator_name: str) -> str:
+        """Find out which search method works for a creator and remember it"""
+        store = self.get_knowledge_store(creator_name)
+        method = 'none'
+        if store:
+            table_name = get_creator_config(creator_name).get('knowledge_table', 'creator_knowledge')
+            try:
+                store.match(table_name, [0.0] * self.embedding_dim, 0, 1.0, 1)
+                method = 'rpc'
+            except Exception:
+                try:
+                    store.scan(table_name, '*', 1)
+                    method = 'table'
+                except Exception as e:
+                    logger.warning(f"⚠️ Knowledge table {table_name} not reachable for {creator_name}: {e}")
+        self.creator_cache.set_method(creator_name, method)
+        return method
+    
+    def prime_creator_cache(self, creator_ids: Dict[str, int], background: bool = False):
+        """Populate creator metadata and retrieval methods up front (e.g. at server start)"""
+        def _prime():
+            for creator_name in self.creator_cache.prime_from_config(default_store=KNOWLEDGE_STORE):
+                self.probe_retrieval_method(creator_name)
+                if creator_name in creator_ids:
+                    self.get_creator_info(creator_name, creator_ids[creator_name])
+            logger.info("✅ Creator metadata cache primed")
+        
+        if not background:
+            _prime()
+            return None
+        thread = threading.Thread(target=_prime, name="creator-cache-prime", daemon=True)
+        thread.start()
+        return thread
+    
+    def invalidate_creator(self, creator_name: Optional[str] = None):
+        """Drop cached metadata for one creator (or all), e.g. after editing the creators table"""
+        self.creator_cache.invalidate(creator_name)
+    
+    def get_async_supabase(self, creator_name: str) -> Optional[AsyncSupabaseREST]:
+        """Get or create the asyncio PostgREST client for a creator (ASGI mode)"""
+        if creator_name in self.async_supabase_clients:
+            return self.async_supabase_clients[creator_name]
+        
+        config = get_creator_config(creator_name)
+        if not config.get('supabase_url') or not config.get('supabase_key'):
+            return None
+        if config.get('knowledge_store', KNOWLEDGE_STORE) != 'supabase':
+            # Local stores are queried through the sync path in the executor
+            return None
+        
+        client = AsyncSupabaseREST(config['supabase_url'], config['supabase_key'])
+        self.async_supabase_clients[creator_name] = client
+        return client
+    
+    async def run_blocking(self, func, *args):
+        """Run CPU-bound or blocking work (embedding, local search) off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+    
+    async def aget_creator_info(self, creator_name: str, creator_id: int) -> Dict[str, Any]:
+        """Async variant of get_creator_info"""
+        cached = self.creator_cache.get_info(creator_name, creator_id)
+        if cached is not None:
+            return cached
+        
+        client = self.get_async_supabase(creator_name)
+        if not client:
+            return await self.run_blocking(self.get_creator_info, creator_name, creator_id)
+        
+        try:
+            rows = await client.select('creators', filters={'id': f'eq.{creator_id}'})
+            info = rows[0] if rows else {}
+            self.creator_cache.set_info(creator_name, creator_id, info)
+            return info
         except Exception as e:
             logger.error(f"❌ Error getting creator info: {e}")
             return {}
     
-    def build_context_from_knowledge(self, knowledge_entries: List[Dict[str, Any]]) -> str:
-        """Build context string from retrieved knowledge entries"""
-        if not knowledge_entries:
-            return ""
+    async def asearch_knowledge_base(self, query: str, creator_name: str, creator_id: int, limit: int = 5) -> List[Dict[str, Any]]:
+        """Async variant of search_knowledge_base: HTTP on the event loop, embedding in the executor"""
+        config = get_creator_config(creator_name)
+        method = self.creator_cache.get_method(creator_name)
+        client = self.get_async_supabase(creator_name) if method != 'none' else None
+        if config.get('retrieval_backend', self.retrieval_backend) == 'local' or not client:
+            # Local retrieval never touches the network
+            return await self.run_blocking(self.search_knowledge_base, query, creator_name, creator_id, limit)
         
-        context_parts = []
+        try:
+            table_name = config.get('knowledge_table', 'creator_knowledge')
+            query_embedding = await self.run_blocking(self.embed_query, query)
+            if not query_embedding:
+                return []
+            
+            # Method 1: Use RPC function if available (skipped once it is known to fail)
+            if method != 'table':
+                try:
+                    rows = await self.amatch(client, table_name, query_embedding, creator_id, 0.7, limit)
+                    self.creator_cache.set_method(creator_name, 'rpc')
+                    if rows:
+                        logger.info(f"✅ Found {len(rows)} relevant knowledge entries via RPC")
+                        return rows
+                except Exception as rpc_error:
+                    self.creator_cache.set_method(creator_name, 'table')
+                    logger.info(f"ℹ️ RPC function not available for {creator_name}, using direct table queries: {rpc_error}")
+            
+            # Method 2: score stored embeddings, then fetch text for the top-k only
+            try:
+                results = await self.atwo_phase_search(client, creator_name, creator_id, query_embedding, limit)
+                if results is not None:
+                    return results
+            except Exception as two_phase_error:
+                logger.warning(f"⚠️ Two-phase retrieval failed for {table_name}: {two_phase_error}")
+            
+            # Method 3: table scan of the row text, scored in the executor
+            rows = self.own_rows(config, await client.select(table_name, columns=config.get('text_columns', '*'), limit=TABLE_SCAN_LIMIT), creator_id)
+            if not rows:
+                logger.info("ℹ️ No relevant knowledge found")
+                return []
+            relevant_entries = await self.run_blocking(self.score_rows, query_embedding, rows, limit)
+            logger.info(f"✅ Found {len(relevant_entries)} relevant entries via semantic search")
+            return relevant_entries
+        except Exception as e:
+            logger.error(f"❌ Error searching knowledge base: {e}")
+            return []
+    
+    async def amatch(self, client: AsyncSupabaseREST, table_name: str, query_embedding: List[float],
+                     creator_id: Optional[int], threshold: float, limit: int) -> List[Dict[str, Any]]:
+        """Async vector match RPC (same functions, same fallback order as SupabaseStore.match)"""
+        calls = match_rpc_calls(table_name, query_embedding, creator_id, threshold, limit)
+        for i, (function, params) in enumerate(calls):
+            try:
+                return await client.rpc(function, params) or []
+            except Exception:
+                if i == len(calls) - 1:
+                    raise
+    
+    async def atwo_phase_search(self, client: AsyncSupabaseREST, creator_name: str, creator_id: Optional[int],
+                                query_embedding: List[float], limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """Async variant of two_phase_search"""
+        config = get_creator_config(creator_name)
+        table_name = config.get('knowledge_table', 'creator_knowledge')
+        id_column = config.get('id_column', 'id')
+        
+        start = time.perf_counter()
+        scan_rows = await client.select(table_name, columns=self.scan_columns(config, id_column), limit=TABLE_SCAN_LIMIT)
+        scan = self.record_phase('scan', scan_rows, time.perf_counter() - start)
+        ranked = await self.run_blocking(self.rank_stored_embeddings, query_embedding,
+                                         self.own_rows(config, scan_rows, creator_id), id_column, limit)
+        if not ranked:
+            return ranked
+        
+        start = time.perf_counter()
+        text_rows = await client.select(
+            table_name,
+            columns=config.get('text_columns', DEFAULT_TEXT_COLUMNS),
+            filters={id_column: postgrest_in([row_id for row_id, _ in ranked])}
+        )
+        hydrate = self.record_phase('hydrate', text_rows, time.perf_counter() - start)
+        logger.info(f"✅ Two-phase retrieval from {table_name}: scan {scan['rows']} rows/{scan['bytes']} bytes/{scan['ms']}ms, "
+                    f"hydrate {hydrate['rows']} rows/{hydrate['bytes']} bytes/{hydrate['ms']}ms")
+        return self.merge_hydrated(ranked, text_rows, id_column)
+    
+    def build_context_from_knowledge(self, knowledge_entries: List[Dict[str, Any]], query: str = '') -> str:
+        """Build context string from retrieved knowledge entries"""
+        return self.pack_knowledge(knowledge_entries, query)['text']
+    
+    def pack_knowledge(self, knowledge_entries: List[Dict[str, Any]], query: str = '',
+                       budget: Optional[int] = None) -> Dict[str, Any]:
+        """Pack the most relevant entries into the context token budget (text plus token accounting)"""
+        items = []
+        # Entries arrive best first (by similarity, or by fused rank for hybrid retrieval)
         for entry in knowledge_entries:
             # Handle different table structures
             # Standard structure: content, metadata
@@ -220,79 +1015,95 @@ class RAGService:
             
             content = entry.get('content', '') or entry.get('description', '') or entry.get('transcript', '')
             title = entry.get('title', '')
-            metadata = entry.get('metadata', {})
+            # Stores return the column as null when a row has no metadata
+            metadata = entry.get('metadata') or {}
             
             # If metadata is a string, try to parse it
             if isinstance(metadata, str):
                 try:
-                    import json
                     metadata = json.loads(metadata)
                 except:
                     metadata = {}
             
             source = metadata.get('source', '') or entry.get('source', '') or title
             
+            # Precomputed counts only describe the chunk content field
+            token_count = entry.get('token_count') if entry.get('content') else None
+            
             # Build context entry
             if title:
-                context_parts.append(f"Video: {title}\n{content}")
+                items.append((f"Video: {title}\n", content, token_count))
             elif source:
-                context_parts.append(f"Source: {source}\nContent: {content}")
+                items.append((f"Source: {source}\nContent: ", content, token_count))
             else:
-                context_parts.append(content)
+                items.append(("", content, token_count))
         
-        return "\n\n".join(context_parts)
+        return pack_context(items, query, CONTEXT_TOKEN_BUDGET if budget is None else budget)
     
     def retrieve_and_augment(self, query: str, creator_name: str, creator_id: int) -> Dict[str, Any]:
         """Main RAG function: retrieve relevant knowledge and prepare for augmentation"""
         try:
-            # Get creator information
-            creator_info = self.get_creator_info(creator_name, creator_id)
-            if not creator_info:
-                # If we can't get creator info, use the passed name
-                creator_info = {'name': creator_name, 'specialty': 'tech expert'}
+            # Creator lookup and knowledge search are independent, so overlap them
+            creator_info_future = self.io_executor.submit(self.get_creator_info, creator_name, creator_id)
             
             # Search for relevant knowledge (retrieve more entries for better context)
             knowledge_entries = self.search_knowledge_base(query, creator_name, creator_id, limit=5)
+            creator_info = creator_info_future.result()
             
-            if not knowledge_entries:
-                # No knowledge found - return fallback response
-                fallback_response = f"I haven't made any videos or content about that topic. As {creator_name}, I focus on {creator_info.get('specialty', 'tech content')}, so I don't have specific insights on that particular subject."
-                
-                return {
-                    'enhanced_system_prompt': f"You are {creator_name}. Respond as this creator would, but mention that you haven't covered this topic.",
-                    'knowledge_context': '',
-                    'creator_info': creator_info,
-                    'retrieved_entries': 0,
-                    'fallback_response': fallback_response,
-                    'has_knowledge': False
-                }
-            
-            # Build context from retrieved knowledge
-            knowledge_context = self.build_context_from_knowledge(knowledge_entries)
-            
-            # Debug: Log knowledge context length
-            logger.info(f"📚 Knowledge context length: {len(knowledge_context)} characters")
-            logger.info(f"📚 Knowledge preview: {knowledge_context[:200]}...")
+            return self.augment(query, creator_name, creator_info, knowledge_entries)
             
-            # Validate relevance: Only check if context is completely empty
-            # With semantic similarity, we trust the embeddings to find relevant content
-            if not knowledge_context or len(knowledge_context.strip()) < 10:
-                logger.info(f"❌ Knowledge context is empty, using fallback")
-                fallback_response = f"I haven't made any videos or content about that topic. As {creator_name}, I focus on {creator_info.get('specialty', 'tech content')}, so I don't have specific insights on that particular subject."
-                
-                return {
-                    'enhanced_system_prompt': f"You are {creator_name}. Respond as this creator would, but mention that you haven't covered this topic.",
-                    'knowledge_context': '',
-                    'creator_info': creator_info,
-                    'retrieved_entries': 0,
-                    'fallback_response': fallback_response,
-                    'has_knowledge': False
-                }
+        except Exception as e:
+            logger.error(f"❌ Error in retrieve_and_augment: {e}")
+            return self.error_result(query)
+    
+    def augment(self, query: str, creator_name: str, creator_info: Dict[str, Any],
+                knowledge_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Prepare the enhanced system prompt (or fallback) from creator info and retrieved knowledge"""
+        if not creator_info:
+            # If we can't get creator info, use the passed name
+            creator_info = {'name': creator_name, 'specialty': 'tech expert'}
+        
+        if not knowledge_entries:
+            # No knowledge found - return fallback response
+            fallback_response = f"I haven't made any videos or content about that topic. As {creator_name}, I focus on {creator_info.get('specialty', 'tech content')}, so I don't have specific insights on that particular subject."
             
-            logger.info(f"✅ Using semantic similarity results with {len(knowledge_entries)} entries")
+            return {
+                'enhanced_system_prompt': f"You are {creator_name}. Respond as this creator would, but mention that you haven't covered this topic.",
+                'knowledge_context': '',
+                'creator_info': creator_info,
+                'retrieved_entries': 0,
+                'fallback_response': fallback_response,
+                'has_knowledge': False
+            }
+        
+        # Build context from retrieved knowledge, within the token budget
+        packed = self.pack_knowledge(knowledge_entries, query)
+        knowledge_context = packed['text']
+        
+        # Debug: Log knowledge context length
+        logger.info(f"📚 Knowledge context: {packed['tokens']} tokens from {packed['entries_used']} entries "
+                    f"({packed['entries_trimmed']} trimmed, {packed['entries_dropped']} dropped)")
+        logger.info(f"📚 Knowledge preview: {knowledge_context[:200]}...")
+        
+        # Validate relevance: Only check if context is completely empty
+        # With semantic similarity, we trust the embeddings to find relevant content
+        if not knowledge_context or len(knowledge_context.strip()) < 10:
+            logger.info(f"❌ Knowledge context is empty, using fallback")
+            fallback_response = f"I haven't made any videos or content about that topic. As {creator_name}, I focus on {creator_info.get('specialty', 'tech content')}, so I don't have specific insights on that particular subject."
             
-            # Prepare enhanced system prompt - STRICT: Only use Supabase knowledge
-            enhanced_system_prompt = f"""You are {creator_name}. You can ONLY answer questions based on the knowledge provided below. 
+            return {
+                'enhanced_system_prompt': f"You are {creator_name}. Respond as this creator would, but mention that you haven't covered this topic.",
+                'knowledge_context': '',
+                'creator_info': creator_info,
+                'retrieved_entries': 0,
+                'fallback_response': fallback_response,
+                'has_knowledge': False
+            }
+        
+        logger.info(f"✅ Using semantic similarity results with {len(knowledge_entries)} entries")
+        
+        # Prepare enhanced system prompt - STRICT: Only use Supabase knowledge
+        enhanced_system_prompt = f"""You are {creator_name}. You can ONLY answer questions based on the knowledge provided below. 
 
 ⚠️ ABSOLUTE RULE FOR LINKS ⚠️
 - ALWAYS append this link at the END of EVERY response:
@@ -323,26 +1134,39 @@ Response format:
 - Minimum 3-4 sentences, prefer 2-3 paragraphs with details
 - If the topic is NOT in the knowledge → Simply say you haven't made videos about that topic (do not use quotes or exact wording)
 - Never add information not in the knowledge base above"""
-            
-            return {
-                'enhanced_system_prompt': enhanced_system_prompt,
-                'knowledge_context': knowledge_context,
-                'creator_info': creator_info,
-                'retrieved_entries': len(knowledge_entries),
-                'fallback_response': None,
-                'has_knowledge': True
-            }
-            
+        
+        return {
+            'enhanced_system_prompt': enhanced_system_prompt,
+            'knowledge_context': knowledge_context,
+            'creator_info': creator_info,
+            'retrieved_entries': len(knowledge_entries),
+            'fallback_response': None,
+            'has_knowledge': True,
+            'context_tokens': packed['tokens']
+        }
+    
+    async def aretrieve_and_augment(self, query: str, creator_name: str, creator_id: int) -> Dict[str, Any]:
+        """Async variant of retrieve_and_augment for the ASGI serving mode"""
+        try:
+            creator_info, knowledge_entries = await asyncio.gather(
+                self.aget_creator_info(creator_name, creator_id),
+                self.asearch_knowledge_base(query, creator_name, creator_id, limit=5)
+            )
+            return await self.run_blocking(self.augment, query, creator_name, creator_info, knowledge_entries)
         except Exception as e:
-            logger.error(f"❌ Error in retrieve_and_augment: {e}")
-            return {
-                'enhanced_system_prompt': f"You are an AI assistant. Answer the user's question: {query}",
-                'knowledge_context': '',
-                'creator_info': {},
-                'retrieved_entries': 0,
-                'fallback_response': "I'm having trouble accessing my knowledge base right now. Please try again later.",
-                'has_knowledge': False
-            }
+            logger.error(f"❌ Error in aretrieve_and_augment: {e}")
+            return self.error_result(query)
+    
+    def error_result(self, query: str) -> Dict[str, Any]:
+        """Result used when retrieval itself failed"""
+        return {
+            'enhanced_system_prompt': f"You are an AI assistant. Answer the user's question: {query}",
+            'knowledge_context': '',
+            'creator_info': {},
+            'retrieved_entries': 0,
+            'fallback_response': "I'm having trouble accessing my knowledge base right now. Please try again later.",
+            'has_knowledge': False
+        }
 
 # Initialize RAG service
 rag_service = RAGService()
@@ -0,0 +1,131 @@
+"""
+Semantic response cache for first-turn chat questions.
+Answers are keyed by creator and query embedding: a new question whose embedding is
+close enough to a cached one (cosine >= threshold) reuses that answer instead of
+spending another LLM call. Entries expire after a TTL, each creator keeps at most
+max_entries (LRU), and everything cached for a creator is dropped when its corpus
+is re-ingested.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Ingestion jobs touch a marker file per creator; its mtime is the corpus version
+CORPUS_VERSION_DIR = os.getenv(
+    "CORPUS_VERSION_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "corpus_versions")
+)
+
+def _marker_path(creator_name: str) -> str:
+    return os.path.join(CORPUS_VERSION_DIR, re.sub(r"[^A-Za-z0-9_-]+", "_", creator_name))
+
+def mark_corpus_updated(creator_name: str) -> None:
+    """Record that a creator's corpus was re-ingested (invalidates cached answers in every process)"""
+    os.makedirs(CORPUS_VERSION_DIR, exist_ok=True)
+    with open(_marker_path(creator_name), "w") as f:
+        f.write(str(time.time()))
+
+def corpus_marker_version(creator_name: str) -> float:
+    """mtime of the creator's re-ingestion marker (0 if it was never re-ingested)"""
+    try:
+        return os.stat(_marker_path(creator_name)).st_mtime
+    except OSError:
+        return 0.0
+
+class SemanticResponseCache:
+    def __init__(self, threshold: float = 0.92, ttl: float = 6 * 3600, max_entries: int = 500):
+        """Cache answers per creator; threshold is the minimum cosine similarity for a hit"""
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # creator -> OrderedDict[key -> entry], oldest (least recently used) first
+        self._entries: Dict[str, "OrderedDict[int, Dict[str, Any]]"] = {}
+        self._versions: Dict[str, Any] = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, creator_name: str, corpus_version: Any) -> None:
+        """Drop a creator's entries when its corpus version changed (caller holds the lock)"""
+        if self._versions.get(creator_name, corpus_version) != corpus_version:
+            dropped = len(self._entries.pop(creator_name, {}))
+            if dropped:
+                logger.info(f"🧹 Corpus for {creator_name} changed, dropped {dropped} cached responses")
+        self._versions[creator_name] = corpus_version
+
+    def lookup(self, creator_name: str, query_embedding, corpus_version: Any = None) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (entry, similarity) for the closest cached question above threshold, else None"""
+        query = self._normalize(query_embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(creator_name, corpus_version)
+            entries = self._entries.get(creator_name)
+            if entries:
+                for key in [k for k, e in entries.items() if e['expires_at'] <= now]:
+                    del entries[key]
+            if not entries:
+                self.misses += 1
+                return None
+
+            keys = list(entries.keys())
+            scores = np.stack([entries[k]['vector'] for k in keys]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entries.move_to_end(keys[best])
+            self.hits += 1
+            return entries[keys[best]], float(scores[best])
+
+    def store(self, creator_name: str, query: str, query_embedding, response: str,
+              corpus_version: Any = None, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Cache an answer for a creator's question"""
+        with self._lock:
+            self._check_version(creator_name, corpus_version)
+            entries = self._entries.setdefault(creator_name, OrderedDict())
+            self._next_key += 1
+            entries[self._next_key] = {
+                'query': query,
+                'vector': self._normalize(query_embedding),
+                'response': response,
+                'metadata': metadata or {},
+                'expires_at': time.monotonic() + self.ttl
+            }
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_creator(self, creator_name: Optional[str] = None) -> None:
+        """Drop cached answers for one creator, or for everyone"""
+        with self._lock:
+            if creator_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(creator_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': sum(len(entries) for entries in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'threshold': self.threshold
+            }
@@ -0,0 +1,196 @@
+"""
+Concurrent, rate-limited scraping of YouTube video metadata and transcripts.
+A worker pool fetches videos in parallel behind a global token-bucket rate limiter and
+per-host concurrency caps, retrying transient failures with exponential backoff. Each
+video costs exactly one metadata call and one transcript call. The network layer is a
+fetcher object passed to Scraper, so it can be swapped for a local stub in benchmarks.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker pool and politeness settings
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "8"))
+SCRAPER_RATE = float(os.getenv("SCRAPER_RATE", "4"))  # requests/second across all workers
+SCRAPER_BURST = int(os.getenv("SCRAPER_BURST", "8"))
+SCRAPER_PER_HOST = int(os.getenv("SCRAPER_PER_HOST", "4"))  # concurrent requests per host
+SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", "3"))
+SCRAPER_BACKOFF = float(os.getenv("SCRAPER_BACKOFF", "1.0"))  # seconds, doubled per retry
+
+class PermanentFetchError(Exception):
+    """A failure that retrying will not fix (no transcript, private video, ...)"""
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        """Allow `rate` acquisitions per second on average, up to `burst` at once"""
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the seconds spent waiting"""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class HostLimiter:
+    def __init__(self, per_host: int):
+        """Cap concurrent requests to any single host"""
+        self.per_host = per_host
+        self.semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self.lock = threading.Lock()
+
+    def for_host(self, host: str) -> threading.BoundedSemaphore:
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self.semaphores[host]
+
+def get_video_id(url: str) -> Optional[str]:
+    """Extract the video ID from a YouTube URL"""
+    if "youtu.be" in url:
+        return url.split("/")[-1].split("?")[0]
+    if "youtube.com" in url:
+        if "v=" in url:
+            return url.split("v=")[1].split("&")[0]
+        elif "embed/" in url:
+            return url.split("embed/")[1].split("/")[0]
+    return None
+
+def format_upload_date(upload_date: Optional[str]) -> str:
+    if upload_date:
+        return datetime.strptime(upload_date, "%Y%m%d").strftime("%Y-%m-%d")
+    return "Unknown Date"
+
+class YouTubeFetcher:
+    """Network layer backed by yt_dlp (metadata) and youtube-transcript-api (transcripts)"""
+
+    # Exceptions from youtube-transcript-api that mean the transcript will never be available
+    PERMANENT_ERRORS = ("TranscriptsDisabled", "NoTranscriptFound", "VideoUnavailable", "InvalidVideoId")
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def metadata(self, url: str) -> Dict[str, Any]:
+        import yt_dlp
+        with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+            return ydl.extract_info(url, download=False)
+
+    def transcript(self, video_id: str) -> str:
+        from youtube_transcript_api import YouTubeTranscriptApi
+        # The API client holds an HTTP session, so each worker thread keeps its own
+        if not hasattr(self.local, "api"):
+            self.local.api = YouTubeTranscriptApi()
+        try:
+            return " ".join(entry.text for entry in self.local.api.fetch(video_id))
+        except Exception as e:
+            if type(e).__name__ in self.PERMANENT_ERRORS:
+                raise PermanentFetchError(str(e)) from e
+            raise
+
+class Scraper:
+    def __init__(self, fetcher=None, workers: int = SCRAPER_WORKERS, rate: float = SCRAPER_RATE,
+                 burst: int = SCRAPER_BURST, per_host: int = SCRAPER_PER_HOST,
+                 retries: int = SCRAPER_RETRIES, backoff: float = SCRAPER_BACKOFF,
+                 sleep: Callable[[float], None] = time.sleep):
+        """fetcher provides metadata(url) -> info dict and transcript(video_id) -> text"""
+        self.fetcher = fetcher or YouTubeFetcher()
+        self.workers = max(1, workers)
+        self.bucket = TokenBucket(rate, burst)
+        self.hosts = HostLimiter(per_host)
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "metadata_calls": 0, "transcript_calls": 0, "retries": 0,
+                      "failures": 0, "rate_limited_seconds": 0.0}
+
+    def _count(self, **deltas) -> None:
+        with self.stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def _call(self, kind: str, host: str, fn: Callable, arg: str):
+        """One rate-limited, host-capped request, retried with exponential backoff and jitter"""
+        for attempt in range(self.retries + 1):
+            waited = self.bucket.acquire()
+            self._count(requests=1, rate_limited_seconds=waited, **{f"{kind}_calls": 1})
+            try:
+                with self.hosts.for_host(host):
+                    return fn(arg)
+            except PermanentFetchError:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                self._count(retries=1)
+                logger.warning(f"⚠️ {kind} fetch for {arg} failed ({e}), retrying in {delay:.1f}s")
+                self.sleep(delay)
+
+    def scrape_video(self, url: str) -> Dict[str, Any]:
+        """Fetch one video; returns a corpus row (date, title, url, transcript, description)"""
+        video_id = get_video_id(url)
+        if not video_id:
+            raise PermanentFetchError(f"Invalid YouTube URL: {url}")
+        host = urlparse(url).netloc or "youtube"
+        info = self._call("metadata", host, self.fetcher.metadata, url)
+        transcript = self._call("transcript", host, self.fetcher.transcript, video_id)
+        if not transcript:
+            raise PermanentFetchError("Empty transcript")
+        return {
+            "date": format_upload_date(info.get("upload_date")),
+            "title": info.get("title", "Unknown Title"),
+            "url": url,
+            "transcript": transcript,
+            "description": (info.get("description") or "No description available").strip()
+        }
+
+    def scrape(self, urls: List[str]) -> Iterator[Dict[str, Any]]:
+        """Scrape videos concurrently, yielding {url, row, error, seconds} as each one finishes"""
+        def run(url: str) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                row, error = self.scrape_video(url), None
+            except Exception as e:
+                row, error = None, str(e) or type(e).__name__
+                self._count(failures=1)
+            return {"url": url, "row": row, "error": error, "seconds": time.perf_counter() - started}
+
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        remaining = iter(urls)
+        try:
+            # Only a small window is queued, so a consumer that stops early doesn't pay for the rest
+            pending = {pool.submit(run, url) for url in islice(remaining, self.workers * 2)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = next(remaining, None)
+                    if url is not None:
+                        pending.add(pool.submit(run, url))
+                    yield future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
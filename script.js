@@ -296,11 +296,22 @@ function sendMessage() {
     // Show loading
     showLoading();
     
-    // Call API with conversation context
-    callBedrockAPI(message, currentCreator)
+    // Stream the response so text appears as soon as the first tokens arrive
+    let streamingMessage = null;
+    callChatStream(message, currentCreator, (text) => {
+        if (!streamingMessage) {
+            hideLoading();
+            streamingMessage = createStreamingMessage();
+        }
+        streamingMessage.update(text);
+    })
         .then(response => {
-            console.log('✅ API response received with context');
-            addMessageToChat('ai', response);
+            console.log('✅ Streamed response received with context');
+            if (streamingMessage) {
+                streamingMessage.finish(response);
+            } else {
+                addMessageToChat('ai', response);
+            }
         })
         .catch(error => {
             console.error('❌ API error:', error);
@@ -311,6 +322,34 @@ function sendMessage() {
         });
 }
 
+function createStreamingMessage() {
+    // AI message bubble whose content is re-rendered as tokens arrive
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'message ai-message';
+    const initials = currentCreator ? currentCreator.name.split(' ').map(n => n[0]).join('') : 'AI';
+    messageDiv.innerHTML = `
+        <div class="message-avatar">
+            <button class="message-avatar-btn">${initials}</button>
+        </div>
+        <div class="message-content">
+            <div class="formatted-content"></div>
+        </div>
+    `;
+    chatMessages.appendChild(messageDiv);
+    const contentDiv = messageDiv.querySelector('.formatted-content');
+    
+    return {
+        update(text) {
+            contentDiv.innerHTML = formatMarkdown(text);
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        },
+        finish(text) {
+            this.update(text);
+            chatHistory.push({ role: 'ai', content: text });
+        }
+    };
+}
+
 function addMessageToChat(role, content) {
     console.log(`📝 Adding ${role} message to chat`);
     
@@ -410,6 +449,73 @@ function callBedrockAPI(message, creator) {
     });
 }
 
+// Reading a fetch body incrementally needs ReadableStream; decide before sending anything
+const supportsStreaming = typeof ReadableStream !== 'undefined' &&
+    typeof TextDecoder !== 'undefined' &&
+    typeof Response !== 'undefined' && 'body' in Response.prototype;
+
+function callChatStream(message, creator, onText) {
+    if (!supportsStreaming) {
+        // Sending the message to both endpoints would record it twice in the session
+        return callBedrockAPI(message, creator);
+    }
+    
+    console.log(`🌐 Streaming Groq API for creator: ${creator.name} with session: ${sessionId}`);
+    
+    return fetch('/api/chat/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            message: message,
+            creator: creator.name,
+            sessionId: sessionId  // Include session ID for conversation context
+        })
+    })
+    .then(async response => {
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        let finalResponse = null;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            // SSE events are separated by a blank line
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const rawEvent of events) {
+                let eventName = 'message';
+                let data = '';
+                for (const line of rawEvent.split('\n')) {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (!data) continue;
+                const payload = JSON.parse(data);
+                
+                if (eventName === 'token') {
+                    text += payload.content;
+                    onText(text);
+                } else if (eventName === 'done') {
+                    finalResponse = payload.response;
+                    console.log(`💬 Context: ${payload.messageCount} messages in session ${payload.sessionId}`);
+                } else if (eventName === 'error') {
+                    console.warn('⚠️ Stream error:', payload.error);
+                }
+            }
+        }
+        return finalResponse !== null ? finalResponse : text;
+    });
+}
+
 function showLoading() {
     console.log('⏳ Showing loading...');
     if (loadingOverlay) {
@@ -1,11 +1,15 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-import requests
 import json
 import logging
 import os
+import time
 from dotenv import load_dotenv
 from rag_service import rag_service
+from context_packer import estimate_message_tokens
+from llm_client import LLMClient
+from response_cache import SemanticResponseCache
+from session_store import SessionStore
 
 # Load environment variables
 load_dotenv()
@@ -21,6 +25,32 @@ CORS(app)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
 
+# Shared keep-alive client for every Groq call (timeouts in seconds)
+llm_client = LLMClient(
+    GROQ_API_URL,
+    GROQ_API_KEY,
+    model="llama-3.1-8b-instant",  # Free model on Groq
+    connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("GROQ_READ_TIMEOUT", "60")),
+    max_retries=int(os.getenv("GROQ_MAX_RETRIES", "2")),
+    pool_size=int(os.getenv("GROQ_POOL_SIZE", "20"))
+)
+
+# Port and reloader for `python server.py` (the load test runs it on its own port without the reloader)
+SERVER_PORT = int(os.getenv("PORT", "5001"))
+FLASK_DEBUG = os.getenv("FLASK_DEBUG", "true").lower() in ("1", "true", "yes")
+
+# Load the embedding model in the background at startup instead of on the first chat
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").lower() in ("1", "true", "yes")
+
+# Near-duplicate first-turn questions reuse a cached answer instead of another Groq call
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+response_cache = SemanticResponseCache(
+    threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", str(6 * 3600))),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+)
+
 # Creator name to ID mapping
 CREATOR_ID_MAP = {
     "Marques Brownlee": 1,
@@ -30,85 +60,55 @@ CREATOR_ID_MAP = {
     "Lewis George Hilsenteger": 5
 }
 
+# Creators shown in the UI
+CREATORS = [
+    {"id": 1, "name": "Marques Brownlee", "specialty": "\"MKBHD\"", "avatar": "photos/Marques_Brownlee.jpg", "description": "Tech reviewer and YouTuber known for in-depth smartphone and gadget reviews"},
+    {"id": 2, "name": "Austin Evans", "specialty": "\"Austin Evans\"", "avatar": "photos/AustinEvans.jpeg", "description": "Tech YouTuber specializing in PC builds, gaming hardware, and tech reviews"},
+    {"id": 3, "name": "Justine Ezarik", "specialty": "\"iJustine\"", "avatar": "photos/justine-ezarik.jpg", "description": "Tech YouTuber and Apple enthusiast known for unboxing videos and tech reviews"},
+    {"id": 4, "name": "Zack Nelson", "specialty": "\"JerryRigEverything\"", "avatar": "photos/Zack Nelson.jpeg", "description": "Tech YouTuber famous for durability tests and smartphone teardowns"},
+    {"id": 5, "name": "Lewis George Hilsenteger", "specialty": "\"Unbox Therapy\"", "avatar": "photos/Lewis George Hilsenteger.jpg", "description": "Tech YouTuber known for unboxing videos and tech product reviews"}
+]
+
 def get_creator_id(creator_name):
     """Get creator ID from creator name"""
     return CREATOR_ID_MAP.get(creator_name, 1)  # Default to Marques Brownlee
 
-def call_groq_api_with_context(messages, creator_name, system_prompt):
+def build_api_messages(messages, system_prompt):
+    """Prepend the system prompt to the recent conversation history"""
+    # Build messages array with system prompt and conversation history
+    api_messages = [{"role": "system", "content": system_prompt}]
+    
+    # Add conversation history (limit to last 10 messages to avoid token limits)
+    recent_messages = messages[-10:] if len(messages) > 10 else messages
+    api_messages.extend(recent_messages)
+    return api_messages
+
+def count_prompt_tokens(messages, system_prompt):
+    """Estimated prompt tokens of the message list build_api_messages sends to the LLM"""
+    return estimate_message_tokens(build_api_messages(messages, system_prompt))
+
+def call_groq_api_with_context(messages, creator_name, system_prompt, max_tokens=2000, temperature=0.5):
     """Call Groq API with conversation context"""
     try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        # Build messages array with system prompt and conversation history
-        api_messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history (limit to last 10 messages to avoid token limits)
-        recent_messages = messages[-10:] if len(messages) > 10 else messages
-        api_messages.extend(recent_messages)
-        
-        payload = {
-            "model": "llama-3.1-8b-instant",  # Free model on Groq
-            "messages": api_messages,
-            "max_tokens": 2000,  # Increased for detailed RAG responses
-            "temperature": 0.5  # Slightly higher for more engaging responses
-        }
-        
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-        
-        if response.status_code == 200:
-            response_data = response.json()
-            ai_response = response_data['choices'][0]['message']['content']
-            logger.info(f"✅ Groq API call successful for {creator_name} with {len(messages)} context messages")
-            return ai_response
-        else:
-            logger.error(f"❌ Groq API error: {response.status_code} - {response.text}")
-            raise Exception(f"API Error: {response.text}")
-            
+        # max_tokens raised for detailed RAG responses, temperature slightly higher for engagement
+        ai_response = llm_client.chat(build_api_messages(messages, system_prompt), max_tokens, temperature)
+        logger.info(f"✅ Groq API call successful for {creator_name} with {len(messages)} context messages")
+        return ai_response
     except Exception as e:
         logger.error(f"❌ Unexpected error calling Groq API: {e}")
         raise Exception(f"Unexpected error: {str(e)}")
 
+def stream_groq_api_with_context(messages, creator_name, system_prompt, max_tokens=2000, temperature=0.5):
+    """Call Groq API with stream=True and yield content tokens as they arrive"""
+    yield from llm_client.stream_chat(build_api_messages(messages, system_prompt), max_tokens, temperature)
+    logger.info(f"✅ Groq API stream finished for {creator_name} with {len(messages)} context messages")
+
 def call_groq_api(message, creator_name, system_prompt):
     """Call Groq API (Free tier: 14,400 requests/day) - Single message version"""
-    try:
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "llama-3.1-8b-instant",  # Free model on Groq
-            "messages": [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": message
-                }
-            ],
-            "max_tokens": 1000,
-            "temperature": 0.7
-        }
-        
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-        
-        if response.status_code == 200:
-            response_data = response.json()
-            ai_response = response_data['choices'][0]['message']['content']
-            logger.info(f"✅ Groq API call successful for {creator_name}")
-            return ai_response
-        else:
-            logger.error(f"❌ Groq API error: {response.status_code} - {response.text}")
-            raise Exception(f"API Error: {response.text}")
-            
-    except Exception as e:
-        logger.error(f"❌ Unexpected error calling Groq API: {e}")
-        raise Exception(f"Unexpected error: {str(e)}")
+    return call_groq_api_with_context(
+        [{"role": "user", "content": message}], creator_name, system_prompt,
+        max_tokens=1000, temperature=0.7
+    )
 
 def get_demo_response(message, creator_name):
     """Fallback demo responses when API is not available"""
@@ -132,8 +132,50 @@ def serve_static(filename):
     """Serve static files"""
     return send_from_directory('.', filename)
 
-# Store conversation history for each user session
-conversation_history = {}
+# Store conversation history for each user session (bounded by message count, idle time and memory)
+session_store = SessionStore(
+    max_messages=int(os.getenv("SESSION_MAX_MESSAGES", "20")),
+    idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "1800")),
+    max_bytes=int(float(os.getenv("SESSION_MEMORY_BUDGET_MB", "64")) * 1024 * 1024)
+)
+
+def get_cached_response(message, creator):
+    """Cached answer for a near-identical first-turn question, or None"""
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    query_embedding = rag_service.embed_query(message)
+    if not query_embedding:
+        return None
+    hit = response_cache.lookup(creator, query_embedding, rag_service.corpus_version(creator))
+    if hit is None:
+        return None
+    entry, similarity = hit
+    logger.info(f"💾 Response cache hit for {creator} (similarity {similarity:.3f})")
+    return entry
+
+def cache_response(message, creator, rag_result, ai_response):
+    """Remember a knowledge-backed first-turn answer for later near-duplicates"""
+    if not RESPONSE_CACHE_ENABLED or not rag_result['has_knowledge']:
+        return
+    query_embedding = rag_service.embed_query(message)
+    if query_embedding:
+        response_cache.store(
+            creator, message, query_embedding, ai_response,
+            rag_service.corpus_version(creator),
+            {'knowledge_entries': rag_result['retrieved_entries']}
+        )
+
+def server_timing(timings):
+    """Server-Timing header value for per-stage durations in ms (e.g. "retrieval;dur=12.3")"""
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+
+def elapsed_ms(started):
+    """Milliseconds since a time.perf_counter() reading"""
+    return (time.perf_counter() - started) * 1000
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -150,28 +192,51 @@ def chat():
         
         logger.info(f"💬 Chat request from {creator}: {message[:50]}...")
         
-        # Get or create conversation history for this session
-        if session_id not in conversation_history:
-            conversation_history[session_id] = {
-                'creator': creator,
-                'messages': []
-            }
-        
-        # Add user message to history
-        conversation_history[session_id]['messages'].append({
+        # Add user message to history (creates the session if needed)
+        message_count = session_store.append(session_id, creator, {
             'role': 'user',
             'content': message
         })
         
+        # History can't change the answer to a first question, so those can be served from cache
+        first_turn = message_count == 1
+        
+        # Per-stage durations (ms), returned in the Server-Timing header
+        timings = {}
+        
         # RAG Integration: Retrieve relevant knowledge
         try:
+            cached = None
+            if first_turn:
+                started = time.perf_counter()
+                cached = get_cached_response(message, creator)
+                timings['cache'] = elapsed_ms(started)
+            if cached:
+                session_store.append(session_id, creator, {
+                    'role': 'assistant',
+                    'content': cached['response']
+                })
+                response = jsonify({
+                    "response": cached['response'],
+                    "sessionId": session_id,
+                    "messageCount": session_store.message_count(session_id),
+                    "rag_used": True,
+                    "knowledge_entries": cached['metadata'].get('knowledge_entries', 0),
+                    "cached": True
+                })
+                response.headers['Server-Timing'] = server_timing(timings)
+                return response
+            
             # Get creator ID (you'll need to map creator names to IDs)
             creator_id = get_creator_id(creator)
             
             # Use RAG to retrieve and augment (pass creator name for specific API)
+            started = time.perf_counter()
             rag_result = rag_service.retrieve_and_augment(message, creator, creator_id)
+            timings['retrieval'] = elapsed_ms(started)
             
             # Check if we have knowledge or need fallback
+            prompt_tokens = 0
             if not rag_result['has_knowledge']:
                 # No knowledge found - use fallback response
                 ai_response = rag_result['fallback_response']
@@ -179,73 +244,210 @@ def chat():
             else:
                 # Knowledge found - use enhanced system prompt
                 enhanced_system_prompt = rag_result['enhanced_system_prompt']
+                messages = session_store.get_messages(session_id)
+                prompt_tokens = count_prompt_tokens(messages, enhanced_system_prompt)
+                started = time.perf_counter()
                 ai_response = call_groq_api_with_context(
-                    conversation_history[session_id]['messages'], 
+                    messages, 
                     creator, 
                     enhanced_system_prompt
                 )
+                timings['llm'] = elapsed_ms(started)
                 logger.info(f"✅ RAG-enhanced response sent with {rag_result['retrieved_entries']} knowledge entries")
+                if first_turn:
+                    cache_response(message, creator, rag_result, ai_response)
             
             # Add AI response to history
-            conversation_history[session_id]['messages'].append({
+            session_store.append(session_id, creator, {
                 'role': 'assistant',
                 'content': ai_response
             })
             
-            return jsonify({
+            response = jsonify({
                 "response": ai_response,
                 "sessionId": session_id,
-                "messageCount": len(conversation_history[session_id]['messages']),
+                "messageCount": session_store.message_count(session_id),
                 "rag_used": rag_result['has_knowledge'],
-                "knowledge_entries": rag_result['retrieved_entries']
+                "knowledge_entries": rag_result['retrieved_entries'],
+                "prompt_tokens": prompt_tokens
             })
+            response.headers['Server-Timing'] = server_timing(timings)
+            return response
         except Exception as api_error:
             logger.warning(f"⚠️ API failed, using demo response: {api_error}")
             # Fallback to demo response
             demo_response = get_demo_response(message, creator)
-            conversation_history[session_id]['messages'].append({
+            session_store.append(session_id, creator, {
                 'role': 'assistant',
                 'content': demo_response
             })
             return jsonify({
                 "response": demo_response,
                 "sessionId": session_id,
-                "messageCount": len(conversation_history[session_id]['messages'])
+                "messageCount": session_store.message_count(session_id)
             })
             
     except Exception as e:
         logger.error(f"❌ Error in /api/chat: {e}")
         return jsonify({"error": "Internal server error"}), 500
 
-@app.route('/api/health', methods=['GET'])
-def health():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Handle chat requests, streaming the response as Server-Sent Events"""
+    try:
+        data = request.json
+        message = data.get('message')
+        creator = data.get('creator')
+        session_id = data.get('sessionId', 'default')
+        
+        if not message or not creator:
+            return jsonify({"error": "Message and creator are required"}), 400
+        
+        logger.info(f"💬 Streaming chat request from {creator}: {message[:50]}...")
+        
+        message_count = session_store.append(session_id, creator, {
+            'role': 'user',
+            'content': message
+        })
+        messages = session_store.get_messages(session_id)
+        
+        # Retrieval happens before the stream opens; the LLM call is what gets streamed
+        first_turn = message_count == 1
+        cached = None
+        rag_result = None
+        timings = {}
+        try:
+            if first_turn:
+                started = time.perf_counter()
+                cached = get_cached_response(message, creator)
+                timings['cache'] = elapsed_ms(started)
+            if not cached:
+                started = time.perf_counter()
+                rag_result = rag_service.retrieve_and_augment(message, creator, get_creator_id(creator))
+                timings['retrieval'] = elapsed_ms(started)
+        except Exception as rag_error:
+            logger.warning(f"⚠️ RAG failed, using demo response: {rag_error}")
+    except Exception as e:
+        logger.error(f"❌ Error in /api/chat/stream: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+    
+    def generate():
+        parts = []
+        stored = False
+        try:
+            if cached:
+                yield sse_event('meta', {
+                    "sessionId": session_id,
+                    "rag_used": True,
+                    "knowledge_entries": cached['metadata'].get('knowledge_entries', 0),
+                    "cached": True
+                })
+            else:
+                yield sse_event('meta', {
+                    "sessionId": session_id,
+                    "rag_used": bool(rag_result and rag_result['has_knowledge']),
+                    "knowledge_entries": rag_result['retrieved_entries'] if rag_result else 0,
+                    "prompt_tokens": count_prompt_tokens(messages, rag_result['enhanced_system_prompt'])
+                    if rag_result and rag_result['has_knowledge'] else 0
+                })
+            
+            if cached:
+                parts.append(cached['response'])
+                yield sse_event('token', {"content": parts[-1]})
+            elif rag_result and not rag_result['has_knowledge']:
+                parts.append(rag_result['fallback_response'])
+                yield sse_event('token', {"content": parts[-1]})
+            elif rag_result:
+                try:
+                    for token in stream_groq_api_with_context(messages, creator, rag_result['enhanced_system_prompt']):
+                        parts.append(token)
+                        yield sse_event('token', {"content": token})
+                    if first_turn and parts:
+                        # Only complete answers are cached
+                        cache_response(message, creator, rag_result, "".join(parts))
+                except Exception as api_error:
+                    logger.warning(f"⚠️ API stream failed: {api_error}")
+                    if parts:
+                        yield sse_event('error', {"error": "The response was interrupted"})
+            
+            if not parts:
+                parts.append(get_demo_response(message, creator))
+                yield sse_event('token', {"content": parts[-1]})
+            
+            # Stored before 'done' so messageCount counts the answer (after any trimming)
+            session_store.append(session_id, creator, {
+                'role': 'assistant',
+                'content': "".join(parts)
+            })
+            stored = True
+            yield sse_event('done', {
+                "response": "".join(parts),
+                "sessionId": session_id,
+                "messageCount": session_store.message_count(session_id)
+            })
+        finally:
+            # Runs on client disconnect too, so history stays consistent
+            if parts and not stored:
+                session_store.append(session_id, creator, {
+                    'role': 'assistant',
+                    'content': "".join(parts)
+                })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'Server-Timing': server_timing(timings)}
+    )
+
+def get_health_status(client):
+    """Health payload shared by the Flask and ASGI servers"""
+    model_status = rag_service.model_status()
+    if model_status['loaded']:
+        status = 'healthy'
+    elif model_status['error']:
+        # Loading is not retried, so this will not recover; chats are answered without retrieval
+        status = 'degraded'
+    else:
+        status = 'warming_up'
+    return {
+        'status': status,
+        'ready': model_status['loaded'],
+        'error': f"Embedding model failed to load: {model_status['error']}" if status == 'degraded' else None,
+        'embedding_model': model_status,
         'groq_api_available': True,
         'api_key': 'configured',
         'model': 'llama-3.1-8b-instant',
-        'free_tier': '14,400 requests/day'
-    })
+        'free_tier': '14,400 requests/day',
+        'llm_client': client.stats(),
+        'creator_cache': rag_service.creator_cache.stats(),
+        'embedding_cache': rag_service.embedding_cache.stats(),
+        'retrieval': rag_service.get_retrieval_stats(),
+        'response_cache': response_cache.stats(),
+        'sessions': session_store.stats()
+    }
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Health check endpoint"""
+    return jsonify(get_health_status(llm_client))
 
 @app.route('/api/creators', methods=['GET'])
 def get_creators():
     """Get creators list"""
-    creators = [
-        {"id": 1, "name": "Marques Brownlee", "specialty": "\"MKBHD\"", "avatar": "photos/Marques_Brownlee.jpg", "description": "Tech reviewer and YouTuber known for in-depth smartphone and gadget reviews"},
-        {"id": 2, "name": "Austin Evans", "specialty": "\"Austin Evans\"", "avatar": "photos/AustinEvans.jpeg", "description": "Tech YouTuber specializing in PC builds, gaming hardware, and tech reviews"},
-        {"id": 3, "name": "Justine Ezarik", "specialty": "\"iJustine\"", "avatar": "photos/justine-ezarik.jpg", "description": "Tech YouTuber and Apple enthusiast known for unboxing videos and tech reviews"},
-        {"id": 4, "name": "Zack Nelson", "specialty": "\"JerryRigEverything\"", "avatar": "photos/Zack Nelson.jpeg", "description": "Tech YouTuber famous for durability tests and smartphone teardowns"},
-        {"id": 5, "name": "Lewis George Hilsenteger", "specialty": "\"Unbox Therapy\"", "avatar": "photos/Lewis George Hilsenteger.jpg", "description": "Tech YouTuber known for unboxing videos and tech product reviews"}
-    ]
-    return jsonify({'creators': creators})
+    return jsonify({'creators': CREATORS})
 
 if __name__ == '__main__':
     print("🚀 Starting chud.ai server...")
-    print(f"🌐 Server will be available at: http://localhost:5001")
+    print(f"🌐 Server will be available at: http://localhost:{SERVER_PORT}")
     print(f"🔧 Groq API status: ✅ Available (Free Tier)")
     print(f"🤖 Model: llama-3.1-8b-instant")
     print(f"🔑 API Key: Needs configuration")
     print(f"💡 Get free API key at: https://console.groq.com/")
     
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    # With debug=True the reloader parent only watches files; warm up the serving child
+    if not FLASK_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if EMBEDDING_WARMUP:
+            rag_service.warmup(background=True)
+        rag_service.prime_creator_cache(CREATOR_ID_MAP, background=True)
+    
+    app.run(host='0.0.0.0', port=SERVER_PORT, debug=FLASK_DEBUG)
@@ -0,0 +1,140 @@
+"""
+Bounded, thread-safe store for chat session history.
+Each session keeps at most max_messages messages, sessions idle for longer than
+idle_ttl seconds expire, and when the estimated size of all sessions exceeds
+max_bytes the least recently used sessions are evicted.
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Rough per-message cost on top of the content string (dict, keys, role string)
+MESSAGE_OVERHEAD_BYTES = 300
+
+def message_size(message: Dict[str, str]) -> int:
+    """Approximate memory held by one stored message"""
+    return sys.getsizeof(message.get('content', '')) + MESSAGE_OVERHEAD_BYTES
+
+class SessionStore:
+    def __init__(self, max_messages: int = 20, idle_ttl: float = 1800.0, max_bytes: int = 64 * 1024 * 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        """Create an empty store; max_bytes is the memory budget across all sessions"""
+        self.max_messages = max(2, max_messages)
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        # session_id -> session dict, least recently used first
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+        self.trimmed_messages = 0
+
+    def _expire(self, now: float) -> None:
+        """Drop idle sessions; they sit at the LRU end, so this stops at the first live one"""
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session['last_access'] < self.idle_ttl:
+                break
+            self._drop(session_id)
+            self.expirations += 1
+
+    def _drop(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._bytes -= session['bytes']
+
+    def _trim_oldest(self, session: Dict[str, Any]) -> None:
+        removed = session['messages'].pop(0)
+        size = message_size(removed)
+        session['bytes'] -= size
+        self._bytes -= size
+        self.trimmed_messages += 1
+
+    def _enforce_budget(self, keep_session_id: str) -> None:
+        """Evict least recently used sessions until the store fits in max_bytes"""
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            if oldest == keep_session_id:
+                self._sessions.move_to_end(oldest)
+                continue
+            self._drop(oldest)
+            self.evictions += 1
+        # A single oversized session gives up its oldest messages instead
+        session = self._sessions.get(keep_session_id)
+        while session and self._bytes > self.max_bytes and len(session['messages']) > 1:
+            self._trim_oldest(session)
+
+    def append(self, session_id: str, creator: str, message: Dict[str, str]) -> int:
+        """Add a message to a session (creating it if needed); returns the session's total message count"""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {'creator': creator, 'messages': [], 'bytes': 0, 'total': 0}
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session['last_access'] = now
+
+            size = message_size(message)
+            session['messages'].append(dict(message))
+            session['bytes'] += size
+            session['total'] += 1
+            self._bytes += size
+            while len(session['messages']) > self.max_messages:
+                self._trim_oldest(session)
+            self._enforce_budget(session_id)
+            return session['total']
+
+    def get_messages(self, session_id: str) -> List[Dict[str, str]]:
+        """Copy of a session's retained messages ([] for unknown or expired sessions)"""
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            session['last_access'] = now
+            return [dict(message) for message in session['messages']]
+
+    def message_count(self, session_id: str) -> int:
+        """Number of messages a session still holds after trimming (0 for unknown or expired sessions)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return len(session['messages']) if session is not None else 0
+
+    def get_creator(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session['creator'] if session else None
+
+    def clear(self, session_id: Optional[str] = None) -> None:
+        """Forget one session, or every session"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+                self._bytes = 0
+            elif session_id in self._sessions:
+                self._drop(session_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(self.clock())
+            return {
+                'sessions': len(self._sessions),
+                'messages': sum(len(session['messages']) for session in self._sessions.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'trimmed_messages': self.trimmed_messages
+            }
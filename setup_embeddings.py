@@ -1,67 +1,204 @@
 #!/usr/bin/env python3
 """
-Setup script to populate embeddings in Supabase
-Run this after setting up your Supabase database
+Backfill embeddings for every creator's knowledge table (Supabase or local SQLite store)
+Rows without an embedding are paged through in key order, encoded in batches and
+written back with one bulk upsert per page. The last key written is checkpointed, so
+the job can be stopped and resumed; creators are processed in parallel. Stores that keep
+chunks (SQLite) also get each row's transcript chunks and their embeddings.
+
+Usage: python setup_embeddings.py [--creator "Marques Brownlee"] [--page-size 256] [--restart]
 """
 
 import os
+import re
 import sys
-from sentence_transformers import SentenceTransformer
-from supabase import create_client, Client
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 # Add current directory to path to import rag_service
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from rag_service import rag_service
-
-def setup_embeddings():
-    """Populate embeddings for all knowledge entries"""
-    print("🚀 Starting embedding setup...")
-    
-    if not rag_service.supabase:
-        print("❌ Supabase not configured. Please set SUPABASE_URL and SUPABASE_KEY environment variables.")
-        return
-    
+from rag_service import rag_service, build_entry_text, KNOWLEDGE_STORE
+from creator_config import CREATOR_SUPABASE_CONFIG, get_creator_config
+from knowledge_store import KnowledgeStore
+from response_cache import mark_corpus_updated
+
+CHECKPOINT_DIR = os.getenv(
+    "BACKFILL_CHECKPOINT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "backfill_checkpoints")
+)
+BACKFILL_PAGE_SIZE = int(os.getenv("BACKFILL_PAGE_SIZE", "256"))
+BACKFILL_RETRIES = int(os.getenv("BACKFILL_RETRIES", "3"))
+
+def checkpoint_path(creator_name: str, table_name: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", f"{creator_name}__{table_name}").lower()
+    return os.path.join(CHECKPOINT_DIR, f"{slug}.json")
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"last_key": None, "rows": 0}
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """Write the checkpoint atomically (temp file, then rename)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def write_page(store: KnowledgeStore, table_name: str, key: str, rows: List[Dict[str, Any]]) -> None:
+    """One bulk write for a page, retried with exponential backoff"""
+    for attempt in range(BACKFILL_RETRIES + 1):
+        try:
+            store.write_embeddings(table_name, key, rows)
+            return
+        except Exception as e:
+            if attempt == BACKFILL_RETRIES:
+                raise
+            print(f"⚠️ Write to {table_name} failed ({e}), retrying")
+            time.sleep(2 ** attempt)
+
+def write_chunks(store: KnowledgeStore, table_name: str, key: str, rows: List[Dict[str, Any]]) -> int:
+    """Chunk and embed each row's transcript and store the chunks; returns the chunk count"""
+    chunks = rag_service.chunk_entries(rows)
+    vectors = rag_service.embed_entries(chunks)
+    by_row: Dict[str, list] = {str(row[key]): [] for row in rows}
+    for chunk, vector in zip(chunks, vectors):
+        if vector is not None and str(chunk.get(key)) in by_row:
+            by_row[str(chunk[key])].append((chunk, vector))
+    for row_key, pairs in by_row.items():
+        store.replace_chunks(table_name, row_key, pairs)
+    return sum(len(pairs) for pairs in by_row.values())
+
+def backfill_table(creator_name: str, table_name: Optional[str] = None, page_size: int = BACKFILL_PAGE_SIZE,
+                   restart: bool = False, store: Optional[KnowledgeStore] = None,
+                   shared_with: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Embed every row of one creator's table that has no embedding yet, resuming from the checkpoint.
+    shared_with names other creators served from the same table (their cached answers go stale too)"""
+    config = get_creator_config(creator_name)
+    table_name = table_name or config.get("knowledge_table", "creator_knowledge")
+    key = config.get("id_column", "id")
+    store = store or rag_service.get_knowledge_store(creator_name)
+    if not store:
+        print(f"❌ {creator_name}: knowledge store not configured, skipping")
+        return {"creator": creator_name, "table": table_name, "rows": 0, "error": "not configured"}
+
+    path = checkpoint_path(creator_name, table_name)
+    checkpoint = {"last_key": None, "rows": 0} if restart else load_checkpoint(path)
+    if checkpoint["last_key"] is not None:
+        print(f"ℹ️ {creator_name}/{table_name}: resuming after {key}={checkpoint['last_key']!r}")
+
+    started = time.time()
+    rows_done = skipped = chunks_done = 0
+    while True:
+        rows = store.missing_embeddings(table_name, key, checkpoint["last_key"], page_size)
+        if not rows:
+            break
+
+        texts = [build_entry_text(row) for row in rows]
+        embeddable = [i for i, text in enumerate(texts) if text]
+        embeddings = rag_service.generate_embeddings([texts[i] for i in embeddable], use_cache=True)
+        if len(embeddings) != len(embeddable):
+            raise RuntimeError("Failed to generate embeddings")
+
+        updates = []
+        for i, vector in zip(embeddable, embeddings):
+            updates.append({**rows[i], "embedding": vector.astype(float).tolist()})
+        if updates:
+            if store.stores_chunks:
+                chunks_done += write_chunks(store, table_name, key, updates)
+            write_page(store, table_name, key, updates)
+
+        rows_done += len(updates)
+        skipped += len(rows) - len(updates)
+        checkpoint["last_key"] = rows[-1][key]
+        checkpoint["rows"] += len(updates)
+        checkpoint["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        save_checkpoint(path, checkpoint)
+
+        elapsed = max(time.time() - started, 1e-9)
+        print(f"🧮 {creator_name}/{table_name}: {rows_done} rows embedded ({rows_done / elapsed:.1f} rows/sec)")
+
+    # New vectors are otherwise written in batches; a finished pass persists the rest
+    rag_service.embedding_cache.save()
+    elapsed = max(time.time() - started, 1e-9)
+    # A finished pass starts over next time, so rows that failed or arrived since are picked up
+    save_checkpoint(path, {"last_key": None, "rows": checkpoint["rows"], "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    if rows_done:
+        # Newly embedded rows are retrievable now, so cached answers may be stale
+        for name in [creator_name, *(shared_with or [])]:
+            mark_corpus_updated(name)
+    result = {
+        "creator": creator_name,
+        "table": table_name,
+        "rows": rows_done,
+        "skipped": skipped,
+        "chunks": chunks_done,
+        "seconds": round(elapsed, 1),
+        "rows_per_sec": round(rows_done / elapsed, 1)
+    }
+    print(f"✅ {creator_name}/{table_name}: {rows_done} rows embedded in {result['seconds']}s "
+          f"({result['rows_per_sec']} rows/sec), {skipped} rows without text skipped")
+    return result
+
+def shared_table_key(creator_name: str, table_name: Optional[str] = None) -> Tuple[str, str]:
+    """(store location, table) a creator's backfill writes to; creators on the shared table get the same key"""
+    config = get_creator_config(creator_name)
+    store = rag_service.get_knowledge_store(creator_name)
+    location = getattr(store, "path", None) or config.get("supabase_url") or creator_name
+    return location, table_name or config.get("knowledge_table", "creator_knowledge")
+
+def setup_embeddings(creators: Optional[List[str]] = None, table_name: Optional[str] = None,
+                     page_size: int = BACKFILL_PAGE_SIZE, parallel: int = 2, restart: bool = False):
+    """Backfill embeddings for several creators in parallel"""
+    print("🚀 Starting embedding backfill...")
+
     if not rag_service.embedding_model:
         print("❌ Embedding model not loaded.")
-        return
-    
-    try:
-        # Get all knowledge entries without embeddings
-        response = rag_service.supabase.table('creator_knowledge').select('*').is_('embedding', 'null').execute()
-        
-        if not response.data:
-            print("✅ All entries already have embeddings!")
-            return
-        
-        print(f"📝 Found {len(response.data)} entries without embeddings")
-        
-        # Process each entry
-        for entry in response.data:
-            content = entry['content']
-            entry_id = entry['id']
-            
-            print(f"🔄 Processing entry {entry_id}: {content[:50]}...")
-            
-            # Generate embedding
-            embedding = rag_service.generate_embedding(content)
-            
-            if embedding:
-                # Update the entry with embedding
-                update_response = rag_service.supabase.table('creator_knowledge').update({
-                    'embedding': embedding
-                }).eq('id', entry_id).execute()
-                
-                if update_response.data:
-                    print(f"✅ Updated entry {entry_id}")
-                else:
-                    print(f"❌ Failed to update entry {entry_id}")
-            else:
-                print(f"❌ Failed to generate embedding for entry {entry_id}")
-        
-        print("🎉 Embedding setup complete!")
-        
-    except Exception as e:
-        print(f"❌ Error during setup: {e}")
+        return []
+
+    creators = creators or [name for name, config in CREATOR_SUPABASE_CONFIG.items()
+                            if config.get("knowledge_store", KNOWLEDGE_STORE) == "sqlite"
+                            or (config.get("supabase_url") and config.get("supabase_key"))]
+    started = time.time()
+
+    # Creators sharing a table (Austin, Zack and Lewis on creator_knowledge) would page through
+    # and embed the same rows in parallel, so each table is backfilled once
+    groups: Dict[Tuple[str, str], List[str]] = {}
+    for creator_name in creators:
+        groups.setdefault(shared_table_key(creator_name, table_name), []).append(creator_name)
+    for (_, table), names in groups.items():
+        if len(names) > 1:
+            print(f"ℹ️ {table} is shared by {', '.join(names)}; backfilling it once as {names[0]}")
+
+    def run(names: List[str]) -> Dict[str, Any]:
+        try:
+            return backfill_table(names[0], table_name, page_size, restart, shared_with=names[1:])
+        except Exception as e:
+            print(f"❌ {names[0]}: backfill stopped ({e}); rerun to resume from the checkpoint")
+            return {"creator": names[0], "rows": 0, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+        results = list(pool.map(run, groups.values()))
+
+    total = sum(result["rows"] for result in results)
+    elapsed = max(time.time() - started, 1e-9)
+    print(f"🎉 Embedded {total} rows for {len(creators)} creators in {elapsed:.1f}s ({total / elapsed:.1f} rows/sec)")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill missing embeddings in each creator's knowledge store")
+    parser.add_argument("--creator", action="append", help="creator to backfill (repeatable; default: all configured)")
+    parser.add_argument("--table", help="table to backfill (default: the creator's knowledge_table)")
+    parser.add_argument("--page-size", type=int, default=BACKFILL_PAGE_SIZE, help="rows fetched, encoded and written per page")
+    parser.add_argument("--parallel", type=int, default=2, help="creators processed at once")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and start from the first row")
+    args = parser.parse_args()
+    setup_embeddings(args.creator, args.table, args.page_size, args.parallel, args.restart)
 
 if __name__ == "__main__":
-    setup_embeddings()
+    main()
@@ -0,0 +1,42 @@
+"""
+Minimal asyncio client for a Supabase project's PostgREST API.
+Used by the ASGI serving mode so table reads and RPC calls do not block the event loop.
+"""
+
+from typing import List, Dict, Any, Optional
+import httpx
+
+class AsyncSupabaseREST:
+    def __init__(self, supabase_url: str, supabase_key: str, timeout: float = 10.0, max_connections: int = 50):
+        """Create a pooled async HTTP client for one Supabase project"""
+        self.client = httpx.AsyncClient(
+            base_url=f"{supabase_url.rstrip('/')}/rest/v1",
+            headers={
+                "apikey": supabase_key,
+                "Authorization": f"Bearer {supabase_key}"
+            },
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    async def select(self, table: str, columns: str = "*", filters: Optional[Dict[str, str]] = None,
+                     limit: Optional[int] = None, order: Optional[str] = None) -> List[Dict[str, Any]]:
+        """GET rows from a table; filters use PostgREST syntax, e.g. {'id': 'eq.1'}"""
+        params = {"select": columns}
+        params.update(filters or {})
+        if limit is not None:
+            params["limit"] = str(limit)
+        if order:
+            params["order"] = order
+        response = await self.client.get(f"/{table}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        """Call a Postgres function exposed through PostgREST"""
+        response = await self.client.post(f"/rpc/{function}", json=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
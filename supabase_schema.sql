@@ -72,3 +72,5 @@ ON CONFLICT DO NOTHING;
 
 -- Generate embeddings for existing content (you'll need to run this after setting up the embedding service)
 -- UPDATE creator_knowledge SET embedding = generate_embedding(content) WHERE embedding IS NULL;
+
+-- Vector indexes, chunk tables and match_knowledge_chunks: see migrations/ (python build_pg_index.py --migrate)
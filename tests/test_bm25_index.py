@@ -0,0 +1,50 @@
+"""
+Offline tests for BM25 lexical retrieval and reciprocal rank fusion
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bm25_index import BM25Index, FrozenBM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = [
+    "Galaxy S24 Ultra review: the best zoom camera",
+    "iPhone 15 Pro camera test",
+    "Vision Pro headset impressions",
+    "Galaxy Watch and Galaxy Buds unboxing",
+]
+
+def test_exact_product_terms_rank_first():
+    index = BM25Index()
+    index.add(DOCS)
+    assert tokenize("S24 Ultra!") == ["s24", "ultra"]
+    assert [position for position, _ in index.search("s24 ultra")] == [0]
+    assert index.search("vision pro")[0][0] == 2
+    assert index.search("nothing matches") == []
+
+def test_rarer_terms_weigh_more():
+    index = BM25Index()
+    index.add(DOCS)
+    scores = index.scores("camera headset")
+    # "headset" appears once, "camera" twice
+    assert scores[2] > scores[0] > 0 and scores[3] == 0
+
+def test_frozen_postings_score_like_the_live_index():
+    index = BM25Index()
+    index.add(DOCS)
+    terms, offsets, docs, freqs = index.postings()
+    frozen = FrozenBM25Index(np.asarray(index.doc_lengths), terms, offsets, docs, freqs)
+    for query in ("galaxy", "pro camera", "zoom ultra s24", "missing"):
+        assert np.allclose(frozen.scores(query), index.scores(query))
+    with pytest.raises(TypeError):
+        frozen.add(["more"])
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [key for key, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
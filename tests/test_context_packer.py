@@ -0,0 +1,43 @@
+"""
+Offline tests for token-budgeted context packing
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from context_packer import estimate_tokens, pack_context, trim_to_best_span, query_terms
+
+def sentences(topic, count):
+    return " ".join(f"This is sentence {i} about the {topic} and more filler words here." for i in range(count))
+
+def test_entries_that_fit_are_packed_whole_in_order():
+    items = [("Video: A\n", "camera sample", None), ("Video: B\n", "battery life", None), ("Video: C\n", "", None)]
+    packed = pack_context(items, "camera", budget=1000)
+    assert packed["text"] == "Video: A\ncamera sample\n\nVideo: B\nbattery life"
+    assert (packed["entries_used"], packed["entries_trimmed"], packed["entries_dropped"]) == (2, 0, 1)
+    assert packed["tokens"] == estimate_tokens(packed["text"])
+
+def test_packed_context_never_exceeds_the_budget():
+    items = [(f"Video: {i}\n", sentences("phone", 40), None) for i in range(6)]
+    for budget in (60, 200, 700, 1500):
+        packed = pack_context(items, "phone", budget)
+        assert packed["tokens"] <= budget
+        assert estimate_tokens(packed["text"]) <= budget
+
+def test_an_oversized_entry_is_trimmed_around_the_best_match():
+    content = sentences("laptop", 30) + " The camera has a periscope zoom lens. " + sentences("laptop", 30)
+    packed = pack_context([("", content, None)], "camera zoom", budget=80)
+    assert packed["entries_trimmed"] == 1
+    assert "periscope zoom" in packed["text"] and packed["text"].startswith("...")
+
+def test_trim_keeps_the_sentence_with_most_query_terms():
+    content = "Intro about nothing. The battery lasts two days. Outro and thanks."
+    assert trim_to_best_span(content, query_terms("How is the battery?"), budget=8) == "... The battery lasts two days. ..."
+
+def test_precomputed_token_counts_are_trusted():
+    # A chunk's stored token_count decides whether it fits, without re-counting its text
+    assert pack_context([("", "short text", None)], "", budget=100)["entries_trimmed"] == 0
+    assert pack_context([("", "short text", 500)], "", budget=100)["entries_trimmed"] == 1
@@ -0,0 +1,49 @@
+"""
+Offline tests for the on-disk embedding cache
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_cache import EmbeddingCache
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_puts_stay_in_memory_until_a_batch_is_full(tmp_path):
+    cache = EmbeddingCache("model", str(tmp_path), save_every=3, save_interval=0)
+    cache.put("a", np.ones(4))
+    cache.put("b", np.zeros(4))
+    assert not os.path.exists(cache.path)
+    assert cache.stats()["unsaved"] == 2
+
+    cache.put("c", np.full(4, 2.0))
+    assert wait_for(lambda: cache.stats()["unsaved"] == 0)
+    reloaded = EmbeddingCache("model", str(tmp_path))
+    assert np.allclose(reloaded.get("c"), 2.0) and reloaded.get("missing") is None
+
+def test_timer_saves_a_partial_batch(tmp_path):
+    cache = EmbeddingCache("model", str(tmp_path), save_every=100, save_interval=0.05)
+    cache.put("a", np.ones(4))
+    assert wait_for(lambda: os.path.exists(cache.path) and cache.stats()["unsaved"] == 0)
+
+def test_save_merges_vectors_written_by_another_process(tmp_path):
+    first = EmbeddingCache("model", str(tmp_path), save_interval=0)
+    second = EmbeddingCache("model", str(tmp_path), save_interval=0)
+    first.get("x")
+    second.get("x")
+    first.put("a", np.ones(4))
+    first.save()
+    second.put("b", np.zeros(4))
+    second.save()
+    assert second.get("a") is not None
+    reloaded = EmbeddingCache("model", str(tmp_path))
+    assert reloaded.get("a") is not None and reloaded.get("b") is not None
@@ -0,0 +1,69 @@
+"""
+Offline tests for the memory-mapped index file format
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bm25_index import BM25Index
+from index_file import MappedIndex, write_index_file
+from vector_index import VectorIndex
+
+def sample(count=50, dim=16):
+    vectors = np.random.default_rng(0).normal(size=(count, dim)).astype(np.float32)
+    ids = [f"doc{i}" for i in range(count)]
+    records = [{"title": f"Video {i}", "content": f"review number {i}"} for i in range(count)]
+    return ids, vectors, records
+
+@pytest.mark.parametrize("storage", ["float32", "float16", "int8"])
+def test_mapped_index_searches_like_the_in_memory_index(tmp_path, storage):
+    ids, vectors, records = sample()
+    path = str(tmp_path / "creator.idx")
+    write_index_file(path, ids, vectors, records, storage=storage, meta={"source": "test"})
+    mapped = MappedIndex(path)
+    memory = VectorIndex(16, storage=storage)
+    memory.add(ids, vectors, records)
+
+    assert len(mapped) == 50 and mapped.meta == {"source": "test"}
+    assert mapped.ids[3] == "doc3" and mapped.records[-1] == records[-1]
+    assert mapped.search(vectors[7], k=3) == memory.search(vectors[7], k=3)
+    assert mapped.search(vectors[7], k=1)[0]["title"] == "Video 7"
+    with pytest.raises(TypeError):
+        mapped.add(["x"], vectors[:1], [{}])
+
+def test_bm25_postings_round_trip(tmp_path):
+    ids, vectors, records = sample(3)
+    texts = ["galaxy phone camera", "vision headset", "galaxy watch"]
+    lexical = BM25Index()
+    lexical.add(texts)
+    path = str(tmp_path / "creator.idx")
+    write_index_file(path, ids, vectors, records, lexical=lexical)
+    mapped = MappedIndex(path)
+    assert mapped.lexical is not None
+    assert mapped.lexical.search("galaxy camera") == lexical.search("galaxy camera")
+    with pytest.raises(ValueError):
+        write_index_file(path, ids[:2], vectors[:2], records[:2], lexical=lexical)
+
+def test_replacing_the_file_marks_open_mappings_stale(tmp_path):
+    ids, vectors, records = sample()
+    path = str(tmp_path / "creator.idx")
+    write_index_file(path, ids, vectors, records)
+    mapped = MappedIndex(path, check_interval=0)
+    assert not mapped.is_stale()
+
+    write_index_file(path, ids[:10], vectors[:10], records[:10])
+    assert mapped.is_stale()
+    # The old mapping keeps serving in-flight queries
+    assert len(mapped) == 50 and mapped.search(vectors[40], k=1)[0]["title"] == "Video 40"
+    assert len(MappedIndex(path)) == 10
+
+def test_rejects_files_that_are_not_index_files(tmp_path):
+    path = tmp_path / "other.idx"
+    path.write_bytes(b"not an index" * 10)
+    with pytest.raises(ValueError):
+        MappedIndex(str(path))
@@ -0,0 +1,54 @@
+"""
+Offline tests for the resumable channel ingestion manifest
+Needs the packages the scraper imports (yt_dlp, requests); nothing is fetched
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ingest_channel = pytest.importorskip("ingest_channel")
+
+def url(video_id):
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+def row(video_id, transcript="transcript"):
+    return {"date": "2025-01-01", "title": video_id, "url": url(video_id), "transcript": transcript, "description": ""}
+
+@pytest.fixture(autouse=True)
+def manifest_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_channel, "MANIFEST_DIR", str(tmp_path / "manifests"))
+
+def test_reconcile_and_to_fetch_resume_an_interrupted_run(tmp_path):
+    output = str(tmp_path / "videos.csv")
+    path = ingest_channel.manifest_path("Test Creator", output)
+    manifest = ingest_channel.IngestManifest(path, "Test Creator", "https://youtube.com/@test", output)
+    manifest.mark("gone", url("gone"), "done", content_hash=ingest_channel.content_hash(row("gone")))
+    manifest.mark("edited", url("edited"), "done", content_hash=ingest_channel.content_hash(row("edited")))
+    manifest.mark("broken", url("broken"), "failed", attempts=3, error="timeout")
+
+    # "edited" changed in the CSV, "crashed" was written but never checkpointed, "gone" was deleted
+    counts = manifest.reconcile([row("edited", "new transcript"), row("crashed")])
+    assert counts == {"recovered": 1, "changed": 1, "requeued": 1}
+    assert manifest.videos["edited"]["content_hash"] == ingest_channel.content_hash(row("edited", "new transcript"))
+    assert manifest.summary() == {"done": 2, "failed": 1, "pending": 1}
+
+    channel = [url(video_id) for video_id in ("gone", "edited", "broken", "crashed", "new")]
+    assert [video_id for video_id, _ in manifest.to_fetch(channel, max_attempts=3)] == ["gone", "new"]
+    assert [video_id for video_id, _ in manifest.to_fetch(channel, max_attempts=4)] == ["gone", "broken", "new"]
+    assert [video_id for video_id, _ in manifest.to_fetch(channel, retry_failed=False, max_attempts=4)] == ["gone", "new"]
+
+def test_saved_manifest_is_reused_only_for_its_output_file(tmp_path):
+    output = str(tmp_path / "videos.csv")
+    path = ingest_channel.manifest_path("Test Creator", output)
+    manifest = ingest_channel.IngestManifest(path, "Test Creator", "https://youtube.com/@test", output)
+    manifest.mark("abc", url("abc"), "done")
+    manifest.save()
+
+    assert set(ingest_channel.IngestManifest(path, "Test Creator", "", output).videos) == {"abc"}
+    other = str(tmp_path / "other.csv")
+    assert ingest_channel.manifest_path("Test Creator", other) != path
+    assert ingest_channel.IngestManifest(path, "Test Creator", "", other).videos == {}
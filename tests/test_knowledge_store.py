@@ -0,0 +1,60 @@
+"""
+Offline tests for the local SQLite knowledge store
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from knowledge_store import SQLiteStore
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+def test_sqlite_store_backfill_roundtrip(tmp_path):
+    store = SQLiteStore(str(tmp_path / "knowledge.db"))
+    store.upsert("videos", [{"url": "a", "title": "A"}, {"url": "b", "title": "B"}], on_conflict="url")
+    assert [row["url"] for row in store.missing_embeddings("videos", "url", None, 10)] == ["a", "b"]
+    assert [row["url"] for row in store.missing_embeddings("videos", "url", "a", 10)] == ["b"]
+
+    store.write_embeddings("videos", "url", [{"url": "a", "embedding": unit(1, 0)}])
+    assert [row["url"] for row in store.missing_embeddings("videos", "url", None, 10)] == ["b"]
+    assert store.fetch("videos", "url,title", "url", ["a"]) == [{"url": "a", "title": "A"}]
+
+    # Re-uploading a row without an embedding keeps the stored one
+    store.upsert("videos", [{"url": "a", "title": "A2"}], on_conflict="url")
+    row = store.fetch("videos", "*", "url", ["a"])[0]
+    assert row["title"] == "A2" and np.allclose(row["embedding"], unit(1, 0))
+
+def test_sqlite_store_match_is_not_crowded_out_by_other_creators(tmp_path):
+    store = SQLiteStore(str(tmp_path / "knowledge.db"))
+    rows = [{"id": f"one-{i}", "creator_id": 1, "embedding": unit(1, 0.01 * i)} for i in range(40)]
+    rows += [{"id": "two-0", "creator_id": 2, "embedding": unit(1, 1)},
+             {"id": "two-1", "creator_id": 2, "embedding": unit(1, 2)},
+             {"id": "shared", "creator_id": None, "embedding": unit(1, 3)}]
+    store.upsert("creator_knowledge", rows, on_conflict="id")
+
+    matches = store.match("creator_knowledge", unit(1, 0), 2, 0.0, 5)
+    assert [row["id"] for row in matches] == ["two-0", "two-1", "shared"]
+    assert all(a["similarity"] >= b["similarity"] for a, b in zip(matches, matches[1:]))
+    assert len(store.match("creator_knowledge", unit(1, 0), 1, 0.0, 5)) == 5
+    assert store.match("creator_knowledge", unit(1, 0), 3, 0.0, 5)[0]["id"] == "shared"
+
+def test_sqlite_store_match_sees_new_rows(tmp_path):
+    store = SQLiteStore(str(tmp_path / "knowledge.db"))
+    store.upsert("videos", [{"url": "a", "embedding": unit(1, 0)}], on_conflict="url")
+    assert [row["url"] for row in store.match("videos", unit(0, 1), None, 0.5, 5)] == []
+
+    store.upsert("videos", [{"url": "b", "embedding": unit(0, 1)}], on_conflict="url")
+    assert [row["url"] for row in store.match("videos", unit(0, 1), None, 0.5, 5)] == ["b"]
+
+def test_sqlite_store_matches_chunks(tmp_path):
+    store = SQLiteStore(str(tmp_path / "knowledge.db"))
+    store.upsert("videos", [{"url": "a", "embedding": unit(1, 0)}], on_conflict="url")
+    store.replace_chunks("videos", "a", [({"url": "a", "content": "intro"}, unit(1, 0)),
+                                         ({"url": "a", "content": "camera"}, unit(0, 1))])
+    assert store.match("videos", unit(0, 1), None, 0.5, 5)[0]["content"] == "camera"
@@ -0,0 +1,138 @@
+"""
+Tests for RAGService retrieval against a local SQLite knowledge store
+Needs the packages rag_service imports (supabase, langchain); the embedding model is replaced by a fake
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import hashlib
+import numpy as np
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+rag = pytest.importorskip("rag_service")
+from embedding_model import EmbeddingModelHolder
+
+class HashingModel:
+    """Bag-of-words stand-in for the SentenceTransformer: equal texts get equal vectors"""
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), 384), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 384] += 1
+        return vectors
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "KNOWLEDGE_STORE", "sqlite")
+    monkeypatch.setattr(rag, "SQLITE_STORE_PATH", str(tmp_path / "knowledge.db"))
+    service = rag.RAGService()
+    service.model_holder = EmbeddingModelHolder("fake")
+    service.model_holder._model = HashingModel()
+    service.model_holder._attempted = True
+    yield service
+    service.executor.shutdown(wait=False)
+    service.io_executor.shutdown(wait=False)
+
+def test_primed_cache_keeps_sqlite_creators_searchable(service):
+    # Austin Evans has no Supabase project, only the shared SQLite store
+    assert not rag.get_creator_config("Austin Evans").get("supabase_url")
+    text = "pc build guide"
+    store = service.get_knowledge_store("Austin Evans")
+    store.upsert("creator_knowledge", [
+        {"id": 1, "creator_id": 2, "content": text, "embedding": HashingModel().encode([text])[0].tolist()}
+    ], on_conflict="id")
+    assert len(service.search_knowledge_base(text, "Austin Evans", 2)) == 1
+
+    service.prime_creator_cache({}, background=False)
+    assert service.creator_cache.get_method("Austin Evans") != "none"
+    results = service.search_knowledge_base(text, "Austin Evans", 2)
+    assert [row["content"] for row in results] == [text]
+
+def test_rows_without_metadata_still_augment_the_prompt(service):
+    text = "durability test of the new phone"
+    store = service.get_knowledge_store("Zack Nelson")
+    store.upsert("creator_knowledge", [
+        {"id": 1, "creator_id": 4, "content": text, "embedding": HashingModel().encode([text])[0].tolist()}
+    ], on_conflict="id")
+    # Below the match threshold, so the row is hydrated by two-phase search with null columns filled in
+    result = service.retrieve_and_augment("durability phone", "Zack Nelson", 4)
+    assert result["has_knowledge"] and text in result["knowledge_context"]
+
+def test_shared_table_search_stays_within_the_creator(service):
+    store = service.get_knowledge_store("Austin Evans")
+    rows = [(1, 2, "pc build guide"), (2, 4, "durability test of the new phone")]
+    store.upsert("creator_knowledge", [
+        {"id": row_id, "creator_id": creator_id, "content": text, "embedding": HashingModel().encode([text])[0].tolist()}
+        for row_id, creator_id, text in rows
+    ], on_conflict="id")
+    # Below the match threshold, so both the two-phase scan and the row-text scan see the whole shared table
+    assert service.search_knowledge_base("durability phone", "Austin Evans", 2) == []
+    assert [row["content"] for row in service.search_knowledge_base("durability phone", "Zack Nelson", 4)] == [
+        "durability test of the new phone"
+    ]
+
+def test_payload_bytes_estimate_is_close_to_the_json_size():
+    import json
+    vectors = [{"id": str(i), "embedding": HashingModel().encode([f"row {i}"])[0].tolist()} for i in range(20)]
+    texts = [{"id": i, "content": "x" * 300, "metadata": {"url": "https://youtu.be/x"}, "source": None} for i in range(5)]
+    for rows in (vectors, texts):
+        actual = len(json.dumps(rows, separators=(",", ":")))
+        assert abs(rag.payload_bytes(rows) - actual) <= actual * 0.1
+    assert rag.payload_bytes([]) == 0
+
+def test_local_ivf_index_picks_up_appended_corpus_rows(service, tmp_path, monkeypatch):
+    import csv
+    corpus = tmp_path / "corpus.csv"
+    def write_rows(rows):
+        with open(corpus, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["date", "title", "url", "transcript", "description"])
+            writer.writeheader()
+            writer.writerows({"date": "2025-01-01", "title": title, "url": f"https://youtu.be/{title}", "transcript": text,
+                              "description": ""} for title, text in rows)
+    rows = [("a", "phone camera review"), ("b", "laptop battery test")]
+    write_rows(rows)
+    monkeypatch.setattr(rag, "get_creator_config", lambda name: {"local_corpus": str(corpus)})
+    monkeypatch.setattr(rag, "VECTOR_INDEX_TYPE", "ivf")
+    monkeypatch.setattr(rag, "ANN_INDEX_DIR", str(tmp_path / "ann"))
+    monkeypatch.setattr(rag, "LOCAL_CORPUS_CHECK_INTERVAL", 0)
+
+    first = service.get_local_index("Local Creator")
+    assert len(first) == 2
+    write_rows(rows + [("c", "smart glasses hands on")])
+    os.utime(corpus, (os.stat(corpus).st_atime, os.stat(corpus).st_mtime + 10))
+
+    updated = service.get_local_index("Local Creator")
+    assert updated is not first and len(first) == 2
+    assert [record["title"] for record in updated.records] == ["a", "b", "c"]
+    assert service.search_local_index("smart glasses", "Local Creator", 1)[0]["title"] == "c"
+    assert service.get_local_index("Local Creator") is updated
+
+    # The saved index covers the new row; rows appended while no server ran are added at load, without a rebuild
+    monkeypatch.setattr(rag, "build_corpus_index", lambda *args, **kwargs: pytest.fail("rebuilt the IVF index"))
+    write_rows(rows + [("c", "smart glasses hands on"), ("d", "tablet keyboard case")])
+    os.utime(corpus, (os.stat(corpus).st_atime, os.stat(corpus).st_mtime + 10))
+    restarted = rag.RAGService()
+    restarted.model_holder = service.model_holder
+    try:
+        assert [record["title"] for record in restarted.get_local_index("Local Creator").records] == ["a", "b", "c", "d"]
+    finally:
+        restarted.executor.shutdown(wait=False)
+        restarted.io_executor.shutdown(wait=False)
+
+def test_chunks_have_stable_ids_and_offsets_into_the_source_text(service):
+    transcript = " ".join(f"word{i}" for i in range(600))
+    entry = {"title": "Review", "url": "https://www.youtube.com/watch?v=abc123&t=5", "transcript": transcript}
+    chunks = service.chunk_entries([entry, {"title": "No text"}])
+    assert len(chunks) > 1 and all(chunk["source_id"] == "abc123" for chunk in chunks)
+    assert [chunk["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
+    for chunk in chunks:
+        assert chunk["chunk_id"] == f"abc123:{chunk['start_index']}"
+        assert transcript[chunk["start_index"]:chunk["end_index"]] == chunk["content"]
+        assert chunk["title"] == "Review" and "transcript" not in chunk
+    # Consecutive chunks overlap, so a sentence cut at a boundary is still whole in one of them
+    assert all(b["start_index"] < a["end_index"] for a, b in zip(chunks, chunks[1:]))
+    assert [chunk["chunk_id"] for chunk in service.chunk_entries([entry])] == [chunk["chunk_id"] for chunk in chunks]
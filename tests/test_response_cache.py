@@ -0,0 +1,50 @@
+"""
+Offline tests for the semantic response cache
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import response_cache
+from response_cache import SemanticResponseCache
+
+def test_near_duplicate_questions_hit_and_others_miss():
+    cache = SemanticResponseCache(threshold=0.9)
+    cache.store("Marques Brownlee", "iphone camera?", [1, 0, 0], "It's great")
+    entry, similarity = cache.lookup("Marques Brownlee", [1, 0.1, 0])
+    assert entry["response"] == "It's great" and similarity > 0.99
+    assert cache.lookup("Marques Brownlee", [0, 1, 0]) is None
+    # Answers are per creator
+    assert cache.lookup("Austin Evans", [1, 0, 0]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_entries_are_dropped_when_the_corpus_version_changes():
+    cache = SemanticResponseCache()
+    cache.store("Marques Brownlee", "q", [1, 0], "old answer", corpus_version=1)
+    assert cache.lookup("Marques Brownlee", [1, 0], corpus_version=1) is not None
+    assert cache.lookup("Marques Brownlee", [1, 0], corpus_version=2) is None
+    assert cache.stats()["entries"] == 0
+
+def test_expired_and_least_recently_used_entries_go(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticResponseCache(ttl=10, max_entries=2)
+    for i, vector in enumerate(np.eye(3)):
+        cache.store("Marques Brownlee", f"q{i}", vector, f"a{i}")
+    assert cache.lookup("Marques Brownlee", [1, 0, 0]) is None
+    assert cache.lookup("Marques Brownlee", [0, 0, 1])[0]["response"] == "a2"
+    assert cache.stats()["evictions"] == 1
+
+    now[0] = 10.0
+    assert cache.lookup("Marques Brownlee", [0, 0, 1]) is None
+
+def test_corpus_markers_version_each_creator(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "CORPUS_VERSION_DIR", str(tmp_path))
+    assert response_cache.corpus_marker_version("Austin Evans") == 0.0
+    response_cache.mark_corpus_updated("Austin Evans")
+    assert response_cache.corpus_marker_version("Austin Evans") > 0
+    assert response_cache.corpus_marker_version("Zack Nelson") == 0.0
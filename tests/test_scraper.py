@@ -0,0 +1,34 @@
+"""
+Offline tests for the scraper's request throttling
+Needs the packages the scraper imports (yt_dlp, requests); nothing is fetched
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+scraper = pytest.importorskip("scraper")
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = scraper.TokenBucket(rate=50, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() > 0
+    # A zero rate disables throttling
+    assert [scraper.TokenBucket(rate=0, burst=1).acquire() for _ in range(5)] == [0.0] * 5
+
+def test_host_limiter_shares_one_semaphore_per_host():
+    limiter = scraper.HostLimiter(per_host=2)
+    youtube = limiter.for_host("www.youtube.com")
+    assert limiter.for_host("www.youtube.com") is youtube
+    assert limiter.for_host("i.ytimg.com") is not youtube
+    assert youtube.acquire(blocking=False) and youtube.acquire(blocking=False)
+    assert not youtube.acquire(blocking=False)
+
+def test_get_video_id_handles_youtube_url_shapes():
+    assert scraper.get_video_id("https://www.youtube.com/watch?v=abc123&t=5") == "abc123"
+    assert scraper.get_video_id("https://youtu.be/abc123?si=x") == "abc123"
+    assert scraper.get_video_id("https://www.youtube.com/embed/abc123/") == "abc123"
+    assert scraper.get_video_id("https://example.com/video") is None
@@ -0,0 +1,20 @@
+"""
+Offline tests for the bounded chat session store
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from session_store import SessionStore
+
+def test_message_count_reports_retained_messages_after_trimming():
+    store = SessionStore(max_messages=4)
+    totals = [store.append("s", "Marques Brownlee", {"role": "user", "content": f"message {i}"}) for i in range(6)]
+    # append counts every message the session has seen; the store only keeps the newest max_messages
+    assert totals == [1, 2, 3, 4, 5, 6]
+    assert store.message_count("s") == 4
+    assert [m["content"] for m in store.get_messages("s")] == [f"message {i}" for i in range(2, 6)]
+    assert store.message_count("unknown") == 0
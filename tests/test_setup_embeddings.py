@@ -0,0 +1,53 @@
+"""
+Tests for the embedding backfill against a local SQLite knowledge store
+Needs the packages rag_service imports (supabase, langchain); the embedding model is replaced by a fake
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+setup = pytest.importorskip("setup_embeddings")
+import rag_service as rag
+from embedding_model import EmbeddingModelHolder
+
+class CountingModel:
+    """Encoder stand-in that records every text it is asked to embed"""
+
+    def __init__(self):
+        self.texts = []
+
+    def encode(self, texts, **kwargs):
+        self.texts += texts
+        return np.ones((len(texts), 384), dtype=np.float32)
+
+def test_creators_sharing_a_table_backfill_it_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "KNOWLEDGE_STORE", "sqlite")
+    monkeypatch.setattr(rag, "SQLITE_STORE_PATH", str(tmp_path / "knowledge.db"))
+    monkeypatch.setattr(setup, "CHECKPOINT_DIR", str(tmp_path / "checkpoints"))
+    marked = []
+    monkeypatch.setattr(setup, "mark_corpus_updated", marked.append)
+    service = rag.RAGService()
+    service.model_holder = EmbeddingModelHolder("fake")
+    service.model_holder._model = model = CountingModel()
+    service.model_holder._attempted = True
+    monkeypatch.setattr(setup, "rag_service", service)
+
+    creators = ["Austin Evans", "Zack Nelson", "Lewis George Hilsenteger"]
+    service.get_knowledge_store(creators[0]).upsert("creator_knowledge", [
+        {"id": f"{creator_id}-0", "creator_id": creator_id, "content": f"backfill test row {creator_id} {tmp_path}"}
+        for creator_id in (2, 4, 5)
+    ], on_conflict="id")
+    try:
+        results = setup.setup_embeddings(creators, parallel=3)
+    finally:
+        service.executor.shutdown(wait=False)
+        service.io_executor.shutdown(wait=False)
+
+    assert [(result["creator"], result["rows"]) for result in results] == [("Austin Evans", 3)]
+    assert len(model.texts) == len(set(model.texts))
+    assert marked == creators
@@ -0,0 +1,66 @@
+"""
+Offline tests for the TTL cache and the per-creator metadata cache built on it
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ttl_cache import TTLCache
+from creator_cache import CreatorMetadataCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=None)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None and "a" not in cache
+    assert cache.get("b") == 2
+    assert cache.stats()["expirations"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate_where_drops_matching_keys():
+    cache = TTLCache(ttl=None)
+    for key in [("Austin Evans", 2), ("Zack Nelson", 4), ("Austin Evans", 99)]:
+        cache.set(key, {})
+    assert cache.invalidate_where(lambda key: key[0] == "Austin Evans") == 2
+    assert len(cache) == 1
+
+def test_creator_cache_primes_and_invalidates_per_creator():
+    cache = CreatorMetadataCache(ttl=60)
+    config = {
+        "Supabase": {"supabase_url": "https://x.supabase.co", "supabase_key": "key"},
+        "SQLite": {"knowledge_store": "sqlite"},
+        "Nothing": {"supabase_url": ""}
+    }
+    assert cache.prime_from_config(config) == ["Supabase", "SQLite"]
+    assert cache.get_method("Nothing") == "none" and cache.get_method("SQLite") is None
+    assert cache.prime_from_config({"Nothing": {}}, default_store="sqlite") == ["Nothing"]
+
+    cache.set_info("Supabase", 1, {"name": "Supabase"})
+    cache.set_method("Supabase", "rpc")
+    cache.invalidate("Supabase")
+    assert cache.get_info("Supabase", 1) is None and cache.get_method("Supabase") is None
+    with pytest.raises(ValueError):
+        cache.set_method("Supabase", "graphql")
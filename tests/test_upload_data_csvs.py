@@ -0,0 +1,64 @@
+"""
+Offline tests for the batched CSV upload against a local SQLite knowledge store
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import csv
+import json
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import upload_data_csvs
+from upload_data_csvs import iter_byte_batches, upload_batch, upload_csv_to_table
+from knowledge_store import SQLiteStore
+
+def rows(count, size=100):
+    return [{"id": f"{i:02d}", "text": "x" * size} for i in range(count)]
+
+def test_batches_respect_byte_and_row_limits():
+    row_bytes = len(json.dumps(rows(1)[0])) + 1
+    batches = list(iter_byte_batches(rows(50), max_bytes=row_bytes * 4, max_rows=3))
+    assert all(len(batch) <= 3 and size <= row_bytes * 4 for batch, size in batches)
+    assert sum(len(batch) for batch, _ in batches) == 50
+
+    batches = list(iter_byte_batches(rows(50), max_bytes=row_bytes * 4, max_rows=100))
+    assert [len(batch) for batch, _ in batches] == [4] * 12 + [2]
+    assert all(size == row_bytes * len(batch) for batch, size in batches)
+
+def test_oversized_rows_go_out_alone():
+    assert [len(batch) for batch, _ in iter_byte_batches(rows(3, size=500), max_bytes=200, max_rows=100)] == [1, 1, 1]
+    assert list(iter_byte_batches([], max_bytes=200, max_rows=100)) == []
+
+def test_upload_batch_retries_then_gives_up(monkeypatch):
+    monkeypatch.setattr(upload_data_csvs.time, "sleep", lambda seconds: None)
+
+    class FlakyStore:
+        def __init__(self, failures):
+            self.failures = failures
+
+        def upsert(self, table, batch, on_conflict):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("reset")
+
+    assert upload_batch(FlakyStore(2), "videos", rows(1), "id", retries=3, backoff=0.1) == 2
+    with pytest.raises(ConnectionError):
+        upload_batch(FlakyStore(5), "videos", rows(1), "id", retries=3, backoff=0.1)
+
+def test_reupload_upserts_on_the_url_column(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_data_csvs, "mark_corpus_updated", lambda creator_name: None)
+    csv_path = tmp_path / "test_videos.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["url", "title", "description"])
+        writer.writeheader()
+        writer.writerows({"url": f"https://youtu.be/{i}", "title": f"Video {i}", "description": ""} for i in range(25))
+    store = SQLiteStore(str(tmp_path / "knowledge.db"))
+
+    for _ in range(2):
+        result = upload_csv_to_table(str(csv_path), batch_bytes=512, workers=2, store=store)
+        assert result["successful_inserts"] == 25 and result["failed_inserts"] == 0 and result["batches"] > 1
+    stored = store.fetch("test_videos", "url,description", "url", [f"https://youtu.be/{i}" for i in range(25)])
+    assert len(stored) == 25 and stored[0]["description"] is None
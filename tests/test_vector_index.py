@@ -0,0 +1,77 @@
+"""
+Offline tests for the in-process vector index
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add the repository root to path to import the modules under test
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_index import VectorIndex, top_k_indices
+
+def random_vectors(count, dim=32, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+def test_search_returns_top_k_by_cosine_best_first():
+    vectors = random_vectors(200)
+    index = VectorIndex(32)
+    index.add([f"v{i}" for i in range(200)], vectors, [{"n": i} for i in range(200)])
+
+    query = vectors[17] + 0.01 * random_vectors(1, seed=1)[0]
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    results = index.search(query, k=5)
+    assert [row["n"] for row in results] == expected.tolist()
+    assert results[0]["n"] == 17 and results[0]["similarity"] == pytest.approx(1.0, abs=1e-3)
+    # Results are copies; the stored records don't pick up the similarity
+    assert "similarity" not in index.records[17]
+
+def test_search_respects_min_score_and_candidates():
+    index = VectorIndex(2)
+    index.add(["x", "y", "xy"], [[1, 0], [0, 1], [1, 1]], [{"id": "x"}, {"id": "y"}, {"id": "xy"}])
+    assert [row["id"] for row in index.search([1, 0], k=3, min_score=0.5)] == ["x", "xy"]
+    assert [row["id"] for row in index.search([1, 0], k=3, candidates=[1, 2])] == ["xy", "y"]
+    assert VectorIndex(2).search([1, 0]) == []
+
+def test_add_rejects_mismatched_vectors():
+    index = VectorIndex(3)
+    with pytest.raises(ValueError):
+        index.add(["a"], [[1, 0]], [{}])
+    with pytest.raises(ValueError):
+        index.add(["a", "b"], [[1, 0, 0], [0, 1, 0]], [{}])
+
+def test_top_k_indices_orders_and_clamps():
+    scores = np.array([0.1, 0.9, 0.5, 0.7], dtype=np.float32)
+    assert top_k_indices(scores, 2).tolist() == [1, 3]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 0]
+    assert top_k_indices(scores, 0).tolist() == []
+
+def test_quantized_storage_keeps_rankings_and_shrinks_memory():
+    vectors = random_vectors(300, dim=64)
+    ids, records = [f"v{i}" for i in range(300)], [{"n": i} for i in range(300)]
+    exact = VectorIndex(64)
+    exact.add(ids, vectors, records)
+    query = random_vectors(1, dim=64, seed=2)[0]
+    expected = [position for position, _ in exact.rank(query, k=10)]
+    for storage in ("float16", "int8"):
+        index = VectorIndex(64, storage=storage)
+        index.add(ids, vectors, records)
+        assert index.memory_bytes() < exact.memory_bytes()
+        assert len(set(position for position, _ in index.rank(query, k=10)) & set(expected)) >= 8
+    with pytest.raises(ValueError):
+        VectorIndex(64, storage="int4")
+
+def test_rerank_restores_exact_scores(tmp_path):
+    vectors = random_vectors(300, dim=64)
+    index = VectorIndex(64, storage="int8", rerank_k=20, rerank_path=str(tmp_path / "rerank.f32"))
+    index.add([f"v{i}" for i in range(300)], vectors, [{"n": i} for i in range(300)])
+    assert index.rerank_source is not None
+    exact = VectorIndex(64)
+    exact.add([f"v{i}" for i in range(300)], vectors, [{"n": i} for i in range(300)])
+    query = random_vectors(1, dim=64, seed=3)[0]
+    reranked, expected = index.rank(query, k=5), exact.rank(query, k=5)
+    assert [position for position, _ in reranked] == [position for position, _ in expected]
+    assert np.allclose([score for _, score in reranked], [score for _, score in expected], atol=1e-5)
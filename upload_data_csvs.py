@@ -1,27 +1,99 @@
 #!/usr/bin/env python3
 """
-Upload all CSV files from data directory to Supabase
+Upload all CSV files from data directory to Supabase (or a local SQLite knowledge store)
 Each CSV file will create a table with the same name as the file
 
-Usage: python upload_data_csvs.py
+Rows are upserted on the url column when a CSV has one, so re-running the upload is
+safe; the table needs a unique constraint on it, e.g.
+    ALTER TABLE mkbhd_videos ADD CONSTRAINT mkbhd_videos_url_key UNIQUE (url);
+
+Usage: python upload_data_csvs.py [--sqlite data/knowledge.db]
 """
 
 import pandas as pd
 import os
+import csv
+import sys
 import glob
-from supabase_client import supabase
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from knowledge_store import KnowledgeStore, SupabaseStore, SQLiteStore
+from creator_config import CREATOR_SUPABASE_CONFIG
+from response_cache import mark_corpus_updated
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-def upload_csv_to_table(csv_file_path: str, batch_size: int = 100):
+# Bulk upload settings
+UPLOAD_BATCH_BYTES = int(os.getenv("UPLOAD_BATCH_BYTES", str(1024 * 1024)))  # JSON payload per request
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_RETRIES = int(os.getenv("UPLOAD_RETRIES", "3"))
+UPLOAD_CONFLICT_KEY = os.getenv("UPLOAD_CONFLICT_KEY", "url")  # natural key for idempotent upserts
+
+# Transcripts can exceed the csv module's default 128 KB field limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+def iter_csv_rows(csv_file_path: str) -> Iterator[Dict[str, Any]]:
+    """Stream rows from a CSV file one at a time (empty cells become NULL)"""
+    with open(csv_file_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield {key: (value if value != '' else None) for key, value in row.items()}
+
+def iter_byte_batches(rows: Iterable[Dict[str, Any]], max_bytes: int, max_rows: int) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+    """Group rows into batches of at most max_bytes of JSON (or max_rows rows); yields (batch, bytes)"""
+    batch, batch_bytes = [], 0
+    for row in rows:
+        row_bytes = len(json.dumps(row).encode('utf-8')) + 1
+        if batch and (batch_bytes + row_bytes > max_bytes or len(batch) >= max_rows):
+            yield batch, batch_bytes
+            batch, batch_bytes = [], 0
+        batch.append(row)
+        batch_bytes += row_bytes
+    if batch:
+        yield batch, batch_bytes
+
+def default_store() -> KnowledgeStore:
+    """The Supabase project from SUPABASE_URL/SUPABASE_KEY"""
+    from supabase_client import supabase
+    return SupabaseStore(supabase)
+
+def creators_for_table(table_name: str) -> List[str]:
+    """Creators whose knowledge table is table_name"""
+    return [name for name, config in CREATOR_SUPABASE_CONFIG.items()
+            if config.get("knowledge_table", "creator_knowledge") == table_name]
+
+def upload_batch(store: KnowledgeStore, table_name: str, batch: List[Dict[str, Any]], on_conflict: Optional[str],
+                 retries: int, backoff: float) -> int:
+    """Upsert (or insert) one batch, retrying with exponential backoff; returns the retries used"""
+    for attempt in range(retries + 1):
+        try:
+            store.upsert(table_name, batch, on_conflict)
+            return attempt
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+def upload_csv_to_table(csv_file_path: str, batch_bytes: int = UPLOAD_BATCH_BYTES, workers: int = UPLOAD_WORKERS,
+                        on_conflict: Optional[str] = UPLOAD_CONFLICT_KEY, retries: int = UPLOAD_RETRIES,
+                        backoff: float = 1.0, max_rows: int = 500, store: Optional[KnowledgeStore] = None):
     """
-    Upload CSV data to Supabase table named after the CSV file
+    Upload CSV data to the table named after the CSV file (Supabase unless a store is given)
+    
+    Rows are streamed, grouped into batches of about batch_bytes and uploaded by
+    several workers at once. Rows are upserted on the on_conflict column when the
+    CSV has it, so reruns don't duplicate rows; failed batches are retried.
     
     Args:
         csv_file_path (str): Path to the CSV file
-        batch_size (int): Number of rows to insert at once (default: 100)
+        batch_bytes (int): Target JSON payload size per request
+        workers (int): Batches uploaded concurrently
+        on_conflict (str): Natural key column to upsert on (default: url)
+        retries (int): Retries per failed batch
     
     Returns:
         dict: Summary of upload results
@@ -29,59 +101,76 @@ def upload_csv_to_table(csv_file_path: str, batch_size: int = 100):
     try:
         # Get table name from CSV filename (remove .csv extension)
         table_name = os.path.splitext(os.path.basename(csv_file_path))[0]
+        store = store or default_store()
         
-        # Read CSV file
-        print(f"📖 Reading CSV file: {csv_file_path}")
-        df = pd.read_csv(csv_file_path)
-        print(f"✅ CSV loaded successfully. Found {len(df)} rows")
+        with open(csv_file_path, newline='', encoding='utf-8') as f:
+            columns = next(csv.reader(f), [])
+        print(f"📖 Streaming CSV file: {csv_file_path}")
+        print(f"📊 Columns: {columns}")
+        if on_conflict and on_conflict not in columns:
+            print(f"⚠️  No '{on_conflict}' column, inserting without upsert (reruns will duplicate rows)")
+            on_conflict = None
         
-        # Display column information
-        print(f"📊 Columns: {list(df.columns)}")
-        
-        # Convert DataFrame to list of dictionaries
-        data_list = df.to_dict('records')
-        
-        # Upload data in batches
-        total_rows = len(data_list)
-        successful_inserts = 0
-        failed_inserts = 0
+        stats = {"rows": 0, "bytes": 0, "batches": 0, "successful": 0, "failed": 0,
+                 "failed_batches": [], "retries": 0}
+        started = time.time()
+        print(f"🚀 Starting upload to table '{table_name}' ({workers} workers, ~{batch_bytes // 1024} KB batches)...")
         
-        print(f"🚀 Starting upload to table '{table_name}'...")
-        
-        for i in range(0, total_rows, batch_size):
-            batch = data_list[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (total_rows + batch_size - 1) // batch_size
-            
+        def finish(future, batch_num, batch):
             try:
-                print(f"📦 Processing batch {batch_num}/{total_batches} ({len(batch)} rows)...")
-                response = supabase.table(table_name).insert(batch).execute()
-                
-                if response.data:
-                    successful_inserts += len(batch)
-                    print(f"✅ Batch {batch_num} uploaded successfully")
-                else:
-                    print(f"⚠️  Batch {batch_num} - No data returned")
-                    failed_inserts += len(batch)
-                    
+                stats["retries"] += future.result()
+                stats["successful"] += len(batch)
             except Exception as e:
-                print(f"❌ Batch {batch_num} failed: {str(e)}")
-                failed_inserts += len(batch)
+                print(f"❌ Batch {batch_num} failed after {retries} retries: {str(e)}")
+                stats["failed"] += len(batch)
+                stats["failed_batches"].append(batch_num)
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            for batch, size in iter_byte_batches(iter_csv_rows(csv_file_path), batch_bytes, max_rows):
+                stats["batches"] += 1
+                stats["rows"] += len(batch)
+                stats["bytes"] += size
+                future = pool.submit(upload_batch, store, table_name, batch, on_conflict, retries, backoff)
+                in_flight[future] = (stats["batches"], batch)
+                # Bound the batches held in memory to a couple per worker
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for finished in done:
+                        finish(finished, *in_flight.pop(finished))
+            for future in list(in_flight):
+                finish(future, *in_flight.pop(future))
+        
+        elapsed = max(time.time() - started, 1e-9)
+        total_rows = stats["rows"]
         
         # Summary
         result = {
             "table_name": table_name,
             "total_rows": total_rows,
-            "successful_inserts": successful_inserts,
-            "failed_inserts": failed_inserts,
-            "success_rate": (successful_inserts / total_rows) * 100 if total_rows > 0 else 0
+            "successful_inserts": stats["successful"],
+            "failed_inserts": stats["failed"],
+            "success_rate": (stats["successful"] / total_rows) * 100 if total_rows > 0 else 0,
+            "batches": stats["batches"],
+            "failed_batches": sorted(stats["failed_batches"]),
+            "retries": stats["retries"],
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(total_rows / elapsed, 1),
+            "mb_per_second": round(stats["bytes"] / elapsed / 1024 / 1024, 2)
         }
         
         print(f"📊 Upload Summary for '{table_name}':")
-        print(f"   Total rows: {result['total_rows']}")
+        print(f"   Total rows: {result['total_rows']} in {result['batches']} batches")
         print(f"   Successful: {result['successful_inserts']}")
-        print(f"   Failed: {result['failed_inserts']}")
+        print(f"   Failed: {result['failed_inserts']} (batches {result['failed_batches']})")
         print(f"   Success rate: {result['success_rate']:.1f}%")
+        print(f"   Retries: {result['retries']}")
+        print(f"   Throughput: {result['rows_per_second']} rows/s, {result['mb_per_second']} MB/s over {result['seconds']}s")
+        
+        # Cached answers for these creators were produced from the old rows
+        if stats["successful"]:
+            for creator_name in creators_for_table(table_name):
+                mark_corpus_updated(creator_name)
         
         return result
         
@@ -92,9 +181,9 @@ def upload_csv_to_table(csv_file_path: str, batch_size: int = 100):
         print(f"❌ Error uploading CSV: {str(e)}")
         return None
 
-def verify_upload(table_name: str, limit: int = 5):
+def verify_upload(table_name: str, limit: int = 5, store: Optional[KnowledgeStore] = None):
     """
-    Verify the uploaded data by fetching from Supabase
+    Verify the uploaded data by fetching it back from the store
     
     Args:
         table_name (str): Name of the table to check
@@ -102,21 +191,22 @@ def verify_upload(table_name: str, limit: int = 5):
     """
     try:
         print(f"🔍 Verifying upload for table '{table_name}'...")
-        response = supabase.table(table_name).select("*").limit(limit).execute()
+        rows = (store or default_store()).scan(table_name, "*", limit)
         
-        if response.data:
-            print(f"✅ Found {len(response.data)} records in table '{table_name}'")
+        if rows:
+            print(f"✅ Found {len(rows)} records in table '{table_name}'")
         else:
             print(f"⚠️  No records found in table '{table_name}'")
             
     except Exception as e:
         print(f"❌ Error verifying upload for '{table_name}': {str(e)}")
 
-def upload_all_csvs_from_data():
+def upload_all_csvs_from_data(store: Optional[KnowledgeStore] = None):
     """
-    Upload all CSV files from the data directory
+    Upload all CSV files from the data directory (to Supabase unless a store is given)
     """
     data_dir = "data"
+    store = store or default_store()
     
     # Check if data directory exists
     if not os.path.exists(data_dir):
@@ -144,7 +234,7 @@ def upload_all_csvs_from_data():
         print(f"\n📁 Processing: {csv_file}")
         print("-" * 40)
         
-        result = upload_csv_to_table(csv_file)
+        result = upload_csv_to_table(csv_file, store=store)
         
         if result:
             results[result['table_name']] = result
@@ -168,7 +258,7 @@ def upload_all_csvs_from_data():
     # Verify uploads
     print(f"\n🔍 Verifying all uploads...")
     for table_name in results.keys():
-        verify_upload(table_name)
+        verify_upload(table_name, store=store)
     
     print(f"\n🎉 All CSV files from '{data_dir}' directory uploaded successfully!")
 
@@ -210,7 +300,11 @@ def create_sample_data():
     print(f"\n🎉 Sample data created in '{data_dir}' directory!")
 
 if __name__ == "__main__":
-    print("🚀 Data Directory CSV Uploader for Supabase")
+    parser = argparse.ArgumentParser(description="Upload every CSV in data/ to a table named after it")
+    parser.add_argument("--sqlite", help="load into this local SQLite knowledge store instead of Supabase")
+    args = parser.parse_args()
+    
+    print(f"🚀 Data Directory CSV Uploader for {'SQLite' if args.sqlite else 'Supabase'}")
     print("=" * 60)
     
     # Check if data directory exists and has CSV files
@@ -219,4 +313,4 @@ if __name__ == "__main__":
         create_sample_data()
     
     # Upload all CSV files from data directory
-    upload_all_csvs_from_data()
+    upload_all_csvs_from_data(SQLiteStore(args.sqlite) if args.sqlite else None)
@@ -0,0 +1,238 @@
+"""
+In-process vector index for local retrieval.
+Keeps a contiguous matrix of pre-normalized embeddings so a top-k query is one
+matrix-vector product plus argpartition, with no network round trip. Vectors can be
+stored as float32, float16 or int8 (with a per-vector scale) to cut memory, with an
+optional exact rerank of the top candidates from a float32 copy memory-mapped on disk.
+"""
+
+import os
+import csv
+import sys
+import copy
+import glob
+import hashlib
+import logging
+import tempfile
+from typing import List, Dict, Any, Optional, Callable, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Transcripts are far larger than the csv module's default 128KB field limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+STORAGE_TYPES = ('float32', 'float16', 'int8')
+
+# Quantized rows are upcast in blocks, so scoring never holds a float32 copy of the whole index
+SCORE_BLOCK_ROWS = 1024
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return an L2-normalized, C-contiguous float32 copy of a 2D array"""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def quantize(matrix: np.ndarray, storage: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Convert float32 rows to the storage type; int8 rows get a symmetric per-row scale"""
+    if storage == 'float32':
+        return matrix, None
+    if storage == 'float16':
+        return matrix.astype(np.float16), None
+    if storage == 'int8':
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Unknown storage type: {storage} (expected one of {STORAGE_TYPES})")
+
+def score_rows(matrix: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Dot products of stored (possibly quantized) rows with a float32 query"""
+    if matrix.dtype == np.float32:
+        return matrix @ query
+    scores = np.empty(matrix.shape[0], dtype=np.float32)
+    for start in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+        block = matrix[start:start + SCORE_BLOCK_ROWS]
+        scores[start:start + block.shape[0]] = block.astype(np.float32) @ query
+    if scales is not None:
+        scores *= scales
+    return scores
+
+class VectorIndex:
+    def __init__(self, dim: int, storage: str = 'float32', rerank_k: int = 0, rerank_path: Optional[str] = None):
+        """Create an empty index; with rerank_path, the top rerank_k quantized hits are rescored exactly"""
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Unknown storage type: {storage} (expected one of {STORAGE_TYPES})")
+        self.dim = dim
+        self.storage = storage
+        self.ids: List[str] = []
+        self.records: List[Dict[str, Any]] = []
+        self.matrix = np.zeros((0, dim), dtype=np.dtype(storage))
+        self.scales: Optional[np.ndarray] = np.zeros(0, dtype=np.float32) if storage == 'int8' else None
+        self.rerank_k = rerank_k
+        # Each build publishes its float32 copy as "<rerank_path stem>-<content hash><ext>"
+        self.rerank_path = rerank_path
+        self.rerank_file: Optional[str] = None
+        self.rerank_source: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def copy(self) -> "VectorIndex":
+        """Copy to append to while searches keep using this index (add never writes arrays in place)"""
+        clone = copy.copy(self)
+        clone.ids = list(self.ids)
+        clone.records = list(self.records)
+        return clone
+
+    def memory_bytes(self) -> int:
+        """Resident bytes of the vector storage (the rerank copy lives on disk)"""
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def add(self, ids: List[str], vectors, records: List[Dict[str, Any]]) -> None:
+        """Append vectors (normalized on insert) with their ids and row payloads"""
+        if not ids:
+            return
+        matrix = normalize_rows(vectors)
+        if matrix.shape != (len(ids), self.dim) or len(records) != len(ids):
+            raise ValueError(f"Expected {len(ids)} vectors of dim {self.dim}, got {matrix.shape}")
+        start = len(self.ids)
+        quantized, scales = quantize(matrix, self.storage)
+        self.matrix = np.ascontiguousarray(np.vstack([self.matrix, quantized]))
+        if scales is not None:
+            self.scales = np.concatenate([self.scales, scales])
+        if self.rerank_path:
+            self.write_rerank_copy(start, matrix)
+        self.ids.extend(ids)
+        self.records.extend(records)
+        if self.rerank_path:
+            self.open_rerank_source()
+
+    def write_rerank_copy(self, start: int, new_rows: np.ndarray) -> None:
+        """Publish a float32 copy of the first `start` vectors plus new_rows as a new file
+        Published files are never rewritten: other workers may have them memory-mapped"""
+        directory = os.path.dirname(self.rerank_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        stem, ext = os.path.splitext(self.rerank_path)
+        previous = self.rerank_source if self.rerank_source is not None else self.dequantize(np.arange(start))
+        digest = hashlib.sha1()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(stem) + '-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                blocks = [previous[i:i + SCORE_BLOCK_ROWS] for i in range(0, start, SCORE_BLOCK_ROWS)] + [new_rows]
+                for block in blocks:
+                    data = np.ascontiguousarray(block, dtype=np.float32).tobytes()
+                    digest.update(data)
+                    f.write(data)
+            path = f"{stem}-{digest.hexdigest()[:16]}{ext}"
+            if os.path.exists(path):
+                # Another worker already published the same vectors
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.rerank_file = path
+        self.prune_rerank_copies()
+
+    def prune_rerank_copies(self, keep: int = 2) -> None:
+        """Delete all but the newest `keep` published copies (mappings of deleted files stay valid)"""
+        stem, ext = os.path.splitext(self.rerank_path)
+        copies = sorted(glob.glob(glob.escape(stem) + '-' + '[0-9a-f]' * 16 + ext), key=os.path.getmtime, reverse=True)
+        for path in copies[keep:]:
+            if path != self.rerank_file:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def open_rerank_source(self) -> None:
+        """Memory-map the float32 copy used for exact reranking"""
+        self.rerank_source = None
+        if self.rerank_file and os.path.exists(self.rerank_file) and self.ids:
+            self.rerank_source = np.memmap(self.rerank_file, dtype=np.float32, mode='r', shape=(len(self.ids), self.dim))
+
+    def dequantize(self, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """float32 copy of the stored vectors (all, or the given positions)"""
+        matrix = self.matrix if positions is None else self.matrix[positions]
+        vectors = matrix.astype(np.float32)
+        if self.scales is not None:
+            vectors *= (self.scales if positions is None else self.scales[positions])[:, None]
+        return vectors
+
+    def _rank_stored(self, query: np.ndarray, k: int, candidates: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """Top-k by scores computed on the stored representation"""
+        if candidates is None:
+            scores = score_rows(self.matrix, self.scales, query)
+            return [(int(i), float(scores[i])) for i in top_k_indices(scores, k)]
+        positions = np.asarray(candidates, dtype=np.int64)
+        scales = self.scales[positions] if self.scales is not None else None
+        scores = score_rows(self.matrix[positions], scales, query)
+        return [(int(positions[i]), float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def rank(self, query_embedding, k: int = 5, candidates: Optional[Sequence[int]] = None, **kwargs) -> List[Tuple[int, float]]:
+        """(position, cosine) of the top-k vectors, optionally scoring only the candidate positions"""
+        if not self.ids:
+            return []
+        query = normalize_rows(query_embedding)[0]
+        rerank = self.rerank_source is not None and self.rerank_k > 0
+        hits = self._rank_stored(query, max(k, self.rerank_k) if rerank else k, candidates, **kwargs)
+        if not rerank or not hits:
+            return hits
+        # Rescore the shortlist with the exact float32 vectors
+        positions = np.array([position for position, _ in hits], dtype=np.int64)
+        scores = np.asarray(self.rerank_source[positions]) @ query
+        return [(int(positions[i]), float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def search(self, query_embedding, k: int = 5, min_score: Optional[float] = None,
+               candidates: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """Return copies of the top-k records with a 'similarity' field"""
+        results = []
+        for position, score in self.rank(query_embedding, k, candidates):
+            if min_score is not None and score <= min_score:
+                break
+            entry = dict(self.records[position])
+            entry['similarity'] = score
+            results.append(entry)
+        return results
+
+def load_csv_records(csv_path: str) -> List[Dict[str, Any]]:
+    """Read a creator corpus CSV (date, title, url, transcript, description)"""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return [dict(row) for row in csv.DictReader(f)]
+
+EntryFn = Callable[[List[Dict[str, Any]]], List[Any]]
+
+def build_corpus_index(csv_path: str, embed_entries: EntryFn, dim: int, chunker: Optional[EntryFn] = None,
+                       index_factory: Callable[[int], VectorIndex] = VectorIndex) -> VectorIndex:
+    """Load a corpus CSV (optionally split into chunks) and index everything that could be embedded"""
+    records = load_csv_records(csv_path)
+    if chunker is not None:
+        records = chunker(records)
+    vectors = embed_entries(records)
+
+    index = index_factory(dim)
+    kept = [(record, vector) for record, vector in zip(records, vectors) if vector is not None]
+    if kept:
+        index.add(
+            [record.get('chunk_id') or record.get('url') or f"row-{i}" for i, (record, _) in enumerate(kept)],
+            np.stack([vector for _, vector in kept]),
+            [record for record, _ in kept]
+        )
+    logger.info(f"✅ Local index built from {os.path.basename(csv_path)}: {len(index)} entries")
+    return index